@@ -277,34 +277,29 @@
 #     app.run(debug=True, port=5000, use_reloader=False)
 import os
 import sys
+import click
 from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from sqlalchemy import inspect, text
 from werkzeug.security import check_password_hash, generate_password_hash
 
 # Add backend directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config import Config
+from migrations import prepare_schema
 from models import User, db
+from services.blob_store import adopt_legacy_files, collect_garbage
+from services.compliance_rollup import change_user_department, rebuild_rollup
+from services.email_digest import init_digests
+from services.email_queue import start_email_workers
+from services.realtime import init_realtime
+from services.report_jobs import fail_interrupted_jobs
+from services.response_cache import init_cache
 
 # 🔥 Import scheduler
 from services.scheduler import start_scheduler
-
-
-def ensure_schema_compatibility():
-    inspector = inspect(db.engine)
-
-    if 'users' not in inspector.get_table_names():
-        return
-
-    columns = {column['name'] for column in inspector.get_columns('users')}
-    if 'password_hash' in columns:
-        return
-
-    with db.engine.begin() as connection:
-        connection.execute(text('ALTER TABLE users ADD COLUMN password_hash VARCHAR(255)'))
+from services.scraper import remove_orphaned_files, run_backfill
 
 
 def default_name_for_account(email: str, role: str) -> str:
@@ -342,7 +337,7 @@ def sync_authorized_login_users(app: Flask):
 
         user.role = role
         if department:
-            user.department = department
+            change_user_department(user, department)
         user.is_active = True
         user.is_verified = True
 
@@ -354,9 +349,11 @@ def sync_authorized_login_users(app: Flask):
     db.session.commit()
 
 
-def create_app():
+def create_app(config_overrides=None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config_overrides:
+        app.config.update(config_overrides)
 
     # Initialize extensions
     
@@ -364,6 +361,9 @@ def create_app():
     CORS(app, supports_credentials=True)
     db.init_app(app)
     JWTManager(app)
+    init_cache(app)
+    init_realtime(app)
+    init_digests(app)
 
     # Ensure upload folder exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -380,6 +380,7 @@ def create_app():
     from routes.dashboard import dashboard_bp
     from routes.reports import reports_bp
     from routes.oauth import oauth_bp
+    from routes.realtime import realtime_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(oauth_bp, url_prefix='/api/auth')
@@ -389,20 +390,64 @@ def create_app():
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
     app.register_blueprint(reports_bp, url_prefix='/api/reports')
+    app.register_blueprint(realtime_bp, url_prefix='/api/realtime')
 
     # ── Health check route ─────────────────────────────
     @app.route('/api/health')
     def health():
         return {'status': 'ok', 'message': 'RCMS Backend is running'}
 
+    # ── CLI commands ─────────────────────────────
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Create missing tables and apply pending schema migrations."""
+        prepare_schema()
+
+    @app.cli.command('rebuild-compliance-rollup')
+    def rebuild_compliance_rollup_command():
+        """Recompute the compliance rollup from submissions (drift repair)."""
+        with db.engine.begin() as connection:
+            rebuild_rollup(connection)
+        print('[ROLLUP] Rebuilt compliance_rollups')
+
+    @app.cli.command('cleanup-uploads')
+    def cleanup_uploads_command():
+        """Delete circular files that no circular references."""
+        removed = remove_orphaned_files(os.path.join(app.config['UPLOAD_FOLDER'], 'circulars'))
+        print(f'[UPLOADS] Removed {removed} orphaned circular files')
+
+    @app.cli.command('gc-blobs')
+    @click.option('--grace-seconds', type=int, default=3600, help='Keep blobs written more recently than this.')
+    def gc_blobs_command(grace_seconds):
+        """Recount attachment references and delete blobs nothing uses."""
+        removed, freed = collect_garbage(app.config['UPLOAD_FOLDER'], grace_seconds)
+        print(f'[BLOBS] Removed {removed} unreferenced files, freed {freed / (1024 * 1024):.1f} MB')
+
+    @app.cli.command('dedupe-uploads')
+    def dedupe_uploads_command():
+        """Move attachments saved before the blob store into it, collapsing duplicates."""
+        moved = adopt_legacy_files(app.config['UPLOAD_FOLDER'])
+        print(f'[BLOBS] Moved {moved} attachments into the blob store')
+
+    @app.cli.command('backfill-circulars')
+    @click.option('--max-pages', type=int, default=None, help='Stop after this many pages (resume later).')
+    @click.option('--restart', is_flag=True, help='Walk the archive again from the first page.')
+    def backfill_circulars_command(max_pages, restart):
+        """Import the paginated AICTE archive, resuming from the last committed page."""
+        state = run_backfill(max_pages=max_pages, restart=restart)
+        print(f'[BACKFILL] {state.pages_done} pages, {state.imported} circulars imported; next page {state.next_page}')
+
     # ── Create DB tables ─────────────────────────────
     with app.app_context():
-        db.create_all()
-        ensure_schema_compatibility()
+        if app.config.get('AUTO_MIGRATE', True):
+            prepare_schema()
         sync_authorized_login_users(app)
+        fail_interrupted_jobs()
 
-    # 🔥 START SCHEDULER
-    start_scheduler(app)
+    # 🔥 START SCHEDULER (not under tests, which build many apps in one process)
+    if not app.testing:
+        start_scheduler(app)
+        start_email_workers(app)
 
     return app
 
@@ -63,12 +63,41 @@ class Config:
         f"sqlite:///{os.path.join(BASE_DIR, 'rcms.db')}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Create tables and apply migrations in create_app; set false when a deploy step runs `flask migrate`
+    AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', 'true').lower() == 'true'
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = 86400  # 24 hours
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB
     ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'xls', 'xlsx', 'png', 'jpg', 'jpeg'}
 
+    # Full-text search: also index text extracted from attached PDF/DOCX files
+    SEARCH_INDEX_DOCUMENTS = os.getenv('SEARCH_INDEX_DOCUMENTS', 'false').lower() == 'true'
+
+    # Response cache for dashboard/report endpoints: memory, redis or none.
+    # memory is per process: a write invalidates only its own worker's cache, other workers
+    # can serve stale payloads for up to CACHE_TTL_SECONDS. Use redis with several workers.
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', '60'))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '512'))
+
+    # Server push: memory (per process) or redis (shared between workers), idle heartbeat, per-stream backlog,
+    # lifetime of the connect token the stream URL carries
+    REALTIME_BACKEND = os.getenv('REALTIME_BACKEND', 'memory')
+    REALTIME_REDIS_URL = os.getenv('REALTIME_REDIS_URL', 'redis://localhost:6379/0')
+    REALTIME_HEARTBEAT_SECONDS = int(os.getenv('REALTIME_HEARTBEAT_SECONDS', '25'))
+    REALTIME_QUEUE_SIZE = int(os.getenv('REALTIME_QUEUE_SIZE', '100'))
+    REALTIME_TOKEN_SECONDS = int(os.getenv('REALTIME_TOKEN_SECONDS', '60'))
+
+    # PDF reports: threads rendering report jobs in the background
+    REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '2'))
+
+    # AICTE scraper: listing page, parallel fetches and minimum spacing between requests to one host
+    SCRAPER_BULLETINS_URL = os.getenv('SCRAPER_BULLETINS_URL', 'https://www.aicte.gov.in/bulletins/circulars')
+    SCRAPER_FETCH_WORKERS = int(os.getenv('SCRAPER_FETCH_WORKERS', '4'))
+    SCRAPER_HOST_INTERVAL = float(os.getenv('SCRAPER_HOST_INTERVAL', '0.5'))
+
     # Google OAuth 2.0
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID', '')
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET', '')
@@ -81,6 +110,21 @@ class Config:
     # Email / SMTP
     MAIL_SENDER_EMAIL = os.getenv('MAIL_SENDER_EMAIL', '')
     MAIL_SENDER_PASSWORD = os.getenv('MAIL_SENDER_PASSWORD', '')
+    MAIL_SMTP_HOST = os.getenv('MAIL_SMTP_HOST', 'smtp.gmail.com')
+    MAIL_SMTP_PORT = int(os.getenv('MAIL_SMTP_PORT', '465'))
+    MAIL_SMTP_SSL = os.getenv('MAIL_SMTP_SSL', 'true').lower() == 'true'
+
+    # Email outbox: worker threads, claim batch size, spacing between sends and retry policy
+    MAIL_WORKERS = int(os.getenv('MAIL_WORKERS', '2'))
+    MAIL_BATCH_SIZE = int(os.getenv('MAIL_BATCH_SIZE', '20'))
+    MAIL_SEND_INTERVAL = float(os.getenv('MAIL_SEND_INTERVAL', '0.5'))
+    MAIL_MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', '5'))
+    MAIL_RETRY_BASE_SECONDS = int(os.getenv('MAIL_RETRY_BASE_SECONDS', '30'))
+    MAIL_OUTBOX_RETENTION_DAYS = int(os.getenv('MAIL_OUTBOX_RETENTION_DAYS', '7'))
+
+    # Notification email digests: off (one email per event), a number of minutes, or daily at MAIL_DIGEST_HOUR (server time)
+    MAIL_DIGEST = os.getenv('MAIL_DIGEST', 'off')
+    MAIL_DIGEST_HOUR = int(os.getenv('MAIL_DIGEST_HOUR', '8'))
 
     # Frontend URL (for OAuth redirect)
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:8080')
@@ -0,0 +1,285 @@
+"""
+Versioned schema/data migrations.
+
+`db.create_all()` only creates missing tables. Anything that has to touch
+existing tables or rows lives here as an ordered, run-once step; applied
+versions are recorded in the `schema_migrations` table.
+
+`prepare_schema` runs both under a database-wide lock on PostgreSQL, so
+several workers starting at once apply each step exactly once. Deployments
+with several workers on another database set AUTO_MIGRATE=false and run
+`flask migrate` once before starting them.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import inspect, select, text
+
+from models import ChatConversation, ChatMessage, ChatThreadState, CircularDepartment, db, parse_target_departments
+from services.compliance_rollup import rebuild_rollup
+from services.search import build_search_index
+from services.scraper import BULLETINS_URL, SCRAPED_DESCRIPTION_PREFIX, source_hash
+
+HOT_QUERY_INDEXES = (
+    'ix_users_department_active',
+    'ix_users_role_active',
+    'ix_circulars_created_id',
+    'ix_circulars_status_deadline',
+    'ix_circulars_regulation_status',
+    'ix_circulars_academic_year',
+    'ix_submissions_circular_user',
+    'ix_submissions_circular_status',
+    'ix_submissions_user_submitted',
+    'ix_submissions_status_submitted',
+    'ix_submissions_reviewed_by',
+    'ix_notifications_user_read_created',
+    'ix_notifications_user_created',
+    'ix_notifications_circular',
+    'ix_chat_messages_group_created',
+    'ix_chat_messages_pair_created',
+    'ix_chat_messages_receiver_created',
+    'ix_activity_logs_created',
+    'ix_activity_logs_user_created',
+)
+
+
+def model_index(name: str):
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise KeyError(f'No index named {name} is declared in models.py')
+
+
+def create_indexes(connection, names):
+    """Create the named model indexes on an existing database, skipping ones already present."""
+    for name in names:
+        model_index(name).create(connection, checkfirst=True)
+
+
+def add_users_password_hash(connection):
+    columns = {column['name'] for column in inspect(connection).get_columns('users')}
+    if 'password_hash' not in columns:
+        connection.execute(text('ALTER TABLE users ADD COLUMN password_hash VARCHAR(255)'))
+
+
+def backfill_circular_departments(connection):
+    """Populate circular_departments from the legacy comma-separated column."""
+    already_targeted = set(
+        connection.execute(text('SELECT DISTINCT circular_id FROM circular_departments')).scalars()
+    )
+    rows = connection.execute(text('SELECT id, target_departments FROM circulars')).all()
+
+    values = [
+        {'circular_id': circular_id, 'department': department}
+        for circular_id, target_departments in rows
+        if circular_id not in already_targeted
+        for department in parse_target_departments(target_departments)
+    ]
+    if values:
+        connection.execute(CircularDepartment.__table__.insert(), values)
+
+
+def add_hot_query_indexes(connection):
+    create_indexes(connection, HOT_QUERY_INDEXES)
+
+
+def build_compliance_rollup(connection):
+    rebuild_rollup(connection)
+
+
+def add_users_updated_at(connection):
+    columns = {column['name'] for column in inspect(connection).get_columns('users')}
+    if 'updated_at' not in columns:
+        connection.execute(text('ALTER TABLE users ADD COLUMN updated_at TIMESTAMP'))
+        connection.execute(text('UPDATE users SET updated_at = created_at'))
+
+
+def add_circular_source_dedupe(connection):
+    """
+    source_url/source_hash columns plus their indexes. Already-scraped rows get
+    their URL back from the description the scraper wrote; if several rows
+    share a URL only the oldest is keyed, so the unique index can be built.
+    """
+    columns = {column['name'] for column in inspect(connection).get_columns('circulars')}
+    if 'source_url' not in columns:
+        connection.execute(text('ALTER TABLE circulars ADD COLUMN source_url VARCHAR(500)'))
+    if 'source_hash' not in columns:
+        connection.execute(text('ALTER TABLE circulars ADD COLUMN source_hash VARCHAR(64)'))
+
+    seen = set(connection.execute(
+        text('SELECT source_hash FROM circulars WHERE source_hash IS NOT NULL')
+    ).scalars())
+    rows = connection.execute(
+        text('SELECT id, description FROM circulars '
+             'WHERE source_hash IS NULL AND description LIKE :prefix ORDER BY id'),
+        {'prefix': f'{SCRAPED_DESCRIPTION_PREFIX}%'},
+    ).all()
+
+    values = []
+    for circular_id, description in rows:
+        url = description[len(SCRAPED_DESCRIPTION_PREFIX):].strip()
+        key = source_hash(url) if url != BULLETINS_URL else None  # listing page: no per-notice URL
+        if key and key not in seen:
+            seen.add(key)
+            values.append({'id': circular_id, 'url': url, 'key': key})
+    if values:
+        connection.execute(
+            text('UPDATE circulars SET source_url = :url, source_hash = :key WHERE id = :id'), values
+        )
+
+    create_indexes(connection, ('uq_circulars_source_hash', 'ix_circulars_title'))
+
+
+def build_chat_conversations(connection):
+    """
+    chat_thread_states.read_count plus one chat_conversations row per existing
+    direct pair or group. Read counts are recomputed from each state's
+    last_read_at, and users who sent into a thread they never opened get a
+    state counting their own messages, so unread counts come out unchanged.
+    """
+    columns = {column['name'] for column in inspect(connection).get_columns('chat_thread_states')}
+    if 'read_count' not in columns:
+        connection.execute(text('ALTER TABLE chat_thread_states ADD COLUMN read_count INTEGER NOT NULL DEFAULT 0'))
+
+    existing = set(connection.execute(text('SELECT thread_type, thread_key FROM chat_conversations')).all())
+    summaries = connection.execute(text(
+        "SELECT 'group', group_name, NULL, NULL, COUNT(*), MAX(id) FROM chat_messages "
+        'WHERE group_name IS NOT NULL GROUP BY group_name'
+    )).all() + connection.execute(text(
+        "SELECT 'direct', NULL, lo, hi, COUNT(*), MAX(id) FROM ("
+        '  SELECT id, CASE WHEN sender_id < receiver_id THEN sender_id ELSE receiver_id END AS lo,'
+        '         CASE WHEN sender_id < receiver_id THEN receiver_id ELSE sender_id END AS hi'
+        '  FROM chat_messages WHERE receiver_id IS NOT NULL'
+        ') AS pairs GROUP BY lo, hi'
+    )).all()
+
+    last_ids = [last_id for *_, last_id in summaries]
+    last_messages = {}
+    for start in range(0, len(last_ids), 500):
+        chunk = last_ids[start:start + 500]
+        # Typed columns, so created_at comes back as a datetime on SQLite too
+        for row in connection.execute(
+            select(ChatMessage.id, ChatMessage.message, ChatMessage.sender_id, ChatMessage.created_at)
+            .where(ChatMessage.id.in_(chunk))
+        ):
+            last_messages[row.id] = row
+
+    values = []
+    for thread_type, group_name, low, high, count, last_id in summaries:
+        thread_key = group_name if thread_type == 'group' else f'{low}:{high}'
+        if (thread_type, thread_key) in existing:
+            continue
+        last = last_messages[last_id]
+        values.append({
+            'thread_type': thread_type, 'thread_key': thread_key, 'user_low': low, 'user_high': high,
+            'message_count': count, 'last_message_id': last_id, 'last_message': last.message[:300],
+            'last_sender_id': last.sender_id, 'last_message_at': last.created_at,
+        })
+    if values:
+        connection.execute(ChatConversation.__table__.insert(), values)
+
+    connection.execute(text(
+        'UPDATE chat_thread_states SET read_count = ('
+        '  SELECT COUNT(*) FROM chat_messages m'
+        '  WHERE ((m.sender_id = chat_thread_states.user_id'
+        '          AND m.receiver_id = CAST(chat_thread_states.thread_key AS INTEGER))'
+        '      OR (m.receiver_id = chat_thread_states.user_id'
+        '          AND m.sender_id = CAST(chat_thread_states.thread_key AS INTEGER)))'
+        '    AND (m.sender_id = chat_thread_states.user_id OR m.created_at <= chat_thread_states.last_read_at)'
+        ") WHERE thread_type = 'direct'"
+    ))
+    connection.execute(text(
+        'UPDATE chat_thread_states SET read_count = ('
+        '  SELECT COUNT(*) FROM chat_messages m'
+        '  WHERE m.group_name = chat_thread_states.thread_key'
+        '    AND (m.sender_id = chat_thread_states.user_id OR m.created_at <= chat_thread_states.last_read_at)'
+        ") WHERE thread_type = 'group'"
+    ))
+
+    states = set(connection.execute(text('SELECT user_id, thread_type, thread_key FROM chat_thread_states')).all())
+    sent = connection.execute(text(
+        "SELECT sender_id, 'direct', CAST(receiver_id AS VARCHAR(120)), COUNT(*) FROM chat_messages "
+        'WHERE receiver_id IS NOT NULL GROUP BY sender_id, receiver_id'
+    )).all() + connection.execute(text(
+        "SELECT sender_id, 'group', group_name, COUNT(*) FROM chat_messages "
+        'WHERE group_name IS NOT NULL GROUP BY sender_id, group_name'
+    )).all()
+    values = [
+        {'user_id': user_id, 'thread_type': thread_type, 'thread_key': thread_key,
+         'last_read_at': datetime(1970, 1, 1), 'read_count': count}
+        for user_id, thread_type, thread_key, count in sent
+        if (user_id, thread_type, thread_key) not in states
+    ]
+    if values:
+        connection.execute(ChatThreadState.__table__.insert(), values)
+
+
+def add_chat_history_indexes(connection):
+    create_indexes(connection, ('ix_chat_messages_group_id', 'ix_chat_messages_pair_id'))
+
+
+MIGRATIONS = [
+    ('0000_users_password_hash', add_users_password_hash),
+    ('0001_circular_departments_backfill', backfill_circular_departments),
+    ('0002_hot_query_indexes', add_hot_query_indexes),
+    ('0003_compliance_rollup', build_compliance_rollup),
+    ('0004_users_updated_at', add_users_updated_at),
+    ('0005_circular_source_dedupe', add_circular_source_dedupe),
+    ('0006_chat_conversations', build_chat_conversations),
+    ('0007_chat_history_indexes', add_chat_history_indexes),
+    ('0008_circular_search_index', build_search_index),
+]
+
+
+MIGRATION_LOCK_KEY = 0x52434D53  # pg_advisory_lock key reserved for schema changes ('RCMS')
+
+
+@contextmanager
+def migration_lock():
+    """Hold a session-level advisory lock on PostgreSQL; other databases run unlocked."""
+    if db.engine.dialect.name != 'postgresql':
+        yield
+        return
+
+    with db.engine.connect() as connection:
+        connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+            connection.commit()
+
+
+def prepare_schema():
+    """Create missing tables and apply pending migrations, one process at a time."""
+    with migration_lock():
+        db.create_all()
+        run_migrations()
+
+
+def run_migrations():
+    """
+    Apply every migration that has not been recorded yet, each in its own
+    transaction. Call it through `prepare_schema`, which holds the lock that
+    keeps concurrent workers from applying the same step twice.
+    """
+    with db.engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)'
+        ))
+        applied = set(connection.execute(text('SELECT version FROM schema_migrations')).scalars())
+
+    for version, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+
+        with db.engine.begin() as connection:
+            migrate(connection)
+            connection.execute(
+                text('INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)'),
+                {'version': version, 'applied_at': datetime.utcnow()},
+            )
+        print(f"[MIGRATE] Applied {version}")
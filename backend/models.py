@@ -3,6 +3,17 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+ALL_DEPARTMENTS = 'all'
+
+
+def parse_target_departments(value) -> list[str]:
+    """Normalise a comma-separated target_departments value into department codes."""
+    value = (value or '').strip()
+    if value.lower() == ALL_DEPARTMENTS:
+        return [ALL_DEPARTMENTS]
+    return list(dict.fromkeys(dept.strip().upper() for dept in value.split(',') if dept.strip()))
+
+
 # ── Users ──────────────────────────────────────────────────────────────
 class User(db.Model):
     __tablename__ = 'users'
@@ -24,11 +35,17 @@ class User(db.Model):
     is_verified = db.Column(db.Boolean, default=True)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # relationships
     submissions = db.relationship('Submission', foreign_keys='Submission.user_id', backref='user', lazy=True)
     sent_messages = db.relationship('ChatMessage', foreign_keys='ChatMessage.sender_id', backref='sender', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_users_department_active', 'department', 'is_active'),
+        db.Index('ix_users_role_active', 'role', 'is_active'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -56,15 +73,67 @@ class Circular(db.Model):
     target_departments = db.Column(db.Text)                # comma-separated or "all"
     file_path = db.Column(db.String(500))
     file_name = db.Column(db.String(300))
+    document_text = db.deferred(db.Column(db.Text))        # extracted attachment text, for search
+    source_url = db.Column(db.String(500))                 # scraped circulars: notice page / PDF
+    source_hash = db.Column(db.String(64))                 # sha256 of the normalized source_url
     uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     uploader = db.relationship('User', backref='circulars')
     submissions = db.relationship('Submission', backref='circular', lazy=True)
+    departments = db.relationship('CircularDepartment', cascade='all, delete-orphan', lazy=True)
 
-    def to_dict(self):
-        return {
+    __table_args__ = (
+        db.Index('ix_circulars_created_id', 'created_at', 'id'),           # list ordering / keyset cursor
+        db.Index('ix_circulars_status_deadline', 'status', 'deadline'),    # upcoming / overdue
+        db.Index('ix_circulars_regulation_status', 'regulation_type', 'status'),
+        db.Index('ix_circulars_academic_year', 'academic_year'),
+        db.Index('uq_circulars_source_hash', 'source_hash', unique=True),  # scraper dedupe
+        db.Index('ix_circulars_title', 'title'),                            # scraper title fallback
+    )
+
+    @classmethod
+    def visible_to_department(cls, department):
+        """Indexed EXISTS filter for circulars targeted at `department` or at all departments."""
+        departments = [ALL_DEPARTMENTS]
+        if department:
+            departments.append(department.strip().upper())
+
+        return db.exists().where(
+            CircularDepartment.circular_id == cls.id,
+            CircularDepartment.department.in_(departments),
+        )
+
+    def sync_departments(self, target_departments):
+        wanted = parse_target_departments(target_departments)
+        for row in list(self.departments):
+            if row.department not in wanted:
+                self.departments.remove(row)
+
+        current = {row.department for row in self.departments}
+        for department in wanted:
+            if department not in current:
+                self.departments.append(CircularDepartment(department=department))
+
+    @staticmethod
+    def submission_counts(circular_ids) -> dict[int, tuple[int, int]]:
+        """Return {circular_id: (submission_count, approved_count)} in one grouped query."""
+        if not circular_ids:
+            return {}
+
+        rows = db.session.query(
+            Submission.circular_id,
+            db.func.count(Submission.id),
+            db.func.sum(db.case((Submission.status == 'approved', 1), else_=0)),
+        ).filter(
+            Submission.circular_id.in_(circular_ids)
+        ).group_by(Submission.circular_id).all()
+
+        return {circular_id: (total, approved or 0) for circular_id, total, approved in rows}
+
+    def to_dict(self, counts=None, include_counts=True):
+        payload = {
             'id': self.id,
             'title': self.title,
             'description': self.description,
@@ -81,10 +150,35 @@ class Circular(db.Model):
             'uploader_name': self.uploader.name if self.uploader else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'submission_count': len(self.submissions),
-            'approved_count': len([s for s in self.submissions if s.status == 'approved']),
         }
 
+        if include_counts:
+            # Counted in SQL; pass `counts` from Circular.submission_counts() when serializing many.
+            if counts is None:
+                counts = Circular.submission_counts([self.id]).get(self.id, (0, 0))
+            payload['submission_count'], payload['approved_count'] = counts
+
+        return payload
+
+    def to_summary_dict(self):
+        """Circular fields without submission aggregates, for lists that never show them."""
+        return self.to_dict(include_counts=False)
+
+
+@db.event.listens_for(Circular.target_departments, 'set')
+def _sync_circular_departments(circular, value, oldvalue, initiator):
+    circular.sync_departments(value)
+
+
+class CircularDepartment(db.Model):
+    __tablename__ = 'circular_departments'
+    circular_id = db.Column(db.Integer, db.ForeignKey('circulars.id'), primary_key=True)
+    department = db.Column(db.String(100), primary_key=True)  # department code or 'all'
+
+    __table_args__ = (
+        db.Index('ix_circular_departments_department_circular', 'department', 'circular_id'),
+    )
+
 # ── Submissions ────────────────────────────────────────────────────────
 
 class Submission(db.Model):
@@ -103,6 +197,14 @@ class Submission(db.Model):
 
     reviewer = db.relationship('User', foreign_keys=[reviewed_by])
 
+    __table_args__ = (
+        db.Index('ix_submissions_circular_user', 'circular_id', 'user_id'),
+        db.Index('ix_submissions_circular_status', 'circular_id', 'status'),
+        db.Index('ix_submissions_user_submitted', 'user_id', 'submitted_at'),
+        db.Index('ix_submissions_status_submitted', 'status', 'submitted_at'),  # pending reviews
+        db.Index('ix_submissions_reviewed_by', 'reviewed_by'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -123,6 +225,29 @@ class Submission(db.Model):
             'reviewed_by': self.reviewed_by,
         }
 
+
+class ComplianceRollup(db.Model):
+    """
+    Submission counts per (academic_year, submitter department, category,
+    regulation_type), maintained by services.compliance_rollup. Missing
+    dimension values are stored as '' so the key stays unique.
+    """
+    __tablename__ = 'compliance_rollups'
+    id = db.Column(db.Integer, primary_key=True)
+    academic_year = db.Column(db.String(20), nullable=False, default='')
+    department = db.Column(db.String(100), nullable=False, default='')
+    category = db.Column(db.String(80), nullable=False, default='')
+    regulation_type = db.Column(db.String(50), nullable=False, default='')
+    total = db.Column(db.Integer, nullable=False, default=0)
+    approved = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+    pending = db.Column(db.Integer, nullable=False, default=0)  # anything not yet approved/rejected
+
+    __table_args__ = (
+        db.UniqueConstraint('academic_year', 'department', 'category', 'regulation_type',
+                            name='uq_compliance_rollups_key'),
+    )
+
 # ── Notifications ──────────────────────────────────────────────────────
 
 class Notification(db.Model):
@@ -138,6 +263,12 @@ class Notification(db.Model):
 
     user = db.relationship('User', backref='notifications')
 
+    __table_args__ = (
+        db.Index('ix_notifications_user_read_created', 'user_id', 'is_read', 'created_at'),
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at'),
+        db.Index('ix_notifications_circular', 'circular_id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -164,6 +295,14 @@ class ChatMessage(db.Model):
     file_name = db.Column(db.String(300))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_chat_messages_group_created', 'group_name', 'created_at'),
+        db.Index('ix_chat_messages_pair_created', 'sender_id', 'receiver_id', 'created_at'),
+        db.Index('ix_chat_messages_receiver_created', 'receiver_id', 'created_at'),
+        db.Index('ix_chat_messages_group_id', 'group_name', 'id'),                # history windows
+        db.Index('ix_chat_messages_pair_id', 'sender_id', 'receiver_id', 'id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -188,6 +327,7 @@ class ChatThreadState(db.Model):
     thread_type = db.Column(db.String(20), nullable=False)
     thread_key = db.Column(db.String(120), nullable=False)
     last_read_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    read_count = db.Column(db.Integer, nullable=False, default=0)  # conversation messages seen or sent by this user
 
     __table_args__ = (
         db.UniqueConstraint('user_id', 'thread_type', 'thread_key', name='uq_chat_thread_state'),
@@ -205,6 +345,33 @@ class ChatThreadState(db.Model):
         }
 
 
+class ChatConversation(db.Model):
+    """
+    Inbox summary of one direct pair or group: its latest message and a running
+    message count. A participant's unread count is message_count minus the
+    read_count on their chat_thread_states row.
+    """
+    __tablename__ = 'chat_conversations'
+    id = db.Column(db.Integer, primary_key=True)
+    thread_type = db.Column(db.String(20), nullable=False)   # direct, group
+    thread_key = db.Column(db.String(120), nullable=False)   # '<low id>:<high id>' or group name
+    user_low = db.Column(db.Integer)                         # direct pairs only
+    user_high = db.Column(db.Integer)
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    last_message_id = db.Column(db.Integer)
+    last_message = db.Column(db.String(300))                 # preview
+    last_sender_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    last_message_at = db.Column(db.DateTime)
+
+    last_sender = db.relationship('User')
+
+    __table_args__ = (
+        db.UniqueConstraint('thread_type', 'thread_key', name='uq_chat_conversation'),
+        db.Index('ix_chat_conversations_user_low', 'user_low'),
+        db.Index('ix_chat_conversations_user_high', 'user_high'),
+    )
+
+
 class ActivityLog(db.Model):
     __tablename__ = 'activity_logs'
     id = db.Column(db.Integer, primary_key=True)
@@ -217,6 +384,11 @@ class ActivityLog(db.Model):
 
     user = db.relationship('User', backref='activity_logs')
 
+    __table_args__ = (
+        db.Index('ix_activity_logs_created', 'created_at'),
+        db.Index('ix_activity_logs_user_created', 'user_id', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -229,3 +401,123 @@ class ActivityLog(db.Model):
             'details': self.details,
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
+
+
+# ── Scraper ────────────────────────────────────────────────────────────
+
+class ScraperState(db.Model):
+    """HTTP validators and content hash of the last processed listing page, per source URL."""
+    __tablename__ = 'scraper_states'
+    source_url = db.Column(db.String(500), primary_key=True)
+    etag = db.Column(db.String(255))
+    last_modified = db.Column(db.String(64))
+    content_hash = db.Column(db.String(64))
+    checked_at = db.Column(db.DateTime)
+    changed_at = db.Column(db.DateTime)
+
+
+class ScraperBackfill(db.Model):
+    """Resume point of a paginated archive backfill: the next listing page to import, per source URL."""
+    __tablename__ = 'scraper_backfills'
+    source_url = db.Column(db.String(500), primary_key=True)
+    next_page = db.Column(db.Integer, nullable=False, default=0)
+    pages_done = db.Column(db.Integer, nullable=False, default=0)
+    imported = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+
+# ── Outbound email ─────────────────────────────────────────────────────
+
+class EmailOutbox(db.Model):
+    """Queued outbound email; rows are added in the sender's transaction and delivered by the email workers."""
+    __tablename__ = 'email_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(300), nullable=False)
+    html_body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    priority = db.Column(db.Integer, nullable=False, default=1)  # 0 = urgent (OTP codes), claimed before 1 = normal
+    sensitive = db.Column(db.Boolean, nullable=False, default=False)  # deleted once sent or given up on
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32))
+    claimed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),  # worker claim
+        db.Index('ix_email_outbox_claim_token', 'claim_token'),
+    )
+
+
+class EmailDigestItem(db.Model):
+    """One notification waiting to go out in its recipient's next digest email."""
+    __tablename__ = 'email_digest_items'
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    name = db.Column(db.String(120))
+    title = db.Column(db.String(300), nullable=False)
+    message = db.Column(db.Text)
+    link = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_email_digest_items_recipient', 'to_email', 'id'),
+    )
+
+
+# ── Report jobs ────────────────────────────────────────────────────────
+
+class ReportJob(db.Model):
+    """A PDF report rendered in the background; done jobs double as the cache of rendered reports."""
+    __tablename__ = 'report_jobs'
+    id = db.Column(db.String(32), primary_key=True)                # uuid4 hex, handed to the client
+    report_type = db.Column(db.String(20), nullable=False)         # annual, department
+    department = db.Column(db.String(100), nullable=False, default='')
+    academic_year = db.Column(db.String(20), nullable=False)
+    data_version = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    file_path = db.Column(db.String(500))
+    error = db.Column(db.Text)
+    requested_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_report_jobs_lookup', 'report_type', 'academic_year', 'department', 'data_version'),
+    )
+
+    @property
+    def download_name(self):
+        if self.report_type == 'annual':
+            return f'RCMS_Annual_Report_{self.academic_year}.pdf'
+        return f'RCMS_Report_{self.department}_{self.academic_year}.pdf'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'report_type': self.report_type,
+            'department': self.department or None,
+            'academic_year': self.academic_year,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+# ── Blobs ──────────────────────────────────────────────────────────────
+
+class Blob(db.Model):
+    """One stored upload, named by the SHA-256 of its content and shared by every row that attaches it."""
+    __tablename__ = 'blobs'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    extension = db.Column(db.String(20), nullable=False, default='')  # of the first upload, e.g. '.pdf'
+    ref_count = db.Column(db.Integer, nullable=False, default=0)       # circulars, submissions and chat messages using it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
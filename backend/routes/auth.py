@@ -3,7 +3,11 @@ import requests as http_requests
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, ActivityLog, Notification, Submission, ChatMessage
+from models import db, User, ActivityLog, Notification, Submission, ChatMessage, ReportJob
+from routes.chat import remove_sent_messages
+from services import events
+from services.blob_store import release_references
+from services.compliance_rollup import retract_submissions
 from utils.email_sender import generate_otp, verify_otp, send_otp_email, send_notification_email
 from datetime import datetime
 
@@ -43,6 +47,7 @@ def send_otp():
 
     otp = generate_otp(email)
     send_otp_email(email, otp, name)
+    db.session.commit()
 
     return jsonify({'message': 'OTP sent to your email. Valid for 10 minutes.'}), 200
 
@@ -158,6 +163,7 @@ def signup():
         db.session.add(n)
 
     db.session.commit()
+    events.publish(events.NOTIFICATIONS_CREATED, user_ids=[a.id for a in admins], title='New User Registered')
 
     token = create_access_token(identity=str(user.id))
     return jsonify({'token': token, 'user': user.to_dict()}), 201
@@ -282,8 +288,14 @@ def delete_user(user_id):
 
     # Clean up related records before deleting user
     Notification.query.filter_by(user_id=user_id).delete()
-    ChatMessage.query.filter_by(sender_id=user_id).delete()
+    release_references(
+        db.session.scalars(db.select(ChatMessage.file_path).where(ChatMessage.sender_id == user_id)).all()
+        + db.session.scalars(db.select(Submission.file_path).where(Submission.user_id == user_id)).all()
+    )
+    remove_sent_messages(user_id)
     Submission.query.filter(Submission.reviewed_by == user_id).update({Submission.reviewed_by: None})
+    ReportJob.query.filter_by(requested_by=user_id).update({ReportJob.requested_by: None})
+    retract_submissions(Submission.user_id == user_id)
     Submission.query.filter_by(user_id=user_id).delete()
     ActivityLog.query.filter_by(user_id=user_id).delete()
 
@@ -292,6 +304,7 @@ def delete_user(user_id):
                       entity_id=user_id, details=f'Deleted user {target_name}')
     db.session.add(log)
     db.session.commit()
+    events.publish(events.USER_DELETED, user_id=user_id)
     return jsonify({'message': 'User deleted'})
 
 # ── Create user (admin) ─────────────────────────────────────────────
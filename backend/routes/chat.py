@@ -1,15 +1,23 @@
 import os
-import uuid
 from datetime import datetime
 from flask import Blueprint, request, jsonify, send_from_directory, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
-from models import db, ChatMessage, ChatThreadState, User, Notification
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from models import db, ChatConversation, ChatMessage, ChatThreadState, User, Notification
+from services import events
+from services.blob_store import store_upload
+from utils.http_cache import conditional_json, make_etag, stamp
 
 chat_bp = Blueprint('chat', __name__)
 
 DEPARTMENT_GROUPS = ['CSE', 'IT', 'ECE', 'EEE', 'MECH', 'CIVIL', 'BIOMEDICAL', 'MTECH CSE']
 BROADCAST_GROUP = 'Broadcast'
+PREVIEW_LENGTH = 300
+DEFAULT_HISTORY_LIMIT = 50
+MAX_HISTORY_LIMIT = 200
+NEVER_READ = datetime(1970, 1, 1)
 
 CHAT_ALLOWED_EXTENSIONS = {
     'pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'txt', 'csv',
@@ -72,8 +80,26 @@ def get_thread_state(user_id: int, thread_type: str, thread_key: str) -> ChatThr
     ).first()
 
 
+def conversation_criteria(user_id: int, thread_type: str, thread_key: str) -> tuple:
+    """WHERE criteria for the conversation behind `user_id`'s thread (direct: thread_key is the other user's id)."""
+    if thread_type == 'direct':
+        low, high = sorted((user_id, int(thread_key)))
+        thread_key = f'{low}:{high}'
+    return ChatConversation.thread_type == thread_type, ChatConversation.thread_key == thread_key
+
+
 def mark_thread_read(user_id: int, thread_type: str, thread_key: str):
+    """
+    Move the user's read marker to the end of the conversation, zeroing its
+    unread count. Nothing is written when the marker is already there.
+    """
+    message_count = db.session.scalar(
+        db.select(ChatConversation.message_count).where(*conversation_criteria(user_id, thread_type, thread_key))
+    ) or 0
     state = get_thread_state(user_id, thread_type, thread_key)
+    if (state.read_count if state else 0) == message_count:
+        return
+
     now = datetime.utcnow()
 
     if state is None:
@@ -82,34 +108,182 @@ def mark_thread_read(user_id: int, thread_type: str, thread_key: str):
             thread_type=thread_type,
             thread_key=thread_key,
             last_read_at=now,
+            read_count=message_count,
         )
         db.session.add(state)
     else:
         state.last_read_at = now
+        state.read_count = message_count
 
     db.session.commit()
 
 
-def unread_direct_count(user_id: int, other_user_id: int) -> int:
-    state = get_thread_state(user_id, 'direct', str(other_user_id))
-    query = ChatMessage.query.filter(
-        ChatMessage.sender_id == other_user_id,
-        ChatMessage.receiver_id == user_id,
+def record_conversation_message(msg: ChatMessage):
+    """
+    Advance the conversation summary for a flushed message, in the sender's
+    transaction: bump message_count, move the last-message fields forward and
+    count the message as already read by its sender.
+    """
+    if msg.receiver_id:
+        low, high = sorted((msg.sender_id, msg.receiver_id))
+        thread_type, thread_key, sender_key = 'direct', f'{low}:{high}', str(msg.receiver_id)
+    else:
+        low = high = None
+        thread_type, thread_key, sender_key = 'group', msg.group_name, msg.group_name
+
+    conversation_id = db.session.scalar(
+        db.select(ChatConversation.id).filter_by(thread_type=thread_type, thread_key=thread_key)
+    )
+    if conversation_id is None:
+        conversation = ChatConversation(
+            thread_type=thread_type, thread_key=thread_key, user_low=low, user_high=high, message_count=0,
+        )
+        try:
+            with db.session.begin_nested():
+                db.session.add(conversation)
+            conversation_id = conversation.id
+        except IntegrityError:  # the first message of this conversation raced another one
+            conversation_id = db.session.scalar(
+                db.select(ChatConversation.id).filter_by(thread_type=thread_type, thread_key=thread_key)
+            )
+
+    this_conversation = ChatConversation.id == conversation_id
+    db.session.execute(
+        db.update(ChatConversation).where(this_conversation)
+        .values(message_count=ChatConversation.message_count + 1)
+    )
+    db.session.execute(
+        db.update(ChatConversation)
+        .where(
+            this_conversation,
+            db.or_(ChatConversation.last_message_id.is_(None), ChatConversation.last_message_id < msg.id),
+        )
+        .values(
+            last_message_id=msg.id,
+            last_message=msg.message[:PREVIEW_LENGTH],
+            last_sender_id=msg.sender_id,
+            last_message_at=msg.created_at,
+        )
     )
-    if state:
-        query = query.filter(ChatMessage.created_at > state.last_read_at)
-    return query.count()
 
+    sender_state = db.update(ChatThreadState).where(
+        ChatThreadState.user_id == msg.sender_id,
+        ChatThreadState.thread_type == thread_type,
+        ChatThreadState.thread_key == sender_key,
+    ).values(read_count=ChatThreadState.read_count + 1)
+    if db.session.execute(sender_state).rowcount == 0:
+        db.session.add(ChatThreadState(
+            user_id=msg.sender_id,
+            thread_type=thread_type,
+            thread_key=sender_key,
+            last_read_at=NEVER_READ,
+            read_count=1,
+        ))
+
+
+def users_version():
+    """Changes whenever a user is added, removed, renamed, re-roled or (de)activated."""
+    return [
+        stamp(db.func.count(User.id), where=User.is_active.is_(True)),
+        stamp(db.func.max(User.id)),
+        stamp(db.func.max(User.updated_at)),
+    ]
 
-def unread_group_count(user_id: int, group_name: str) -> int:
-    state = get_thread_state(user_id, 'group', group_name)
-    query = ChatMessage.query.filter(
-        ChatMessage.group_name == group_name,
-        ChatMessage.sender_id != user_id,
+
+def direct_conversations_of(user_id: int):
+    return db.and_(
+        ChatConversation.thread_type == 'direct',
+        db.or_(ChatConversation.user_low == user_id, ChatConversation.user_high == user_id),
+    )
+
+
+def remove_sent_messages(user_id: int):
+    """
+    Delete every message `user_id` sent, in the caller's transaction, and take
+    them out of the conversation summaries: other members' read counts lose
+    the deleted messages they had read, the user's own thread states go, and
+    each affected conversation is recounted (or dropped once empty).
+    """
+    sent = ChatMessage.sender_id == user_id
+    groups_sent_to = db.session.scalars(
+        db.select(ChatMessage.group_name).where(sent, ChatMessage.group_name.isnot(None)).distinct()
+    ).all()
+
+    deleted = db.aliased(ChatMessage)
+    read_and_deleted = (
+        db.select(db.func.count(deleted.id))
+        .where(
+            deleted.sender_id == user_id,
+            deleted.created_at <= ChatThreadState.last_read_at,
+            db.or_(
+                db.and_(ChatThreadState.thread_type == 'direct', deleted.receiver_id == ChatThreadState.user_id),
+                db.and_(ChatThreadState.thread_type == 'group', deleted.group_name == ChatThreadState.thread_key),
+            ),
+        )
+        .scalar_subquery()
     )
-    if state:
-        query = query.filter(ChatMessage.created_at > state.last_read_at)
-    return query.count()
+    db.session.execute(
+        db.update(ChatThreadState)
+        .where(
+            ChatThreadState.user_id != user_id,
+            db.or_(
+                db.and_(ChatThreadState.thread_type == 'direct', ChatThreadState.thread_key == str(user_id)),
+                db.and_(ChatThreadState.thread_type == 'group', ChatThreadState.thread_key.in_(groups_sent_to)),
+            ),
+        )
+        .values(read_count=ChatThreadState.read_count - read_and_deleted),
+        execution_options={'synchronize_session': False},
+    )
+    ChatThreadState.query.filter_by(user_id=user_id).delete()
+    ChatMessage.query.filter(sent).delete()
+
+    affected = ChatConversation.query.filter(db.or_(
+        direct_conversations_of(user_id),
+        db.and_(ChatConversation.thread_type == 'group', ChatConversation.thread_key.in_(groups_sent_to)),
+    )).all()
+    for conversation in affected:
+        if conversation.thread_type == 'group':
+            remaining = ChatMessage.group_name == conversation.thread_key
+        else:
+            remaining = db.or_(
+                db.and_(ChatMessage.sender_id == conversation.user_low, ChatMessage.receiver_id == conversation.user_high),
+                db.and_(ChatMessage.sender_id == conversation.user_high, ChatMessage.receiver_id == conversation.user_low),
+            )
+        count, last_id = db.session.execute(
+            db.select(db.func.count(ChatMessage.id), db.func.max(ChatMessage.id)).where(remaining)
+        ).one()
+        if not count:
+            db.session.delete(conversation)
+            continue
+
+        last = db.session.get(ChatMessage, last_id)
+        conversation.message_count = count
+        conversation.last_message_id = last.id
+        conversation.last_message = last.message[:PREVIEW_LENGTH]
+        conversation.last_sender_id = last.sender_id
+        conversation.last_message_at = last.created_at
+
+
+def contacts_version(user_id: int) -> tuple:
+    mine = direct_conversations_of(user_id)
+    direct_reads = db.and_(ChatThreadState.user_id == user_id, ChatThreadState.thread_type == 'direct')
+    return tuple(db.session.execute(db.select(
+        *users_version(),
+        stamp(db.func.sum(ChatConversation.message_count), where=mine),
+        stamp(db.func.max(ChatConversation.last_message_id), where=mine),
+        stamp(db.func.sum(ChatThreadState.read_count), where=direct_reads),
+    )).one())
+
+
+def groups_version(user_id: int, group_names: list[str]) -> tuple:
+    groups_of_user = db.and_(ChatConversation.thread_type == 'group', ChatConversation.thread_key.in_(group_names))
+    group_reads = db.and_(ChatThreadState.user_id == user_id, ChatThreadState.thread_type == 'group')
+    return tuple(db.session.execute(db.select(
+        *users_version(),
+        stamp(db.func.sum(ChatConversation.message_count), where=groups_of_user),
+        stamp(db.func.max(ChatConversation.last_message_id), where=groups_of_user),
+        stamp(db.func.sum(ChatThreadState.read_count), where=group_reads),
+    )).one())
 
 
 @chat_bp.route('', methods=['POST'])
@@ -157,14 +331,7 @@ def send_message():
             }), 400
 
         file_name = secure_filename(file.filename)
-        unique_name = f"{uuid.uuid4().hex}_{file_name}"
-        upload_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'chat')
-        os.makedirs(upload_dir, exist_ok=True)
-
-        file_full_path = os.path.join(upload_dir, unique_name)
-        file.save(file_full_path)
-
-        file_path = f"chat/{unique_name}"
+        file_path = os.path.relpath(store_upload(file), current_app.config['UPLOAD_FOLDER'])
 
         ext = file_name.rsplit('.', 1)[1].lower()
 
@@ -202,8 +369,15 @@ def send_message():
         )
         db.session.add(notif)
 
+    db.session.flush()
+    record_conversation_message(msg)
     db.session.commit()
-    return jsonify(msg.to_dict()), 201
+
+    payload = msg.to_dict()
+    events.publish(events.CHAT_MESSAGE_SENT, message=payload)
+    if receiver_id:
+        events.publish(events.NOTIFICATIONS_CREATED, user_ids=[receiver_id], title=notif.title)
+    return jsonify(payload), 201
 
 
 @chat_bp.route('/download/<int:message_id>', methods=['GET'])
@@ -231,6 +405,27 @@ def download_attachment(message_id):
     return send_from_directory(directory, filename, as_attachment=True, download_name=msg.file_name or filename)
 
 
+def history_window(query) -> tuple[list, bool]:
+    """
+    One window of a thread's history, oldest first, from ?limit= plus at most one of
+    ?before_id= (older page) or ?since_id= (new messages); by default the latest
+    `limit` messages. Also returns whether the window reaches the newest message.
+    """
+    limit = min(max(request.args.get('limit', DEFAULT_HISTORY_LIMIT, type=int), 1), MAX_HISTORY_LIMIT)
+    before_id = request.args.get('before_id', type=int)
+    since_id = request.args.get('since_id', type=int)
+    query = query.options(joinedload(ChatMessage.sender))
+
+    if since_id is not None:
+        messages = query.filter(ChatMessage.id > since_id).order_by(ChatMessage.id.asc()).limit(limit).all()
+        return messages, len(messages) < limit
+
+    if before_id is not None:
+        query = query.filter(ChatMessage.id < before_id)
+    messages = query.order_by(ChatMessage.id.desc()).limit(limit).all()
+    return messages[::-1], before_id is None
+
+
 @chat_bp.route('/direct/<int:other_id>', methods=['GET'])
 @jwt_required()
 def direct_messages(other_id):
@@ -240,15 +435,18 @@ def direct_messages(other_id):
 
     if not (can_chat(current_user.role, other_user.role) or can_chat(other_user.role, current_user.role)):
         return jsonify({'error': 'Access denied'}), 403
+    if 'before_id' in request.args and 'since_id' in request.args:
+        return jsonify({'error': 'Use either before_id or since_id, not both'}), 400
 
-    messages = ChatMessage.query.filter(
+    messages, reaches_latest = history_window(ChatMessage.query.filter(
         db.or_(
             db.and_(ChatMessage.sender_id == uid, ChatMessage.receiver_id == other_id),
             db.and_(ChatMessage.sender_id == other_id, ChatMessage.receiver_id == uid)
         )
-    ).order_by(ChatMessage.created_at.asc()).all()
+    ))
 
-    mark_thread_read(uid, 'direct', str(other_id))
+    if reaches_latest:
+        mark_thread_read(uid, 'direct', str(other_id))
     return jsonify([m.to_dict() for m in messages])
 
 
@@ -260,10 +458,13 @@ def group_messages(group_name):
 
     if not can_access_group(user, group_name):
         return jsonify({'error': 'Access denied'}), 403
+    if 'before_id' in request.args and 'since_id' in request.args:
+        return jsonify({'error': 'Use either before_id or since_id, not both'}), 400
 
-    messages = ChatMessage.query.filter_by(group_name=group_name).order_by(ChatMessage.created_at.asc()).all()
+    messages, reaches_latest = history_window(ChatMessage.query.filter_by(group_name=group_name))
 
-    mark_thread_read(uid, 'group', group_name)
+    if reaches_latest:
+        mark_thread_read(uid, 'group', group_name)
     return jsonify([m.to_dict() for m in messages])
 
 
@@ -272,29 +473,32 @@ def group_messages(group_name):
 def contacts():
     uid = int(get_jwt_identity())
     user = User.query.get_or_404(uid)
+    etag = make_etag('chat-contacts', uid, user.role, *contacts_version(uid))
+    return conditional_json(etag, lambda: build_contacts(user))
 
-    all_users = User.query.filter(User.id != uid, User.is_active == True).all()
-
-    contacts_list = []
-    for other in all_users:
-        if not can_chat(user.role, other.role):
-            continue
 
-        last_msg = ChatMessage.query.filter(
-            db.or_(
-                db.and_(ChatMessage.sender_id == uid, ChatMessage.receiver_id == other.id),
-                db.and_(ChatMessage.sender_id == other.id, ChatMessage.receiver_id == uid)
-            )
-        ).order_by(ChatMessage.created_at.desc()).first()
+def build_contacts(user: User) -> list[dict]:
+    uid = user.id
+    others = [
+        other for other in db.session.execute(
+            db.select(User.id, User.name, User.role, User.department)
+            .where(User.id != uid, User.is_active.is_(True))
+        )
+        if can_chat(user.role, other.role)
+    ]
+    inbox = direct_inbox(uid)
 
+    contacts_list = []
+    for other in others:
+        conversation = inbox.get(other.id)
         contacts_list.append({
             'id': other.id,
             'name': other.name,
             'role': other.role,
             'department': other.department,
-            'last_message': last_msg.message if last_msg else None,
-            'last_message_time': last_msg.created_at.isoformat() if last_msg else None,
-            'unread_count': unread_direct_count(uid, other.id),
+            'last_message': conversation.last_message if conversation else None,
+            'last_message_time': conversation.last_message_at.isoformat() if conversation else None,
+            'unread_count': conversation.unread_count if conversation else 0,
         })
 
     contacts_list.sort(
@@ -305,7 +509,58 @@ def contacts():
         ),
         reverse=False
     )
-    return jsonify(contacts_list)
+    return contacts_list
+
+
+def unread_count_for(user_id: int):
+    """Unread messages in a conversation row joined to `user_id`'s thread state."""
+    return (ChatConversation.message_count - db.func.coalesce(ChatThreadState.read_count, 0)).label('unread_count')
+
+
+def direct_inbox(user_id: int) -> dict:
+    """{counterpart id: conversation summary row} for every direct conversation of `user_id`, in one query."""
+    other_id = db.case(
+        (ChatConversation.user_low == user_id, ChatConversation.user_high),
+        else_=ChatConversation.user_low,
+    )
+    state = db.and_(
+        ChatThreadState.user_id == user_id,
+        ChatThreadState.thread_type == 'direct',
+        ChatThreadState.thread_key == db.cast(other_id, db.String),
+    )
+    rows = db.session.execute(
+        db.select(
+            other_id.label('other_id'),
+            ChatConversation.last_message,
+            ChatConversation.last_message_at,
+            unread_count_for(user_id),
+        )
+        .outerjoin(ChatThreadState, state)
+        .where(direct_conversations_of(user_id))
+    )
+    return {row.other_id: row for row in rows}
+
+
+def group_inbox(user_id: int, group_names: list[str]) -> dict:
+    """{group name: conversation summary row with the last sender's name}, in one query."""
+    state = db.and_(
+        ChatThreadState.user_id == user_id,
+        ChatThreadState.thread_type == 'group',
+        ChatThreadState.thread_key == ChatConversation.thread_key,
+    )
+    rows = db.session.execute(
+        db.select(
+            ChatConversation.thread_key,
+            ChatConversation.last_message,
+            ChatConversation.last_message_at,
+            User.name.label('sender_name'),
+            unread_count_for(user_id),
+        )
+        .outerjoin(ChatThreadState, state)
+        .outerjoin(User, User.id == ChatConversation.last_sender_id)
+        .where(ChatConversation.thread_type == 'group', ChatConversation.thread_key.in_(group_names))
+    )
+    return {row.thread_key: row for row in rows}
 
 
 @chat_bp.route('/groups', methods=['GET'])
@@ -313,17 +568,23 @@ def contacts():
 def groups():
     uid = int(get_jwt_identity())
     user = User.query.get_or_404(uid)
+    group_names = available_groups_for(user)
+    etag = make_etag('chat-groups', uid, user.role, user.department, *groups_version(uid, group_names))
+    return conditional_json(etag, lambda: build_groups(user, group_names))
+
 
+def build_groups(user: User, group_names: list[str]) -> list[dict]:
+    inbox = group_inbox(user.id, group_names)
     result = []
-    for group_name in available_groups_for(user):
-        last_msg = ChatMessage.query.filter_by(group_name=group_name).order_by(ChatMessage.created_at.desc()).first()
+    for group_name in group_names:
+        conversation = inbox.get(group_name)
         result.append({
             'name': group_name,
-            'last_message': last_msg.message if last_msg else None,
-            'last_message_time': last_msg.created_at.isoformat() if last_msg else None,
-            'sender_name': last_msg.sender.name if last_msg else None,
+            'last_message': conversation.last_message if conversation else None,
+            'last_message_time': conversation.last_message_at.isoformat() if conversation else None,
+            'sender_name': conversation.sender_name if conversation else None,
             'can_send': can_send_to_group(user, group_name),
-            'unread_count': unread_group_count(uid, group_name),
+            'unread_count': conversation.unread_count if conversation else 0,
         })
 
     result.sort(
@@ -334,4 +595,4 @@ def groups():
         ),
         reverse=False
     )
-    return jsonify(result)
+    return result
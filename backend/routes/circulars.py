@@ -1,15 +1,25 @@
+import base64
+import json
 import os
 from datetime import datetime
 
-from flask import Blueprint, current_app, jsonify, request, send_from_directory
+from flask import Blueprint, Response, current_app, jsonify, request, send_from_directory, stream_with_context
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from sqlalchemy import or_
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
 
 from models import ActivityLog, Circular, Notification, Submission, User, db
+from services import events
+from services.blob_store import blob_key, release_references, store_upload
+from services.compliance_rollup import rekey_circular, retract_submissions, rollup_by
+from services.notification_fanout import audience_contacts, notify_circular
+from services.response_cache import cached_payload
+from services.search import extract_document_text, search_hits
 from utils.categorizer import auto_categorize
 from utils.deadline_parser import extract_deadline
 from utils.email_sender import send_notification_email
+from utils.http_cache import conditional_json, make_etag, stamp
 
 circulars_bp = Blueprint('circulars', __name__)
 
@@ -28,6 +38,12 @@ CATEGORIES = [
     'Other',
 ]
 
+SERIALIZE_BATCH_SIZE = 500
+STREAM_BATCH_SIZE = 100
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
 
 def current_user():
     return User.query.get_or_404(int(get_jwt_identity()))
@@ -49,37 +65,99 @@ def visible_circulars_query(user: User):
     if user.role in ('admin', 'principal'):
         return query
 
-    if user.department:
-        return query.filter(
-            or_(
-                Circular.target_departments == 'all',
-                Circular.target_departments.ilike(f'%{user.department}%'),
-            )
-        )
+    return query.filter(Circular.visible_to_department(user.department))
+
+
+def serialize_circulars(circulars: list[Circular], user_id: int) -> list[dict]:
+    if not circulars:
+        return []
 
-    return query.filter(Circular.target_departments == 'all')
+    circular_ids = [circular.id for circular in circulars]
+    counts = Circular.submission_counts(circular_ids)
+    my_submissions = {
+        submission.circular_id: submission
+        for submission in Submission.query.filter(
+            Submission.circular_id.in_(circular_ids),
+            Submission.user_id == user_id,
+        ).order_by(Submission.id.desc())
+    }
+
+    payloads = []
+    for circular in circulars:
+        payload = circular.to_dict(counts=counts.get(circular.id, (0, 0)))
+        submission = my_submissions.get(circular.id)
+        payload['my_submission'] = submission.to_dict() if submission else None
+        payloads.append(payload)
+
+    return payloads
 
 
 def serialize_circular(circular: Circular, user_id: int):
-    payload = circular.to_dict()
-    submission = Submission.query.filter_by(circular_id=circular.id, user_id=user_id).first()
-    payload['my_submission'] = submission.to_dict() if submission else None
-    return payload
+    return serialize_circulars([circular], user_id)[0]
 
 
-def target_users_for_circular(uploader_id: int, target_departments: str):
-    if target_departments == 'all':
-        return User.query.filter(User.id != uploader_id, User.is_active.is_(True)).all()
+def encode_cursor(ordering: str, sort_value, circular_id: int) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([ordering, sort_value, circular_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
 
-    departments = [dept.strip() for dept in target_departments.split(',') if dept.strip()]
-    if not departments:
-        return []
 
-    return User.query.filter(
-        User.department.in_(departments),
-        User.id != uploader_id,
-        User.is_active.is_(True),
-    ).all()
+def decode_cursor(token: str, ordering: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        cursor_ordering, sort_value, circular_id = json.loads(raw)
+        if cursor_ordering != ordering:
+            raise ValueError('Cursor does not match the requested ordering')
+        if ordering == 'created':
+            sort_value = datetime.fromisoformat(sort_value)
+        else:
+            sort_value = float(sort_value)
+        return sort_value, int(circular_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError('Invalid cursor') from exc
+
+
+def wants_ndjson() -> bool:
+    if request.args.get('format', '').strip().lower() == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def iter_batches(query, batch_size: int):
+    batch = []
+    for item in query.yield_per(batch_size):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_circulars(query, user_id: int, ordering: str, limit: int | None):
+    """Yield NDJSON lines for (circular, sort_value) rows, then the next cursor if any."""
+    emitted = 0
+    last = None
+    has_more = False
+
+    for batch in iter_batches(query, STREAM_BATCH_SIZE):
+        if limit is not None and emitted + len(batch) > limit:
+            batch = batch[:limit - emitted]
+            has_more = True
+
+        for payload in serialize_circulars([row[0] for row in batch], user_id):
+            yield current_app.json.dumps(payload) + '\n'
+
+        if batch:
+            emitted += len(batch)
+            last = batch[-1]
+        if has_more:
+            break
+
+    if has_more and last is not None:
+        next_cursor = encode_cursor(ordering, last[1], last[0].id)
+        yield current_app.json.dumps({'next_cursor': next_cursor}) + '\n'
 
 
 def summary_cache_path(circular_id: int) -> str:
@@ -96,7 +174,9 @@ def get_cached_summary(circular: Circular) -> str | None:
     cache_mtime = os.path.getmtime(cache_path)
     circular_mtime = circular.updated_at.timestamp() if circular.updated_at else 0
     file_mtime = 0
-    if circular.file_path and os.path.exists(circular.file_path):
+    # A blob never changes in place (new content is a new path, which bumps updated_at), and its
+    # mtime is refreshed whenever another upload dedupes onto it, so only legacy files are checked
+    if circular.file_path and blob_key(circular.file_path) is None and os.path.exists(circular.file_path):
         file_mtime = os.path.getmtime(circular.file_path)
 
     if cache_mtime < max(circular_mtime, file_mtime):
@@ -141,13 +221,11 @@ def create_circular():
     uploaded_file = request.files.get('file')
     if uploaded_file and uploaded_file.filename:
         file_name = secure_filename(uploaded_file.filename)
-        upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'circulars')
-        os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(
-            upload_dir,
-            f'{datetime.utcnow().strftime("%Y%m%d%H%M%S")}_{file_name}',
-        )
-        uploaded_file.save(file_path)
+        file_path = store_upload(uploaded_file)
+
+    document_text = None
+    if file_path and current_app.config.get('SEARCH_INDEX_DOCUMENTS'):
+        document_text = extract_document_text(file_path)
 
     circular = Circular(
         title=title,
@@ -160,6 +238,7 @@ def create_circular():
         target_departments=target_departments,
         file_path=file_path,
         file_name=file_name,
+        document_text=document_text,
         uploaded_by=user.id,
     )
     db.session.add(circular)
@@ -170,20 +249,17 @@ def create_circular():
         f'Deadline: {deadline.strftime("%d %b %Y")}' if deadline else 'No deadline set.'
     )
 
-    for target in target_users_for_circular(user.id, target_departments):
-        db.session.add(
-            Notification(
-                user_id=target.id,
-                circular_id=circular.id,
-                title=f'New Circular: {title}',
-                message=notification_message,
-                type='circular',
-                is_read=False,
-            )
-        )
+    notify_circular(
+        circular.id,
+        f'New Circular: {title}',
+        notification_message,
+        target_departments=target_departments,
+        exclude_user_id=user.id,
+    )
+    for email, name in audience_contacts(target_departments, exclude_user_id=user.id):
         send_notification_email(
-            to_email=target.email,
-            name=target.name,
+            to_email=email,
+            name=name,
             title=f'New Circular: {title}',
             message=notification_message,
         )
@@ -198,6 +274,8 @@ def create_circular():
         )
     )
     db.session.commit()
+    events.publish(events.CIRCULAR_CREATED, circular_id=circular.id)
+    events.publish(events.NOTIFICATIONS_CREATED, target_departments=target_departments, title=f'New Circular: {title}')
 
     return jsonify(circular.to_dict()), 201
 
@@ -207,6 +285,28 @@ def create_circular():
 @jwt_required()
 def list_circulars():
     user = current_user()
+    etag = make_etag(
+        'circulars', user.id, user.role, user.department,
+        sorted(request.args.items(multi=True)), wants_ndjson(), *circulars_version(),
+    )
+    return conditional_json(etag, lambda: circular_list_response(user))
+
+
+def circulars_version() -> tuple:
+    """Changes whenever a circular or submission is added, edited, reviewed or removed."""
+    return tuple(db.session.execute(select(
+        stamp(func.count(Circular.id)),
+        stamp(func.max(Circular.id)),
+        stamp(func.max(Circular.updated_at)),
+        stamp(func.count(Submission.id)),
+        stamp(func.max(Submission.id)),
+        stamp(func.max(Submission.submitted_at)),
+        stamp(func.max(Submission.reviewed_at)),
+        stamp(func.max(User.updated_at)),  # uploader names
+    )).one())
+
+
+def circular_list_response(user: User):
     query = visible_circulars_query(user)
 
     category = request.args.get('category', '').strip()
@@ -223,19 +323,76 @@ def list_circulars():
         query = query.filter(Circular.regulation_type == regulation_type)
     if academic_year and academic_year not in ('all', 'all_years'):
         query = query.filter(Circular.academic_year == academic_year)
+
+    # Search results are ordered by relevance; everything else newest first.
+    ordering = 'created'
+    sort_column = Circular.created_at
     if search:
-        pattern = f'%{search}%'
-        query = query.filter(
-            or_(
-                Circular.title.ilike(pattern),
-                Circular.description.ilike(pattern),
-                Circular.category.ilike(pattern),
-                Circular.regulation_type.ilike(pattern),
+        hits = search_hits(search)
+        if hits is not None:
+            ordering = 'rank'
+            sort_column = hits.c.rank
+            query = query.join(hits, hits.c.circular_id == Circular.id)
+        else:
+            pattern = f'%{search}%'
+            query = query.filter(
+                or_(
+                    Circular.title.ilike(pattern),
+                    Circular.description.ilike(pattern),
+                    Circular.category.ilike(pattern),
+                    Circular.regulation_type.ilike(pattern),
+                )
             )
+
+    # Keyset pagination on (sort value, id); legacy callers without limit/cursor get the full array.
+    cursor = request.args.get('cursor', '').strip()
+    limit = request.args.get('limit', type=int)
+    paginated = bool(cursor) or limit is not None
+
+    if cursor:
+        try:
+            sort_value, circular_id = decode_cursor(cursor, ordering)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        if ordering == 'rank':
+            query = query.filter(
+                or_(sort_column > sort_value, and_(sort_column == sort_value, Circular.id < circular_id))
+            )
+        else:
+            query = query.filter(
+                or_(sort_column < sort_value, and_(sort_column == sort_value, Circular.id < circular_id))
+            )
+
+    query = query.add_columns(sort_column).options(joinedload(Circular.uploader)).order_by(
+        sort_column.asc() if ordering == 'rank' else sort_column.desc(),
+        Circular.id.desc(),
+    )
+
+    if paginated:
+        limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+        query = query.limit(limit + 1)
+
+    if wants_ndjson():
+        return Response(
+            stream_with_context(stream_circulars(query, user.id, ordering, limit if paginated else None)),
+            mimetype=NDJSON_MIMETYPE,
         )
 
-    circulars = query.order_by(Circular.created_at.desc()).all()
-    return jsonify([serialize_circular(circular, user.id) for circular in circulars]), 200
+    rows = query.all()
+    next_cursor = None
+    if paginated and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(ordering, rows[-1][1], rows[-1][0].id)
+    circulars = [row[0] for row in rows]
+
+    payload = []
+    for start in range(0, len(circulars), SERIALIZE_BATCH_SIZE):
+        payload.extend(serialize_circulars(circulars[start:start + SERIALIZE_BATCH_SIZE], user.id))
+
+    if not paginated:
+        return jsonify(payload), 200
+    return jsonify({'items': payload, 'next_cursor': next_cursor}), 200
 
 
 @circulars_bp.route('/<int:circular_id>', methods=['GET'])
@@ -258,6 +415,7 @@ def update_circular(circular_id):
 
     circular = Circular.query.get_or_404(circular_id)
     data = request.get_json() or {}
+    changes = {}
 
     for field in (
         'title',
@@ -275,10 +433,12 @@ def update_circular(circular_id):
                 value = 'all'
             if field == 'academic_year' and value == '':
                 value = None
-            setattr(circular, field, value)
+            changes[field] = value
 
     if 'deadline' in data:
-        circular.deadline = parse_deadline(data.get('deadline') or '')
+        changes['deadline'] = parse_deadline(data.get('deadline') or '')
+
+    rekey_circular(circular, changes)
 
     db.session.add(
         ActivityLog(
@@ -290,6 +450,7 @@ def update_circular(circular_id):
         )
     )
     db.session.commit()
+    events.publish(events.CIRCULAR_UPDATED, circular_id=circular.id)
 
     return jsonify(circular.to_dict())
 
@@ -305,6 +466,10 @@ def delete_circular(circular_id):
     circular_title = circular.title
 
     Notification.query.filter_by(circular_id=circular_id).delete()
+    retract_submissions(Submission.circular_id == circular_id)
+    release_references(db.session.scalars(
+        select(Submission.file_path).where(Submission.circular_id == circular_id)
+    ).all() + [circular.file_path])
     Submission.query.filter_by(circular_id=circular_id).delete()
 
     db.session.delete(circular)
@@ -318,6 +483,7 @@ def delete_circular(circular_id):
         )
     )
     db.session.commit()
+    events.publish(events.CIRCULAR_DELETED, circular_id=circular_id)
 
     return jsonify({'message': 'Circular deleted'})
 
@@ -326,22 +492,55 @@ def delete_circular(circular_id):
 @jwt_required()
 def category_summary():
     user = current_user()
-    visible_circulars = visible_circulars_query(user).all()
-    visible_by_category = {category: [] for category in CATEGORIES}
+    return jsonify(cached_payload('circulars.category_summary', user, lambda: build_category_summary(user)))
 
-    for circular in visible_circulars:
-        visible_by_category.setdefault(circular.category or 'Other', []).append(circular)
 
-    results = []
-    for category, circulars in visible_by_category.items():
-        total = len(circulars)
-        active = len([item for item in circulars if item.status == 'active'])
-        completed = len([item for item in circulars if item.status == 'completed'])
-        total_submissions = sum(len(item.submissions) for item in circulars)
-        approved_submissions = sum(
-            len([submission for submission in item.submissions if submission.status == 'approved'])
-            for item in circulars
+def add_category_counts(buckets: dict, category: str | None, counts: tuple):
+    """Add `counts` into the category's bucket; missing and empty categories share 'Other'."""
+    key = category or 'Other'
+    buckets[key] = tuple(current + added for current, added in zip(buckets.get(key, (0,) * len(counts)), counts))
+
+
+def build_category_summary(user: User) -> list[dict]:
+    circular_counts = {category: (0, 0, 0) for category in CATEGORIES}
+    rows = (
+        visible_circulars_query(user)
+        .with_entities(
+            Circular.category,
+            func.count(Circular.id),
+            func.sum(case((Circular.status == 'active', 1), else_=0)),
+            func.sum(case((Circular.status == 'completed', 1), else_=0)),
         )
+        .group_by(Circular.category)
+        .order_by(func.min(Circular.id))
+        .all()
+    )
+    for category, total, active, completed in rows:
+        add_category_counts(circular_counts, category, (total, int(active or 0), int(completed or 0)))
+
+    submission_counts = {}
+    if user.role in ('admin', 'principal'):
+        # Everything is visible, so the rollup answers directly.
+        for category, counts in rollup_by('category').items():
+            add_category_counts(submission_counts, category, (counts['total'], counts['approved']))
+    else:
+        # Visibility depends on circular targeting, which the rollup is not keyed by.
+        for category, total, approved in (
+            visible_circulars_query(user)
+            .join(Submission, Submission.circular_id == Circular.id)
+            .with_entities(
+                Circular.category,
+                func.count(Submission.id),
+                func.sum(case((Submission.status == 'approved', 1), else_=0)),
+            )
+            .group_by(Circular.category)
+            .all()
+        ):
+            add_category_counts(submission_counts, category, (total, int(approved or 0)))
+
+    results = []
+    for category, (total, active, completed) in circular_counts.items():
+        total_submissions, approved_submissions = submission_counts.get(category, (0, 0))
 
         results.append(
             {
@@ -359,7 +558,7 @@ def category_summary():
             }
         )
 
-    return jsonify(results)
+    return results
 
 
 @circulars_bp.route('/<int:circular_id>/summarize', methods=['POST'])
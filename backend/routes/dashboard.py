@@ -229,7 +229,11 @@
 #     return jsonify([l.to_dict() for l in logs])
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from models import db, User, Circular, Submission, Notification, ActivityLog
+from services.compliance_rollup import EMPTY_COUNTS, rollup_by
+from services.response_cache import cache_stats, cached_payload
+from services.dashboard_stats import count_where, department_compliance, headline_counters, user_submission_counters
 from datetime import datetime, timedelta
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -244,15 +248,10 @@ def visible_circulars_query(user):
     if user.role in ('admin', 'principal'):
         return query
 
-    if user.role in ('hod', 'faculty') and user.department:
-        return query.filter(
-            db.or_(
-                Circular.target_departments == 'all',
-                Circular.target_departments.ilike(f'%{user.department}%')
-            )
-        )
+    if user.role in ('hod', 'faculty'):
+        return query.filter(Circular.visible_to_department(user.department))
 
-    return query.filter(Circular.target_departments == 'all')
+    return query.filter(Circular.visible_to_department(None))
 
 
 def announcement_source(circular):
@@ -263,17 +262,25 @@ def announcement_source(circular):
 
 
 def build_accreditation_payload():
+    circular_counts = {
+        regulation_type: (total, int(completed), int(active))
+        for regulation_type, total, completed, active in db.session.query(
+            Circular.regulation_type,
+            db.func.count(Circular.id),
+            count_where(Circular.status == 'completed'),
+            count_where(Circular.status == 'active'),
+        ).filter(
+            Circular.regulation_type.in_(ACCREDITATION_REGULATION_TYPES)
+        ).group_by(Circular.regulation_type)
+    }
+    submission_counts = rollup_by('regulation_type', regulation_type=ACCREDITATION_REGULATION_TYPES)
+
     result = []
     for regulation_type in ACCREDITATION_REGULATION_TYPES:
-        circulars = Circular.query.filter_by(regulation_type=regulation_type).all()
-        total = len(circulars)
-        completed = len([c for c in circulars if c.status == 'completed'])
-        active = len([c for c in circulars if c.status == 'active'])
-        total_subs = sum(len(c.submissions) for c in circulars)
-        approved_subs = sum(
-            len([submission for submission in circular.submissions if submission.status == 'approved'])
-            for circular in circulars
-        )
+        total, completed, active = circular_counts.get(regulation_type, (0, 0, 0))
+        submissions = submission_counts.get(regulation_type, EMPTY_COUNTS)
+        total_subs = submissions['total']
+        approved_subs = submissions['approved']
 
         result.append({
             'regulation_type': regulation_type,
@@ -294,60 +301,68 @@ def stats():
     uid = int(get_jwt_identity())
     user = User.query.get_or_404(uid)
 
+    result = cached_payload('dashboard.stats', user, lambda: build_stats_payload(user))
+
+    # ── Per-user data (never cached) ───────────────────────────────
+    announcement_ids = [item['id'] for item in result['announcements']]
+    result['unread_announcements'] = Notification.query.filter(
+        Notification.user_id == uid,
+        Notification.type == 'circular',
+        Notification.is_read.is_(False),
+        Notification.circular_id.in_(announcement_ids) if announcement_ids else False
+    ).count()
+
+    if user.role == 'faculty':
+        result.update(user_submission_counters(uid))
+
+        # Circulars requiring my action
+        if user.department:
+            already_submitted = db.exists().where(
+                Submission.circular_id == Circular.id,
+                Submission.user_id == uid,
+            )
+            pending_circulars = Circular.query.options(joinedload(Circular.uploader)).filter(
+                Circular.status == 'active',
+                ~already_submitted,
+                Circular.visible_to_department(user.department),
+            ).all()
+        else:
+            pending_circulars = []
+        result['pending_circulars'] = [c.to_summary_dict() for c in pending_circulars]
+
+    return jsonify(result)
+
+
+def build_stats_payload(user):
+    """The part of /stats shared by every user with the same role and department."""
     now = datetime.utcnow()
-    thirty_days = now - timedelta(days=30)
 
     # ── Common stats ───────────────────────────────────────────────
-    total_circulars = Circular.query.count()
-    active_circulars = Circular.query.filter_by(status='active').count()
-    total_submissions = Submission.query.count()
-    pending_submissions = Submission.query.filter_by(status='submitted').count()
-    approved_submissions = Submission.query.filter_by(status='approved').count()
-    rejected_submissions = Submission.query.filter_by(status='rejected').count()
-    total_users = User.query.filter_by(is_active=True).count()
+    result = headline_counters(now)
 
     # Upcoming deadlines
-    upcoming = Circular.query.filter(
+    upcoming = Circular.query.options(joinedload(Circular.uploader)).filter(
         Circular.deadline >= now,
         Circular.deadline <= now + timedelta(days=14),
         Circular.status == 'active'
     ).order_by(Circular.deadline.asc()).limit(10).all()
 
-    # Overdue circulars
-    overdue = Circular.query.filter(
+    # Overdue circulars (overdue_count comes from the headline counters)
+    overdue = Circular.query.options(joinedload(Circular.uploader)).filter(
         Circular.deadline < now,
         Circular.status == 'active'
-    ).all()
+    ).order_by(Circular.deadline.asc()).limit(10).all()
 
     # Recent activity
-    recent_activity = ActivityLog.query.order_by(ActivityLog.created_at.desc()).limit(20).all()
-
-    # Compliance rate
-    compliance_rate = round(approved_submissions / total_submissions * 100, 1) if total_submissions > 0 else 0
+    recent_activity = ActivityLog.query.options(joinedload(ActivityLog.user)) \
+        .order_by(ActivityLog.created_at.desc()).limit(20).all()
 
     announcement_circulars = visible_circulars_query(user) \
         .order_by(Circular.created_at.desc()).limit(8).all()
 
-    announcement_ids = [item.id for item in announcement_circulars]
-    unread_announcement_count = Notification.query.filter(
-        Notification.user_id == uid,
-        Notification.type == 'circular',
-        Notification.is_read.is_(False),
-        Notification.circular_id.in_(announcement_ids) if announcement_ids else False
-    ).count()
-
-    result = {
-        'total_circulars': total_circulars,
-        'active_circulars': active_circulars,
-        'total_submissions': total_submissions,
-        'pending_submissions': pending_submissions,
-        'approved_submissions': approved_submissions,
-        'rejected_submissions': rejected_submissions,
-        'compliance_rate': compliance_rate,
-        'total_users': total_users,
-        'overdue_count': len(overdue),
-        'upcoming_deadlines': [c.to_dict() for c in upcoming],
-        'overdue_circulars': [c.to_dict() for c in overdue],
+    result.update({
+        'upcoming_deadlines': [c.to_summary_dict() for c in upcoming],
+        'overdue_circulars': [c.to_summary_dict() for c in overdue],
         'recent_activity': [a.to_dict() for a in recent_activity],
         'announcements': [
             {
@@ -360,74 +375,30 @@ def stats():
             }
             for c in announcement_circulars
         ],
-        'unread_announcements': unread_announcement_count,
-    }
+    })
 
     # ── Role-specific data ─────────────────────────────────────────
     if user.role in ('admin', 'principal'):
         # Department-wise compliance
-        dept_stats = []
-        for dept in DEPARTMENTS:
-            dept_users = User.query.filter_by(department=dept, is_active=True).all()
-            dept_user_ids = [u.id for u in dept_users]
-            if dept_user_ids:
-                dept_subs = Submission.query.filter(Submission.user_id.in_(dept_user_ids)).all()
-                dept_approved = len([s for s in dept_subs if s.status == 'approved'])
-                dept_total = len(dept_subs)
-                dept_rate = round(dept_approved / dept_total * 100, 1) if dept_total > 0 else 0
-            else:
-                dept_total = 0
-                dept_approved = 0
-                dept_rate = 0
-
-            dept_stats.append({
-                'department': dept,
-                'user_count': len(dept_users),
-                'total_submissions': dept_total,
-                'approved_submissions': dept_approved,
-                'compliance_rate': dept_rate,
-            })
-        result['department_stats'] = dept_stats
+        dept_stats = department_compliance(DEPARTMENTS)
+        result['department_stats'] = [dept_stats[dept] for dept in DEPARTMENTS]
 
         # Pending reviews
-        pending_review = Submission.query.filter_by(status='submitted') \
-            .order_by(Submission.submitted_at.desc()).limit(10).all()
+        pending_review = Submission.query.options(
+            joinedload(Submission.circular),
+            joinedload(Submission.user),
+        ).filter_by(status='submitted').order_by(Submission.submitted_at.desc()).limit(10).all()
         result['pending_reviews'] = [s.to_dict() for s in pending_review]
 
     elif user.role == 'hod':
         # Department stats
-        dept_users = User.query.filter_by(department=user.department, is_active=True).all()
-        dept_user_ids = [u.id for u in dept_users]
-        dept_subs = Submission.query.filter(Submission.user_id.in_(dept_user_ids)).all()
-        result['department_users'] = len(dept_users)
-        result['department_submissions'] = len(dept_subs)
-        result['department_approved'] = len([s for s in dept_subs if s.status == 'approved'])
-        result['department_compliance'] = round(
-            result['department_approved'] / len(dept_subs) * 100, 1) if dept_subs else 0
-
-    elif user.role == 'faculty':
-        my_subs = Submission.query.filter_by(user_id=uid).all()
-        result['my_total_submissions'] = len(my_subs)
-        result['my_approved'] = len([s for s in my_subs if s.status == 'approved'])
-        result['my_pending'] = len([s for s in my_subs if s.status in ('submitted', 'pending')])
-        result['my_rejected'] = len([s for s in my_subs if s.status == 'rejected'])
+        dept = department_compliance([user.department]).get(user.department) or {}
+        result['department_users'] = dept.get('user_count', 0)
+        result['department_submissions'] = dept.get('total_submissions', 0)
+        result['department_approved'] = dept.get('approved_submissions', 0)
+        result['department_compliance'] = dept.get('compliance_rate', 0)
 
-        # Circulars requiring my action
-        my_circular_ids = [s.circular_id for s in my_subs]
-        if user.department:
-            pending_circulars = Circular.query.filter(
-                Circular.status == 'active',
-                ~Circular.id.in_(my_circular_ids) if my_circular_ids else True,
-                db.or_(
-                    Circular.target_departments == 'all',
-                    Circular.target_departments.ilike(f'%{user.department}%')
-                )
-            ).all()
-        else:
-            pending_circulars = []
-        result['pending_circulars'] = [c.to_dict() for c in pending_circulars]
-
-    return jsonify(result)
+    return result
 
 # ── Accreditation readiness ──────────────────────────────────────────
 
@@ -435,8 +406,19 @@ def stats():
 @jwt_required()
 def accreditation():
     uid = int(get_jwt_identity())
-    User.query.get_or_404(uid)
-    return jsonify(build_accreditation_payload())
+    user = User.query.get_or_404(uid)
+    return jsonify(cached_payload('dashboard.accreditation', user, build_accreditation_payload))
+
+# ── Response cache counters ──────────────────────────────────────────
+
+@dashboard_bp.route('/cache-stats', methods=['GET'])
+@jwt_required()
+def response_cache_stats():
+    uid = int(get_jwt_identity())
+    user = User.query.get_or_404(uid)
+    if user.role not in ('admin', 'principal'):
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify(cache_stats())
 
 # ── Activity log ─────────────────────────────────────────────────────
 
@@ -1,9 +1,20 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Notification, User
+from utils.http_cache import conditional_json, make_etag
 
 notifications_bp = Blueprint('notifications', __name__)
 
+
+def notifications_version(uid: int):
+    """(count, max id, newest created_at, unread) for a user's notifications, off the user index."""
+    return tuple(db.session.query(
+        db.func.count(Notification.id),
+        db.func.max(Notification.id),
+        db.func.max(Notification.created_at),
+        db.func.sum(db.case((Notification.is_read.is_(False), 1), else_=0)),
+    ).filter(Notification.user_id == uid).one())
+
 # ── List notifications ───────────────────────────────────────────────
 
 @notifications_bp.route('', methods=['GET'])
@@ -11,13 +22,17 @@ notifications_bp = Blueprint('notifications', __name__)
 def list_notifications():
     uid = int(get_jwt_identity())
     unread_only = request.args.get('unread', '').lower() == 'true'
+    etag = make_etag('notifications', uid, unread_only, *notifications_version(uid))
+
+    def build():
+        query = Notification.query.filter_by(user_id=uid)
+        if unread_only:
+            query = query.filter_by(is_read=False)
 
-    query = Notification.query.filter_by(user_id=uid)
-    if unread_only:
-        query = query.filter_by(is_read=False)
+        notifications = query.order_by(Notification.created_at.desc()).all()
+        return [n.to_dict() for n in notifications]
 
-    notifications = query.order_by(Notification.created_at.desc()).all()
-    return jsonify([n.to_dict() for n in notifications])
+    return conditional_json(etag, build)
 
 # ── Mark as read ─────────────────────────────────────────────────────
 
@@ -48,8 +63,11 @@ def mark_all_read():
 @jwt_required()
 def unread_count():
     uid = int(get_jwt_identity())
-    count = Notification.query.filter_by(user_id=uid, is_read=False).count()
-    return jsonify({'count': count})
+    version = notifications_version(uid)
+    return conditional_json(
+        make_etag('unread-count', uid, *version),
+        lambda: {'count': int(version[3] or 0)},
+    )
 
 # ── Delete notification ──────────────────────────────────────────────
 
@@ -6,6 +6,7 @@ from flask import Blueprint, current_app, redirect, request, session
 from flask_jwt_extended import create_access_token
 
 from models import User, db
+from services.compliance_rollup import change_user_department
 
 oauth_bp = Blueprint('oauth', __name__)
 
@@ -73,7 +74,7 @@ def process_user(email: str, name: str, frontend_url: str):
         user.name = name or user.name or email.split('@')[0]
         user.role = role
         if department or not user.department:
-            user.department = department
+            change_user_department(user, department)
         user.is_verified = True
     else:
         user = User(
@@ -0,0 +1,86 @@
+import json
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from models import User, db
+from routes.chat import available_groups_for
+from services.realtime import (
+    ALL_CHANNEL,
+    DEFAULT_HEARTBEAT_SECONDS,
+    DEFAULT_QUEUE_SIZE,
+    close_subscription,
+    department_channel,
+    group_channel,
+    open_subscription,
+    user_channel,
+)
+
+realtime_bp = Blueprint('realtime', __name__)
+
+DEFAULT_STREAM_TOKEN_SECONDS = 60
+
+
+def stream_tokens() -> URLSafeTimedSerializer:
+    # Signed with its own salt, so a stream token is useless as an API bearer token and vice versa
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='realtime-stream')
+
+
+def channels_for(user: User) -> list[str]:
+    channels = [user_channel(user.id), ALL_CHANNEL]
+    if user.department:
+        channels.append(department_channel(user.department))
+    channels.extend(group_channel(group_name) for group_name in available_groups_for(user))
+    return channels
+
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@realtime_bp.route('/token', methods=['POST'])
+@jwt_required()
+def stream_token():
+    # EventSource cannot send an Authorization header, so the stream URL carries
+    # this short-lived token instead of the long-lived login JWT
+    uid = int(get_jwt_identity())
+    expires_in = current_app.config.get('REALTIME_TOKEN_SECONDS', DEFAULT_STREAM_TOKEN_SECONDS)
+    return jsonify({'token': stream_tokens().dumps(uid), 'expires_in': expires_in})
+
+
+@realtime_bp.route('/stream', methods=['GET'])
+def stream():
+    # Only checked on connect; an open stream outlives its token
+    try:
+        uid = int(stream_tokens().loads(
+            request.args.get('token', ''),
+            max_age=current_app.config.get('REALTIME_TOKEN_SECONDS', DEFAULT_STREAM_TOKEN_SECONDS),
+        ))
+    except (BadSignature, TypeError, ValueError):
+        return jsonify({'error': 'A valid stream token is required'}), 401
+
+    user = db.session.get(User, uid)
+    if user is None or not user.is_active:
+        return jsonify({'error': 'A valid token is required'}), 401
+
+    heartbeat = current_app.config.get('REALTIME_HEARTBEAT_SECONDS', DEFAULT_HEARTBEAT_SECONDS)
+    subscription = open_subscription(
+        channels_for(user), current_app.config.get('REALTIME_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+    )
+    db.session.remove()  # the stream outlives the request; give the connection back now
+
+    def events():
+        try:
+            yield sse('ready', {'user_id': uid})
+            while not subscription.overflowed:
+                delta = subscription.next(timeout=heartbeat)
+                # The comment line keeps proxies from timing the stream out and surfaces dead clients
+                yield ': keep-alive\n\n' if delta is None else sse(*delta)
+        finally:
+            close_subscription(subscription)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
@@ -1,54 +1,91 @@
-import io
+import os
 from flask import Blueprint, request, jsonify, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, Circular, Submission
-from utils.pdf_generator import generate_annual_report, generate_department_report
+from models import db, User, Circular, ReportJob
+from services.compliance_rollup import EMPTY_COUNTS, rollup_by, rollup_totals
+from services.dashboard_stats import count_where
+from services.report_jobs import request_report
+from services.report_data import REPORT_DEPARTMENTS
+from services.response_cache import cached_payload
 
 reports_bp = Blueprint('reports', __name__)
 
-# ── Generate annual report (PDF) ────────────────────────────────────
+# ── Report jobs (PDF rendered in the background) ───────────────────
 
-@reports_bp.route('/annual', methods=['GET'])
+def can_view_report(user, report_type: str, department: str) -> bool:
+    if report_type == 'annual':
+        return user.role in ('admin', 'principal')
+    if user.role in ('admin', 'principal'):
+        return True
+    return user.role == 'hod' and department == user.department
+
+
+def report_job_response(job: ReportJob):
+    """200 with the job once it is finished (or failed), 202 while it is queued or rendering."""
+    payload = job.to_dict()
+    payload['status_url'] = f'/api/reports/jobs/{job.id}'
+    payload['download_url'] = f'/api/reports/jobs/{job.id}/download' if job.status == 'done' else None
+    return jsonify(payload), 202 if job.status in ('queued', 'running') else 200
+
+
+def report_param(key: str, default=None):
+    """From the JSON body, falling back to the query string."""
+    data = request.get_json(silent=True) or {}
+    return data.get(key) or request.args.get(key) or default
+
+
+@reports_bp.route('/annual', methods=['POST'])
 @jwt_required()
 def annual_report():
     uid = int(get_jwt_identity())
     user = User.query.get_or_404(uid)
-    if user.role not in ('admin', 'principal'):
+    if not can_view_report(user, 'annual', ''):
         return jsonify({'error': 'Access denied'}), 403
 
-    academic_year = request.args.get('academic_year', '2024-2025')
-    pdf_buffer = generate_annual_report(academic_year)
+    academic_year = report_param('academic_year', '2024-2025')
+    return report_job_response(request_report('annual', academic_year, requested_by=uid))
 
-    return send_file(
-        pdf_buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=f'RCMS_Annual_Report_{academic_year}.pdf'
-    )
-
-# ── Generate department report (PDF) ────────────────────────────────
 
-@reports_bp.route('/department', methods=['GET'])
+@reports_bp.route('/department', methods=['POST'])
 @jwt_required()
 def department_report():
     uid = int(get_jwt_identity())
     user = User.query.get_or_404(uid)
-    if user.role not in ('admin', 'principal', 'hod'):
+
+    department = report_param('department', user.department)
+    academic_year = report_param('academic_year', '2024-2025')
+
+    if not can_view_report(user, 'department', department):
         return jsonify({'error': 'Access denied'}), 403
 
-    department = request.args.get('department', user.department)
-    academic_year = request.args.get('academic_year', '2024-2025')
+    return report_job_response(request_report('department', academic_year, department, requested_by=uid))
+
 
-    if user.role == 'hod' and department != user.department:
+@reports_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def report_job_status(job_id):
+    user = User.query.get_or_404(int(get_jwt_identity()))
+    job = ReportJob.query.get_or_404(job_id)
+    if not can_view_report(user, job.report_type, job.department):
         return jsonify({'error': 'Access denied'}), 403
+    return report_job_response(job)
+
 
-    pdf_buffer = generate_department_report(department, academic_year)
+@reports_bp.route('/jobs/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_report(job_id):
+    user = User.query.get_or_404(int(get_jwt_identity()))
+    job = ReportJob.query.get_or_404(job_id)
+    if not can_view_report(user, job.report_type, job.department):
+        return jsonify({'error': 'Access denied'}), 403
+    if job.status != 'done' or not job.file_path or not os.path.exists(job.file_path):
+        return jsonify({'error': 'Report is not ready', 'status': job.status}), 409
 
     return send_file(
-        pdf_buffer,
+        job.file_path,
         mimetype='application/pdf',
         as_attachment=True,
-        download_name=f'RCMS_Report_{department}_{academic_year}.pdf'
+        download_name=job.download_name,
     )
 
 # ── Report data (JSON) ──────────────────────────────────────────────
@@ -60,51 +97,62 @@ def report_data():
     user = User.query.get_or_404(uid)
 
     academic_year = request.args.get('academic_year', '2024-2025')
-
-    circulars = Circular.query.filter_by(academic_year=academic_year).all()
-    total = len(circulars)
-    completed = len([c for c in circulars if c.status == 'completed'])
-    active = len([c for c in circulars if c.status == 'active'])
-
-    submissions = Submission.query.join(Circular).filter(
-        Circular.academic_year == academic_year
-    ).all()
-    total_subs = len(submissions)
-    approved_subs = len([s for s in submissions if s.status == 'approved'])
-    rejected_subs = len([s for s in submissions if s.status == 'rejected'])
-    pending_subs = len([s for s in submissions if s.status in ('submitted', 'pending')])
+    payload = cached_payload(
+        'reports.data', user,
+        lambda: build_report_data(academic_year),
+        params={'academic_year': academic_year},
+    )
+    return jsonify(payload)
+
+
+def build_report_data(academic_year: str) -> dict:
+    circular_rows = db.session.query(
+        Circular.category,
+        db.func.count(Circular.id),
+        count_where(Circular.status == 'completed'),
+        count_where(Circular.status == 'active'),
+    ).filter(Circular.academic_year == academic_year).group_by(Circular.category).all()
+    total = sum(row[1] for row in circular_rows)
+    completed = sum(int(row[2]) for row in circular_rows)
+    active = sum(int(row[3]) for row in circular_rows)
+
+    submissions = rollup_totals(academic_year=academic_year)
+    total_subs = submissions['total']
+    approved_subs = submissions['approved']
+    rejected_subs = submissions['rejected']
+    pending_subs = submissions['pending']
 
     # Category breakdown
+    category_subs = rollup_by('category', academic_year=academic_year)
     categories = {}
-    for c in circulars:
-        cat = c.category
-        if cat not in categories:
-            categories[cat] = {'total': 0, 'completed': 0, 'active': 0, 'submissions': 0, 'approved': 0}
-        categories[cat]['total'] += 1
-        if c.status == 'completed':
-            categories[cat]['completed'] += 1
-        elif c.status == 'active':
-            categories[cat]['active'] += 1
-        for s in c.submissions:
-            categories[cat]['submissions'] += 1
-            if s.status == 'approved':
-                categories[cat]['approved'] += 1
+    for cat, cat_total, cat_completed, cat_active in circular_rows:
+        counts = category_subs.get(cat, EMPTY_COUNTS)
+        categories[cat] = {
+            'total': cat_total,
+            'completed': int(cat_completed),
+            'active': int(cat_active),
+            'submissions': counts['total'],
+            'approved': counts['approved'],
+        }
 
     # Department breakdown
     departments = {}
-    depts = ['CSE', 'IT', 'ECE', 'EEE', 'MECH', 'CIVIL', 'BIOMEDICAL', 'MTECH CSE']
+    depts = REPORT_DEPARTMENTS
+    user_counts = dict(
+        db.session.query(User.department, db.func.count(User.id))
+        .filter(User.department.in_(depts)).group_by(User.department).all()
+    )
+    dept_subs = rollup_by('department', academic_year=academic_year, department=depts)
     for dept in depts:
-        dept_users = User.query.filter_by(department=dept).all()
-        dept_user_ids = [u.id for u in dept_users]
-        dept_subs = [s for s in submissions if s.user_id in dept_user_ids]
+        counts = dept_subs.get(dept, EMPTY_COUNTS)
         departments[dept] = {
-            'user_count': len(dept_users),
-            'submissions': len(dept_subs),
-            'approved': len([s for s in dept_subs if s.status == 'approved']),
-            'compliance_rate': round(len([s for s in dept_subs if s.status == 'approved']) / len(dept_subs) * 100, 1) if dept_subs else 0,
+            'user_count': user_counts.get(dept, 0),
+            'submissions': counts['total'],
+            'approved': counts['approved'],
+            'compliance_rate': round(counts['approved'] / counts['total'] * 100, 1) if counts['total'] else 0,
         }
 
-    return jsonify({
+    return {
         'academic_year': academic_year,
         'total_circulars': total,
         'completed_circulars': completed,
@@ -116,4 +164,4 @@ def report_data():
         'compliance_rate': round(approved_subs / total_subs * 100, 1) if total_subs > 0 else 0,
         'categories': categories,
         'departments': departments,
-    })
+    }
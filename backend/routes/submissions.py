@@ -231,10 +231,13 @@
 #     subs = Submission.query.filter_by(user_id=uid).order_by(Submission.submitted_at.desc()).all()
 #     return jsonify([s.to_dict() for s in subs])
 import os
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from flask import Blueprint, request, jsonify, send_from_directory
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from models import db, Submission, Circular, User, Notification, ActivityLog
+from services import events
+from services.blob_store import release_references, store_upload
+from services.compliance_rollup import record_submission
 from utils.email_sender import send_notification_email
 from datetime import datetime
 
@@ -268,14 +271,12 @@ def create_submission():
         f = request.files['file']
         if f.filename:
             file_name = secure_filename(f.filename)
-            upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'submissions')
-            os.makedirs(upload_dir, exist_ok=True)
-            file_path = os.path.join(upload_dir,
-                                     f'{uid}_{circular_id}_{datetime.utcnow().strftime("%Y%m%d%H%M%S")}_{file_name}')
-            f.save(file_path)
+            file_path = store_upload(f)
 
+    previous_status = existing.status if existing else None
     if existing and existing.status == 'rejected':
         # Re-submit
+        release_references([existing.file_path])
         existing.file_path = file_path
         existing.file_name = file_name
         existing.remarks = remarks
@@ -293,6 +294,7 @@ def create_submission():
         db.session.add(submission)
 
     db.session.flush()
+    record_submission(circular, user.department, previous_status, submission.status)
 
     # ── Role-based notification hierarchy ──────────────────────────
     # faculty → notify HOD (same dept) + principal (NOT admin directly)
@@ -340,6 +342,9 @@ def create_submission():
                       details=f'Submitted proof for: {circular.title}')
     db.session.add(log)
     db.session.commit()
+    events.publish(events.SUBMISSION_CREATED, submission_id=submission.id, circular_id=circular_id)
+    if notify_targets:
+        events.publish(events.NOTIFICATIONS_CREATED, user_ids=[t.id for t in notify_targets], title='New Submission')
 
     return jsonify(submission.to_dict()), 201
 
@@ -406,8 +411,10 @@ def review_submission(submission_id):
     if action not in ('approve', 'reject'):
         return jsonify({'error': 'Action must be approve or reject'}), 400
 
+    previous_status = submission.status
     submission.status = 'approved' if action == 'approve' else 'rejected'
     submission.admin_remarks = admin_remarks
+    record_submission(submission.circular, submission.user.department, previous_status, submission.status)
     submission.reviewed_at = datetime.utcnow()
     submission.reviewed_by = uid
 
@@ -439,6 +446,9 @@ def review_submission(submission_id):
                       details=f'{action.title()}d submission by {submission.user.name} for {circular.title}')
     db.session.add(log)
     db.session.commit()
+    events.publish(events.SUBMISSION_REVIEWED, submission_id=submission_id, circular_id=circular.id,
+                   user_id=submission.user_id, status=submission.status)
+    events.publish(events.NOTIFICATIONS_CREATED, user_ids=[submission.user_id], title=n.title)
 
     return jsonify(submission.to_dict())
 
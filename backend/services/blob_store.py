@@ -0,0 +1,258 @@
+"""
+Content-addressed attachment store.
+
+Circular, submission and chat attachments and scraped circular PDFs are
+streamed into UPLOAD_FOLDER/blobs/<first two hex digits>/<sha256><extension>,
+hashed chunk by chunk as they are written, so a file is stored once however
+many rows attach it. The `blobs` table counts references: write paths add one
+in the transaction that saves the path and release one when a row stops
+pointing at it. `collect_garbage` (flask gc-blobs) recounts references from
+the referencing tables to repair drift, then deletes blobs nothing uses.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, delete, select, update
+
+from models import Blob, ChatMessage, Circular, Submission, db
+
+BLOB_DIR = 'blobs'
+CHUNK_SIZE = 1024 * 1024
+GRACE_SECONDS = 3600  # younger files may belong to an upload that has not committed yet
+DELETE_CHUNK_SIZE = 500
+
+_BLOB_NAME = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]{1,16})?$')
+
+
+def blob_root(upload_folder: str) -> str:
+    return os.path.join(upload_folder, BLOB_DIR)
+
+
+def blob_path(upload_folder: str, sha256: str, extension: str = '') -> str:
+    return os.path.join(blob_root(upload_folder), sha256[:2], f'{sha256}{extension}')
+
+
+def file_extension(filename: str | None) -> str:
+    extension = os.path.splitext(filename or '')[1].lower()
+    return extension if re.fullmatch(r'\.[a-z0-9]{1,16}', extension) else ''
+
+
+def blob_key(path: str | None) -> str | None:
+    """SHA-256 of the blob a stored file path (absolute or relative to UPLOAD_FOLDER) names, else None."""
+    if not path:
+        return None
+    parts = os.path.normpath(path).split(os.sep)
+    if len(parts) < 3 or parts[-3] != BLOB_DIR:
+        return None
+    match = _BLOB_NAME.match(parts[-1])
+    return match.group(1) if match else None
+
+
+def find_blob_file(upload_folder: str, sha256: str, extension: str = '') -> str | None:
+    path = blob_path(upload_folder, sha256, extension)
+    if os.path.exists(path):
+        return path
+
+    shard = os.path.dirname(path)
+    try:
+        names = os.listdir(shard)
+    except FileNotFoundError:
+        return None
+    for name in names:
+        match = _BLOB_NAME.match(name)
+        if match and match.group(1) == sha256:
+            return os.path.join(shard, name)
+    return None
+
+
+def write_blob(chunks, upload_folder: str, filename: str | None = None) -> str:
+    """
+    Stream `chunks` of bytes into the store, hashing while writing, and return
+    the blob's absolute path. Content already stored is not kept twice. Only
+    touches the filesystem, so it is safe on worker threads; count the
+    reference afterwards with `add_reference`.
+    """
+    root = blob_root(upload_folder)
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    handle = tempfile.NamedTemporaryFile(dir=root, prefix='upload-', suffix='.part', delete=False)
+
+    try:
+        with handle:
+            for chunk in chunks:
+                if chunk:
+                    digest.update(chunk)
+                    handle.write(chunk)
+
+        sha256 = digest.hexdigest()
+        extension = file_extension(filename)
+        existing = find_blob_file(upload_folder, sha256, extension)
+        if existing:
+            os.utime(existing)  # inside the GC grace period again until this reference commits
+            return existing
+
+        final_path = blob_path(upload_folder, sha256, extension)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(handle.name, final_path)
+        return final_path
+    finally:
+        if os.path.exists(handle.name):
+            os.remove(handle.name)
+
+
+def add_reference(path: str) -> str:
+    """Count one more row using the blob at `path`, in the caller's transaction; returns `path`."""
+    sha256 = blob_key(path)
+    if sha256 is None:
+        return path
+
+    values = {
+        'sha256': sha256,
+        'size': os.path.getsize(path),
+        'extension': file_extension(path),
+        'ref_count': 1,
+        'created_at': datetime.utcnow(),
+    }
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        blob = Blob.query.filter_by(sha256=sha256).with_for_update().first()
+        if blob is None:
+            db.session.add(Blob(**values))
+        else:
+            blob.ref_count += 1
+        return path
+
+    statement = insert(Blob.__table__).values(**values)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['sha256'],
+        set_={'ref_count': Blob.__table__.c.ref_count + 1},
+    ))
+    return path
+
+
+def release_references(paths):
+    """Drop one reference per path, in the caller's transaction; None and non-blob paths are ignored."""
+    counts = Counter(key for key in map(blob_key, paths) if key)
+    for sha256, count in counts.items():
+        db.session.execute(
+            update(Blob)
+            .where(Blob.sha256 == sha256)
+            .values(ref_count=case((Blob.ref_count > count, Blob.ref_count - count), else_=0)),
+            execution_options={'synchronize_session': False},
+        )
+
+
+def store_upload(upload) -> str:
+    """Stream a request's FileStorage into the store and count the reference; returns the absolute path."""
+    chunks = iter(lambda: upload.stream.read(CHUNK_SIZE), b'')
+    return add_reference(write_blob(chunks, current_app.config['UPLOAD_FOLDER'], upload.filename))
+
+
+# ── Garbage collection ────────────────────────────────────────────────
+
+REFERENCING_COLUMNS = (Circular.file_path, Submission.file_path, ChatMessage.file_path)
+
+
+def count_references() -> Counter:
+    counts = Counter()
+    for column in REFERENCING_COLUMNS:
+        paths = db.session.scalars(
+            select(column).where(column.like(f'%{BLOB_DIR}%')).execution_options(yield_per=1000)
+        )
+        counts.update(key for key in map(blob_key, paths) if key)
+    return counts
+
+
+def collect_garbage(upload_folder: str, grace_seconds: int = GRACE_SECONDS) -> tuple[int, int]:
+    """
+    Reset every ref_count from the referencing tables, then delete blob files
+    nothing references (plus stray temp files) and their rows. Files modified
+    within `grace_seconds` are kept. Returns (files removed, bytes freed).
+    """
+    counts = count_references()
+    for blob in db.session.scalars(select(Blob)):
+        if blob.ref_count != counts.get(blob.sha256, 0):
+            blob.ref_count = counts.get(blob.sha256, 0)
+    db.session.commit()
+
+    live = set(db.session.scalars(select(Blob.sha256).where(Blob.ref_count > 0)))
+    cutoff = time.time() - grace_seconds
+    removed = freed = 0
+    present = set()
+
+    for directory, _, names in os.walk(blob_root(upload_folder)):
+        for name in names:
+            path = os.path.join(directory, name)
+            match = _BLOB_NAME.match(name)
+            try:
+                stat = os.stat(path)
+                if (match and match.group(1) in live) or stat.st_mtime > cutoff:
+                    if match:
+                        present.add(match.group(1))
+                    continue
+                os.remove(path)
+            except OSError as exc:
+                print(f"[BLOBS] Could not remove {path}: {exc}")
+                continue
+            removed += 1
+            freed += stat.st_size
+
+    dead = [
+        sha256 for sha256 in db.session.scalars(select(Blob.sha256).where(Blob.ref_count == 0))
+        if sha256 not in present
+    ]
+    for start in range(0, len(dead), DELETE_CHUNK_SIZE):
+        db.session.execute(
+            delete(Blob).where(Blob.sha256.in_(dead[start:start + DELETE_CHUNK_SIZE]), Blob.ref_count == 0),
+            execution_options={'synchronize_session': False},
+        )
+    db.session.commit()
+    return removed, freed
+
+
+def adopt_legacy_files(upload_folder: str, batch_size: int = 200) -> int:
+    """
+    Move attachments saved before the blob store into it, repointing their rows,
+    so duplicates already on disk collapse into one blob. Returns rows moved.
+    """
+    moved = 0
+    for model, relative in ((Circular, False), (Submission, False), (ChatMessage, True)):
+        legacy = model.file_path.isnot(None) & ~model.file_path.like(f'%{BLOB_DIR}%')
+        last_id = 0
+        while True:
+            rows = model.query.filter(legacy, model.id > last_id).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            replaced = []
+            for row in rows:
+                last_id = row.id
+                old_path = os.path.join(upload_folder, row.file_path) if relative else row.file_path
+                if not os.path.isfile(old_path):
+                    continue
+                with open(old_path, 'rb') as handle:
+                    path = add_reference(write_blob(
+                        iter(lambda: handle.read(CHUNK_SIZE), b''), upload_folder, row.file_name or old_path
+                    ))
+                row.file_path = os.path.relpath(path, upload_folder) if relative else path
+                replaced.append(old_path)
+            db.session.commit()
+
+            for old_path in replaced:
+                try:
+                    os.remove(old_path)
+                except OSError as exc:
+                    print(f"[BLOBS] Could not remove {old_path}: {exc}")
+            moved += len(replaced)
+    return moved
@@ -0,0 +1,197 @@
+"""
+Materialized compliance counters.
+
+`compliance_rollups` holds one row per (academic_year, submitter department,
+category, regulation_type) with total/approved/rejected/pending submission
+counts. Every write path that adds, reviews, deletes or re-keys submissions
+adjusts it inside its own transaction, and `rebuild_rollup` recomputes it from
+scratch for drift repair. Readers aggregate a table whose size depends on the
+number of years, departments, categories and regulation bodies, not on how
+many submissions exist.
+"""
+from sqlalchemy import case, delete, func, select, text
+
+from models import Circular, ComplianceRollup, Submission, User, db
+
+DIMENSIONS = ('academic_year', 'department', 'category', 'regulation_type')
+COUNTERS = ('total', 'approved', 'rejected', 'pending')
+CIRCULAR_DIMENSIONS = ('academic_year', 'category', 'regulation_type')
+
+EMPTY_COUNTS = dict.fromkeys(COUNTERS, 0)
+
+
+def status_bucket(status: str | None) -> str:
+    return status if status in ('approved', 'rejected') else 'pending'
+
+
+def _key(academic_year, department, category, regulation_type) -> dict:
+    return {
+        'academic_year': academic_year or '',
+        'department': department or '',
+        'category': category or '',
+        'regulation_type': regulation_type or '',
+    }
+
+
+def _upsert(key: dict, deltas: dict):
+    """Add `deltas` to the row for `key`, creating it if needed, without a read round trip."""
+    if not any(deltas.values()):
+        return
+
+    table = ComplianceRollup.__table__
+    values = {**key, **{counter: deltas.get(counter, 0) for counter in COUNTERS}}
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        row = ComplianceRollup.query.filter_by(**key).with_for_update().first()
+        if row is None:
+            db.session.add(ComplianceRollup(**values))
+        else:
+            for counter in COUNTERS:
+                setattr(row, counter, getattr(row, counter) + values[counter])
+        return
+
+    statement = insert(table).values(**values)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=list(DIMENSIONS),
+        set_={counter: table.c[counter] + statement.excluded[counter] for counter in COUNTERS},
+    ))
+
+
+# ── Incremental maintenance ───────────────────────────────────────────
+
+def record_submission(circular, department, old_status=None, new_status=None):
+    """Move one submission between status buckets; None means "not counted"."""
+    deltas = dict(EMPTY_COUNTS)
+    if old_status is not None:
+        deltas['total'] -= 1
+        deltas[status_bucket(old_status)] -= 1
+    if new_status is not None:
+        deltas['total'] += 1
+        deltas[status_bucket(new_status)] += 1
+
+    _upsert(_key(circular.academic_year, department, circular.category, circular.regulation_type), deltas)
+
+
+def _grouped_counts(*criteria):
+    """Rollup rows computed straight from the submissions matching `criteria`."""
+    dimensions = [
+        func.coalesce(Circular.academic_year, '').label('academic_year'),
+        func.coalesce(User.department, '').label('department'),
+        func.coalesce(Circular.category, '').label('category'),
+        func.coalesce(Circular.regulation_type, '').label('regulation_type'),
+    ]
+    total = func.count(Submission.id)
+    approved = func.coalesce(func.sum(case((Submission.status == 'approved', 1), else_=0)), 0)
+    rejected = func.coalesce(func.sum(case((Submission.status == 'rejected', 1), else_=0)), 0)
+
+    return (
+        select(
+            *dimensions,
+            total.label('total'),
+            approved.label('approved'),
+            rejected.label('rejected'),
+            (total - approved - rejected).label('pending'),
+        )
+        .select_from(Submission)
+        .join(Circular, Submission.circular_id == Circular.id)
+        .join(User, Submission.user_id == User.id)
+        .where(*criteria)
+        .group_by(*dimensions)
+    )
+
+
+def _apply_grouped(sign: int, *criteria):
+    for row in db.session.execute(_grouped_counts(*criteria)).mappings().all():
+        _upsert(
+            {dimension: row[dimension] for dimension in DIMENSIONS},
+            {counter: sign * int(row[counter]) for counter in COUNTERS},
+        )
+
+
+def retract_submissions(*criteria):
+    """Take matching submissions out of the rollup; call before deleting or re-keying them."""
+    _apply_grouped(-1, *criteria)
+
+
+def restore_submissions(*criteria):
+    """Count matching submissions again under their current dimensions."""
+    _apply_grouped(1, *criteria)
+
+
+def rekey_circular(circular, changes: dict):
+    """Apply `changes` to a circular, moving its submissions if a rollup dimension changes."""
+    moved = circular.id is not None and any(
+        field in changes and changes[field] != getattr(circular, field)
+        for field in CIRCULAR_DIMENSIONS
+    )
+    if moved:
+        retract_submissions(Submission.circular_id == circular.id)
+
+    for field, value in changes.items():
+        setattr(circular, field, value)
+
+    if moved:
+        db.session.flush()
+        restore_submissions(Submission.circular_id == circular.id)
+
+
+def change_user_department(user, department):
+    """Set a user's department, moving their submissions to the new department's rows."""
+    if user.id is None or user.department == department:
+        user.department = department
+        return
+
+    retract_submissions(Submission.user_id == user.id)
+    user.department = department
+    db.session.flush()
+    restore_submissions(Submission.user_id == user.id)
+
+
+def rebuild_rollup(connection):
+    """Recompute every rollup row from the submissions table."""
+    table = ComplianceRollup.__table__
+    if connection.dialect.name == 'postgresql':
+        # Block incremental writers so the snapshot and the swap agree.
+        connection.execute(text('LOCK TABLE compliance_rollups IN EXCLUSIVE MODE'))
+
+    connection.execute(delete(table))
+    connection.execute(table.insert().from_select(list(DIMENSIONS + COUNTERS), _grouped_counts()))
+
+
+# ── Readers ───────────────────────────────────────────────────────────
+
+def _sums():
+    return [
+        func.coalesce(func.sum(getattr(ComplianceRollup, counter)), 0).label(counter)
+        for counter in COUNTERS
+    ]
+
+
+def _filtered(statement, filters: dict):
+    for dimension, value in filters.items():
+        column = getattr(ComplianceRollup, dimension)
+        if isinstance(value, (list, tuple, set)):
+            statement = statement.where(column.in_([item or '' for item in value]))
+        else:
+            statement = statement.where(column == (value or ''))
+    return statement
+
+
+def rollup_totals(**filters) -> dict:
+    """Summed counters, optionally restricted by dimension, e.g. rollup_totals(academic_year='2024-2025')."""
+    row = db.session.execute(_filtered(select(*_sums()), filters)).mappings().one()
+    return {counter: int(row[counter]) for counter in COUNTERS}
+
+
+def rollup_by(dimension: str, **filters) -> dict[str, dict]:
+    """Summed counters per value of one dimension ('' for missing values)."""
+    column = getattr(ComplianceRollup, dimension)
+    rows = db.session.execute(
+        _filtered(select(column, *_sums()), filters).group_by(column)
+    ).mappings().all()
+    return {row[dimension]: {counter: int(row[counter]) for counter in COUNTERS} for row in rows}
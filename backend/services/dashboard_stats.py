@@ -0,0 +1,110 @@
+"""
+Aggregate queries behind /api/dashboard/stats.
+
+Every counter is computed in the database with conditional aggregation, and
+submission totals come from the compliance rollup, so a dashboard hit costs a
+handful of statements no matter how many circulars, submissions or users exist.
+"""
+from sqlalchemy import and_, case, func, select, true
+
+from models import Circular, ComplianceRollup, Submission, User, db
+from services.compliance_rollup import EMPTY_COUNTS, rollup_by
+
+
+def count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def compliance_rate(approved: int, total: int) -> float:
+    return round(approved / total * 100, 1) if total > 0 else 0
+
+
+def headline_counters(now) -> dict:
+    """Circular, submission and user totals in one round trip."""
+    circulars = select(
+        func.count(Circular.id).label('total_circulars'),
+        count_where(Circular.status == 'active').label('active_circulars'),
+        count_where(and_(Circular.status == 'active', Circular.deadline < now)).label('overdue_count'),
+    ).subquery()
+
+    submissions = select(
+        func.coalesce(func.sum(ComplianceRollup.total), 0).label('total_submissions'),
+        func.coalesce(func.sum(ComplianceRollup.pending), 0).label('pending_submissions'),
+        func.coalesce(func.sum(ComplianceRollup.approved), 0).label('approved_submissions'),
+        func.coalesce(func.sum(ComplianceRollup.rejected), 0).label('rejected_submissions'),
+    ).subquery()
+
+    users = select(
+        func.count(User.id).label('total_users'),
+    ).where(User.is_active.is_(True)).subquery()
+
+    row = db.session.execute(
+        select(circulars, submissions, users)
+        .select_from(circulars)
+        .join(submissions, true())
+        .join(users, true())
+    ).mappings().one()
+
+    counters = {key: int(value or 0) for key, value in row.items()}
+    counters['compliance_rate'] = compliance_rate(
+        counters['approved_submissions'],
+        counters['total_submissions'],
+    )
+    return counters
+
+
+def department_compliance(departments) -> dict[str, dict]:
+    """
+    Active users per department, plus the department's submissions from the
+    compliance rollup (submissions are attributed to the submitter's department).
+    """
+    departments = [department for department in departments if department]
+    stats = {
+        department: {
+            'department': department,
+            'user_count': 0,
+            'total_submissions': 0,
+            'approved_submissions': 0,
+            'compliance_rate': 0,
+        }
+        for department in departments
+    }
+    if not departments:
+        return stats
+
+    user_counts = dict(db.session.execute(
+        select(User.department, func.count(User.id))
+        .where(User.is_active.is_(True), User.department.in_(departments))
+        .group_by(User.department)
+    ).all())
+    submissions = rollup_by('department', department=departments)
+
+    for department in departments:
+        counts = submissions.get(department, EMPTY_COUNTS)
+        stats[department].update({
+            'user_count': user_counts.get(department, 0),
+            'total_submissions': counts['total'],
+            'approved_submissions': counts['approved'],
+            'compliance_rate': compliance_rate(counts['approved'], counts['total']),
+        })
+
+    return stats
+
+
+def user_submission_counters(user_id: int) -> dict:
+    row = db.session.execute(
+        select(
+            func.count(Submission.id),
+            count_where(Submission.status == 'approved'),
+            count_where(Submission.status.in_(('submitted', 'pending'))),
+            count_where(Submission.status == 'rejected'),
+        ).where(Submission.user_id == user_id)
+    ).one()
+
+    total, approved, pending, rejected = (int(value or 0) for value in row)
+    return {
+        'my_total_submissions': total,
+        'my_approved': approved,
+        'my_pending': pending,
+        'my_rejected': rejected,
+    }
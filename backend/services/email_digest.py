@@ -0,0 +1,99 @@
+"""
+Digest mode for notification emails.
+
+With MAIL_DIGEST set to a number of minutes or to 'daily', notification and
+new-circular emails are not sent one by one: each becomes an
+`email_digest_items` row in the caller's transaction, and a scheduler job
+periodically folds every recipient's pending items into a single email queued
+in the outbox and deletes them. MAIL_DIGEST=off keeps the immediate per-event
+emails; an unrecognised value is treated as off.
+"""
+from itertools import groupby
+
+from flask import current_app
+from sqlalchemy import delete, func, select
+
+from models import EmailDigestItem, db
+
+DIGEST_OFF = 'off'
+DIGEST_DAILY = 'daily'
+FLUSH_CHUNK_SIZE = 500  # recipients marked per UPDATE/commit
+
+
+def digest_schedule(value) -> str | int:
+    """'off', 'daily' or a whole number of minutes, from a MAIL_DIGEST setting; 'off' if malformed."""
+    value = str(value or DIGEST_OFF).strip().lower()
+    if value in (DIGEST_OFF, DIGEST_DAILY):
+        return value
+    try:
+        minutes = int(value)
+    except ValueError:
+        return DIGEST_OFF
+    return minutes if minutes > 0 else DIGEST_OFF
+
+
+def init_digests(app):
+    """Validate MAIL_DIGEST once at startup, so send paths never have to parse it."""
+    raw = app.config.get('MAIL_DIGEST')
+    schedule = digest_schedule(raw)
+    if schedule == DIGEST_OFF and str(raw or DIGEST_OFF).strip().lower() not in (DIGEST_OFF, '0'):
+        print(f"[DIGEST] Ignoring invalid MAIL_DIGEST={raw!r}, sending notification emails immediately")
+    app.config['MAIL_DIGEST'] = schedule
+
+
+def digest_enabled() -> bool:
+    return digest_schedule(current_app.config.get('MAIL_DIGEST')) != DIGEST_OFF
+
+
+def add_digest_item(to_email: str, name: str, title: str, message: str = '', link: str | None = None):
+    """Hold a notification for the recipient's next digest; committed with the caller's transaction."""
+    db.session.add(EmailDigestItem(to_email=to_email, name=name, title=title, message=message, link=link))
+
+
+def flush_digests() -> int:
+    """
+    Queue one digest email per recipient with pending items and delete those items
+    in the same transaction, FLUSH_CHUNK_SIZE recipients per transaction so a large
+    backlog never sits in memory at once. Returns the number of emails queued.
+    """
+    from utils.email_sender import send_digest_email
+
+    last_id = db.session.scalar(select(func.max(EmailDigestItem.id)))
+    if last_id is None:
+        return 0
+
+    # Items that arrive while this runs have larger ids and wait for the next digest
+    window = (EmailDigestItem.id <= last_id,)
+    recipients = db.session.scalars(
+        select(EmailDigestItem.to_email).where(*window).distinct().order_by(EmailDigestItem.to_email)
+    ).all()
+
+    for start in range(0, len(recipients), FLUSH_CHUNK_SIZE):
+        chunk = recipients[start:start + FLUSH_CHUNK_SIZE]
+        rows = db.session.execute(
+            select(
+                EmailDigestItem.to_email,
+                EmailDigestItem.name,
+                EmailDigestItem.title,
+                EmailDigestItem.message,
+                EmailDigestItem.link,
+            )
+            .where(*window, EmailDigestItem.to_email.in_(chunk))
+            .order_by(EmailDigestItem.to_email, EmailDigestItem.id)
+        ).all()
+
+        for to_email, items in groupby(rows, key=lambda row: row.to_email):
+            items = list(items)
+            send_digest_email(
+                to_email=to_email,
+                name=items[-1].name or '',
+                items=[{'title': item.title, 'message': item.message, 'link': item.link} for item in items],
+            )
+
+        db.session.execute(
+            delete(EmailDigestItem).where(*window, EmailDigestItem.to_email.in_(chunk)),
+            execution_options={'synchronize_session': False},
+        )
+        db.session.commit()
+
+    return len(recipients)
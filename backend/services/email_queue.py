@@ -0,0 +1,204 @@
+"""
+Durable outbound email queue.
+
+`send_email_async` adds a row to `email_outbox` in the caller's transaction, so
+an email exists exactly when the change that caused it commits, and it survives
+a crash or restart. A small pool of worker threads claims due rows in batches,
+delivers them over one logged-in SMTP connection per worker, retries transient
+failures with exponential backoff, and spaces sends process-wide by
+MAIL_SEND_INTERVAL to stay under the provider's rate limit. Urgent mail (OTP
+codes) is claimed ahead of bulk mail and deleted as soon as it is sent; other
+finished rows are purged after MAIL_OUTBOX_RETENTION_DAYS.
+"""
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select, update
+
+from models import EmailOutbox, db
+from utils.email_sender import SmtpConnection
+
+DEFAULT_WORKERS = 2
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_SEND_INTERVAL = 0.5      # seconds between sends, across this process's workers
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_BASE_SECONDS = 30  # 30s, 1m, 2m, 4m, ...
+DEFAULT_POLL_INTERVAL = 2
+CLAIM_TIMEOUT_SECONDS = 600      # a 'sending' row older than this belongs to a dead worker
+DEFAULT_RETENTION_DAYS = 7
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 1
+
+_wake = threading.Event()
+_workers = []
+
+
+def enqueue_email(to_email: str, subject: str, html_body: str, urgent: bool = False):
+    """
+    Add an email to the outbox in the current session; it is sent after the
+    caller commits. Urgent mail is claimed first and not kept once sent.
+    """
+    db.session.add(EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        html_body=html_body,
+        priority=PRIORITY_URGENT if urgent else PRIORITY_NORMAL,
+        sensitive=urgent,
+    ))
+    _wake.set()
+
+
+class SendRateLimiter:
+    """Spaces sends by at least `min_interval` seconds, across threads."""
+
+    def __init__(self, min_interval=DEFAULT_SEND_INTERVAL):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.min_interval <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def release_stale_claims(timeout=CLAIM_TIMEOUT_SECONDS) -> int:
+    """Put rows left in 'sending' by a crashed worker back in the queue."""
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    result = db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.status == 'sending', EmailOutbox.claimed_at < cutoff)
+        .values(status='pending', claim_token=None, claimed_at=None),
+        execution_options={'synchronize_session': False},
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def claim_batch(limit=DEFAULT_BATCH_SIZE) -> list:
+    """
+    Atomically mark up to `limit` due rows as 'sending' under a fresh token and
+    return them. The status check in the UPDATE keeps two workers, or two
+    processes, from claiming the same row.
+    """
+    token = uuid.uuid4().hex
+    now = datetime.utcnow()
+    due = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.priority, EmailOutbox.id)
+        .limit(limit)
+    )
+    db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due), EmailOutbox.status == 'pending')
+        .values(status='sending', claim_token=token, claimed_at=now),
+        execution_options={'synchronize_session': False},
+    )
+    db.session.commit()
+    return db.session.scalars(
+        select(EmailOutbox).where(EmailOutbox.claim_token == token).order_by(EmailOutbox.priority, EmailOutbox.id)
+    ).all()
+
+
+def is_permanent_failure(exc: Exception) -> bool:
+    """Rejected recipients and 5xx replies to the message itself will not succeed on retry."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(exc, smtplib.SMTPDataError) and 500 <= exc.smtp_code < 600
+
+
+def deliver(message, connection, max_attempts=DEFAULT_MAX_ATTEMPTS, retry_base=DEFAULT_RETRY_BASE_SECONDS):
+    """Send one claimed row and record the outcome; commits so a later crash never resends it."""
+    message.attempts += 1
+    message.claim_token = None
+    try:
+        connection.send(message.to_email, message.subject, message.html_body)
+    except Exception as exc:
+        connection.close()  # the session may be in an unknown state
+        message.last_error = str(exc)[:1000]
+        if is_permanent_failure(exc) or message.attempts >= max_attempts:
+            message.status = 'failed'
+            print(f"[EMAIL] Giving up on {message.to_email} after {message.attempts} attempts: {exc}")
+        else:
+            message.status = 'pending'
+            message.next_attempt_at = datetime.utcnow() + timedelta(seconds=retry_base * 2 ** (message.attempts - 1))
+            print(f"[EMAIL] Failed to send to {message.to_email}, retrying at {message.next_attempt_at:%H:%M:%S}: {exc}")
+    else:
+        message.status = 'sent'
+        message.sent_at = datetime.utcnow()
+        message.last_error = None
+        print(f"[EMAIL] Sent to {message.to_email}" + ('' if message.sensitive else f": {message.subject}"))
+
+    if message.sensitive and message.status != 'pending':
+        db.session.delete(message)  # an OTP code is not kept once it has left the queue
+    db.session.commit()
+
+
+def purge_outbox(retention_days=DEFAULT_RETENTION_DAYS) -> int:
+    """Delete sent and failed rows that finished more than `retention_days` ago."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    result = db.session.execute(
+        delete(EmailOutbox).where(
+            EmailOutbox.status.in_(('sent', 'failed')),
+            func.coalesce(EmailOutbox.sent_at, EmailOutbox.next_attempt_at) < cutoff,
+        ),
+        execution_options={'synchronize_session': False},
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def _work(app, limiter):
+    config = app.config
+    connection = SmtpConnection()
+
+    while True:
+        try:
+            with app.app_context():
+                batch = claim_batch(config.get('MAIL_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+                for message in batch:
+                    limiter.wait()
+                    deliver(
+                        message,
+                        connection,
+                        max_attempts=config.get('MAIL_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS),
+                        retry_base=config.get('MAIL_RETRY_BASE_SECONDS', DEFAULT_RETRY_BASE_SECONDS),
+                    )
+        except Exception as exc:
+            print(f"[EMAIL] Outbox worker error: {exc}")
+            batch = []
+
+        if not batch:
+            connection.close()  # don't hold an idle SMTP session open between bursts
+            _wake.wait(config.get('MAIL_POLL_INTERVAL', DEFAULT_POLL_INTERVAL))
+            _wake.clear()
+
+
+def start_email_workers(app):
+    """Start the outbox worker threads; MAIL_WORKERS=0 leaves queued email for another process."""
+    worker_count = app.config.get('MAIL_WORKERS', DEFAULT_WORKERS)
+    if worker_count <= 0 or _workers:
+        return
+
+    with app.app_context():
+        released = release_stale_claims()
+    if released:
+        print(f"[EMAIL] Requeued {released} emails claimed by a previous process")
+
+    limiter = SendRateLimiter(app.config.get('MAIL_SEND_INTERVAL', DEFAULT_SEND_INTERVAL))
+    for index in range(worker_count):
+        worker = threading.Thread(target=_work, args=(app, limiter), name=f'email-outbox-{index}', daemon=True)
+        worker.start()
+        _workers.append(worker)
+
@@ -0,0 +1,59 @@
+"""
+In-process domain events.
+
+Write paths publish a named event after their transaction commits; other
+services (response cache, realtime push, ...) subscribe to react without the routes knowing
+about them. Handlers run synchronously in the publishing thread, and a failing
+handler is logged without affecting the request or the other handlers.
+"""
+import threading
+from collections import defaultdict
+
+CIRCULAR_CREATED = 'circular.created'
+CIRCULAR_UPDATED = 'circular.updated'
+CIRCULAR_DELETED = 'circular.deleted'
+CIRCULARS_IMPORTED = 'circulars.imported'
+SUBMISSION_CREATED = 'submission.created'
+SUBMISSION_REVIEWED = 'submission.reviewed'
+USER_DELETED = 'user.deleted'
+CHAT_MESSAGE_SENT = 'chat.message_sent'
+NOTIFICATIONS_CREATED = 'notifications.created'
+
+DATA_EVENTS = (
+    CIRCULAR_CREATED,
+    CIRCULAR_UPDATED,
+    CIRCULAR_DELETED,
+    CIRCULARS_IMPORTED,
+    SUBMISSION_CREATED,
+    SUBMISSION_REVIEWED,
+    USER_DELETED,
+)
+
+_subscribers = defaultdict(list)
+_lock = threading.Lock()
+
+
+def subscribe(handler, *events: str):
+    """Call `handler(event, payload)` whenever one of `events` is published."""
+    with _lock:
+        for event in events:
+            if handler not in _subscribers[event]:
+                _subscribers[event].append(handler)
+
+
+def unsubscribe(handler, *events: str):
+    with _lock:
+        for event in events:
+            if handler in _subscribers[event]:
+                _subscribers[event].remove(handler)
+
+
+def publish(event: str, **payload):
+    with _lock:
+        handlers = list(_subscribers[event])
+
+    for handler in handlers:
+        try:
+            handler(event, payload)
+        except Exception as exc:
+            print(f"[EVENTS] Handler {getattr(handler, '__name__', handler)} failed for {event}: {exc}")
@@ -0,0 +1,51 @@
+"""
+Bulk notification fan-out for circulars.
+
+A circular notifies every active user it targets. Instead of building one
+Notification object per recipient, `notify_circular` issues a single
+INSERT ... SELECT from the users table, so creating the notifications costs
+one statement per circular however many users there are.
+"""
+from datetime import datetime
+
+from sqlalchemy import false, insert, literal, select
+
+from models import ALL_DEPARTMENTS, Notification, User, db, parse_target_departments
+
+NOTIFICATION_COLUMNS = ('user_id', 'circular_id', 'title', 'message', 'type', 'is_read', 'created_at')
+
+
+def audience_filter(target_departments: str = ALL_DEPARTMENTS, exclude_user_id: int | None = None) -> list:
+    """WHERE criteria on users for the active recipients of a circular targeted at `target_departments`."""
+    criteria = [User.is_active.is_(True)]
+    if exclude_user_id is not None:
+        criteria.append(User.id != exclude_user_id)
+
+    departments = parse_target_departments(target_departments)
+    if ALL_DEPARTMENTS not in departments:
+        criteria.append(User.department.in_(departments) if departments else false())
+    return criteria
+
+
+def audience_contacts(target_departments: str = ALL_DEPARTMENTS, exclude_user_id: int | None = None) -> list:
+    """(email, name) rows for the same recipients, without loading User objects."""
+    return db.session.execute(
+        select(User.email, User.name).where(*audience_filter(target_departments, exclude_user_id))
+    ).all()
+
+
+def notify_circular(circular_id: int, title: str, message: str,
+                    target_departments: str = ALL_DEPARTMENTS, exclude_user_id: int | None = None) -> int:
+    """Insert a 'circular' notification for every recipient in one statement; returns how many were created."""
+    rows = select(
+        User.id,
+        literal(circular_id),
+        literal(title),
+        literal(message),
+        literal('circular'),
+        literal(False),
+        literal(datetime.utcnow()),
+    ).where(*audience_filter(target_departments, exclude_user_id))
+
+    result = db.session.execute(insert(Notification).from_select(NOTIFICATION_COLUMNS, rows))
+    return result.rowcount
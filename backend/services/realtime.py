@@ -0,0 +1,225 @@
+"""
+Server-push fan-out for chat messages and notifications.
+
+Clients hold one Server-Sent Events stream (routes/realtime.py) subscribed to
+a few channels: their own `user:<id>`, the chat groups they can read, their
+department and `all`. Write paths keep publishing domain events through
+services.events after they commit; `on_event` turns those into small deltas
+on the matching channels, so a client learns about a new message or
+notification without polling.
+
+REALTIME_BACKEND=memory delivers only to streams held by this process.
+REALTIME_BACKEND=redis publishes every delta on a Redis channel that each
+worker process listens to (needs the optional `redis` package), so a message
+sent through one worker reaches streams held by another.
+
+A stream is a queue waited on by its response generator. Run the app under a
+cooperative server (e.g. `gunicorn -k gevent`) so thousands of idle streams
+are greenlets instead of threads; the plain development server spends one
+thread per open stream.
+"""
+import json
+import queue
+import threading
+from collections import defaultdict
+
+from services import events
+
+DEFAULT_HEARTBEAT_SECONDS = 25
+DEFAULT_QUEUE_SIZE = 100  # undelivered deltas before a stalled stream is dropped
+ALL_CHANNEL = 'all'
+REDIS_CHANNEL = 'rcms:realtime'
+
+
+def user_channel(user_id: int) -> str:
+    return f'user:{user_id}'
+
+
+def group_channel(group_name: str) -> str:
+    return f'group:{group_name}'
+
+
+def department_channel(department: str) -> str:
+    return f'dept:{department}'
+
+
+class Subscription:
+    """One open stream: a bounded queue of (event, data) deltas for its channels."""
+
+    def __init__(self, channels, max_size: int = DEFAULT_QUEUE_SIZE):
+        self.channels = tuple(dict.fromkeys(channels))
+        self.queue = queue.Queue(maxsize=max_size)
+        self.overflowed = False
+
+    def offer(self, event: str, data: dict):
+        try:
+            self.queue.put_nowait((event, data))
+        except queue.Full:
+            self.overflowed = True  # the stream closes and the client reconnects and refetches
+
+    def next(self, timeout: float):
+        """The next delta, or None after `timeout` seconds without one."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Hub:
+    """This process's open streams, indexed by channel."""
+
+    def __init__(self):
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def add(self, subscription: Subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels[channel].add(subscription)
+
+    def remove(self, subscription: Subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                listeners = self._channels.get(channel)
+                if listeners is not None:
+                    listeners.discard(subscription)
+                    if not listeners:
+                        del self._channels[channel]
+
+    def deliver(self, channels, event: str, data: dict) -> int:
+        with self._lock:
+            targets = set().union(*(self._channels.get(channel, ()) for channel in channels))
+        for subscription in targets:
+            subscription.offer(event, data)
+        return len(targets)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(set().union(*self._channels.values()))
+
+
+class MemoryBackend:
+    """Single-process delivery: publishing is handing the delta to the local hub."""
+
+    name = 'memory'
+
+    def __init__(self, hub: Hub):
+        self.hub = hub
+
+    def publish(self, channels, event: str, data: dict):
+        self.hub.deliver(channels, event, data)
+
+    def close(self):
+        pass
+
+
+class RedisBackend:
+    """
+    Cross-process delivery over Redis pub/sub. Every process publishes to one
+    Redis channel and runs a listener thread that hands what it receives to its
+    own hub, so delivery does not depend on which worker holds a stream.
+    """
+
+    name = 'redis'
+
+    def __init__(self, client, hub: Hub, channel: str = REDIS_CHANNEL):
+        self.client = client
+        self.hub = hub
+        self.channel = channel
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(channel)
+        self._listener = threading.Thread(target=self._listen, name='realtime-redis', daemon=True)
+        self._listener.start()
+
+    def publish(self, channels, event: str, data: dict):
+        self.client.publish(self.channel, json.dumps({'channels': list(channels), 'event': event, 'data': data}))
+
+    def _listen(self):
+        for message in self._pubsub.listen():
+            try:
+                envelope = json.loads(message['data'])
+                self.hub.deliver(envelope['channels'], envelope['event'], envelope['data'])
+            except Exception as exc:
+                print(f"[REALTIME] Dropped a malformed message: {exc}")
+
+    def close(self):
+        self._pubsub.close()
+
+
+_hub = Hub()
+_backend = MemoryBackend(_hub)
+
+
+def configure_realtime(backend):
+    global _backend
+    if _backend is not None:
+        _backend.close()
+    _backend = backend
+
+
+def init_realtime(app):
+    kind = app.config.get('REALTIME_BACKEND', 'memory').lower()
+
+    if kind == 'redis':
+        try:
+            import redis
+
+            configure_realtime(RedisBackend(redis.Redis.from_url(app.config['REALTIME_REDIS_URL']), _hub))
+        except ImportError:
+            print("[REALTIME] redis is not installed, pushing to this process's streams only")
+            configure_realtime(MemoryBackend(_hub))
+    else:
+        configure_realtime(MemoryBackend(_hub))
+
+    events.subscribe(on_event, events.CHAT_MESSAGE_SENT, events.NOTIFICATIONS_CREATED, events.SUBMISSION_REVIEWED)
+
+
+def push(channels, event: str, **data):
+    try:
+        _backend.publish(channels, event, data)
+    except Exception as exc:
+        print(f"[REALTIME] Push of {event} failed: {exc}")
+
+
+def open_subscription(channels, max_size: int = DEFAULT_QUEUE_SIZE) -> Subscription:
+    subscription = Subscription(channels, max_size)
+    _hub.add(subscription)
+    return subscription
+
+
+def close_subscription(subscription: Subscription):
+    _hub.remove(subscription)
+
+
+def open_streams() -> int:
+    return _hub.size()
+
+
+def notification_channels(payload: dict) -> list[str]:
+    """Channels of a NOTIFICATIONS_CREATED event: explicit users, or a circular's target departments."""
+    from models import ALL_DEPARTMENTS, parse_target_departments
+
+    if payload.get('user_ids') is not None:
+        return [user_channel(user_id) for user_id in payload['user_ids']]
+
+    departments = parse_target_departments(payload.get('target_departments') or ALL_DEPARTMENTS)
+    if ALL_DEPARTMENTS in departments:
+        return [ALL_CHANNEL]
+    return [department_channel(department) for department in departments]
+
+
+def on_event(event: str, payload: dict):
+    """Forward committed domain events to the streams that should see them."""
+    if event == events.CHAT_MESSAGE_SENT:
+        message = payload['message']
+        if message.get('receiver_id'):
+            channels = [user_channel(message['sender_id']), user_channel(message['receiver_id'])]
+        else:
+            channels = [group_channel(message['group_name'])]
+        push(channels, 'chat.message', message=message)
+    elif event == events.NOTIFICATIONS_CREATED:
+        push(notification_channels(payload), 'notification', title=payload.get('title'))
+    elif event == events.SUBMISSION_REVIEWED and payload.get('user_id'):
+        push([user_channel(payload['user_id'])], 'submission.reviewed',
+             submission_id=payload['submission_id'], circular_id=payload['circular_id'],
+             status=payload.get('status'))
@@ -0,0 +1,133 @@
+"""
+Aggregate datasets behind the PDF reports.
+
+Each builder returns plain dicts of grouped counts computed in SQL (or read from
+the compliance rollup), and utils.pdf_generator only lays them out. Building
+the annual dataset costs a fixed handful of GROUP BY statements, so its time
+depends on the number of categories, regulation bodies and departments rather
+than on how many circulars or submissions exist.
+"""
+from sqlalchemy import func, select
+
+from models import Circular, Submission, User, db
+from services.compliance_rollup import EMPTY_COUNTS, rollup_by, rollup_totals
+from services.dashboard_stats import count_where
+
+REPORT_DEPARTMENTS = ['CSE', 'IT', 'ECE', 'EEE', 'MECH', 'CIVIL', 'BIOMEDICAL', 'MTECH CSE']
+ACCREDITATION_BODIES = ['NAAC', 'NHERC', 'UGC', 'AICTE', 'NBA']
+
+
+def annual_report_data(academic_year: str) -> dict:
+    # A year with no circulars falls back to all circulars, as the report always has
+    year_filter = Circular.academic_year == academic_year
+    has_year = db.session.scalar(select(func.count(Circular.id)).where(year_filter)) > 0
+    circular_filter = [year_filter] if has_year else []
+    rollup_filter = {'academic_year': academic_year} if has_year else {}
+
+    circular_rows = db.session.execute(
+        select(
+            Circular.category,
+            Circular.regulation_type,
+            func.count(Circular.id),
+            count_where(Circular.status == 'completed'),
+            count_where(Circular.status == 'active'),
+        )
+        .where(*circular_filter)
+        .group_by(Circular.category, Circular.regulation_type)
+    ).all()
+
+    category_subs = rollup_by('category', **rollup_filter)
+    categories = {}
+    bodies = {body: {'total': 0, 'completed': 0} for body in ACCREDITATION_BODIES}
+    total = completed = active = 0
+    for category, regulation_type, count, done, live in circular_rows:
+        done, live = int(done), int(live)
+        total += count
+        completed += done
+        active += live
+
+        if category not in categories:
+            counts = category_subs.get(category, EMPTY_COUNTS)
+            categories[category] = {'total': 0, 'completed': 0,
+                                    'submissions': counts['total'], 'approved': counts['approved']}
+        categories[category]['total'] += count
+        categories[category]['completed'] += done
+
+        if regulation_type in bodies:
+            bodies[regulation_type]['total'] += count
+            bodies[regulation_type]['completed'] += done
+
+    user_counts = dict(db.session.execute(
+        select(User.department, func.count(User.id))
+        .where(User.department.in_(REPORT_DEPARTMENTS), User.is_active.is_(True))
+        .group_by(User.department)
+    ).all())
+    # Counted per active member, not from the rollup, which keeps deactivated users' submissions
+    dept_subs = {
+        dept: (int(count), int(approved))
+        for dept, count, approved in db.session.execute(
+            select(User.department, func.count(Submission.id), count_where(Submission.status == 'approved'))
+            .join(User, User.id == Submission.user_id)
+            .join(Circular, Circular.id == Submission.circular_id)
+            .where(User.department.in_(REPORT_DEPARTMENTS), User.is_active.is_(True), *circular_filter)
+            .group_by(User.department)
+        )
+    }
+    departments = {}
+    for dept in REPORT_DEPARTMENTS:
+        count, approved = dept_subs.get(dept, (0, 0))
+        departments[dept] = {'users': user_counts.get(dept, 0), 'submissions': count, 'approved': approved}
+
+    return {
+        'academic_year': academic_year,
+        'circulars': {'total': total, 'active': active, 'completed': completed},
+        'submissions': rollup_totals(**rollup_filter),
+        'categories': categories,
+        'departments': departments,
+        'accreditation': bodies,
+    }
+
+
+def department_report_data(department: str, academic_year: str) -> dict:
+    member = (User.department == department, User.is_active.is_(True))
+
+    users = db.session.execute(
+        select(User.id, User.name, User.role).where(*member).order_by(User.id)
+    ).all()
+    user_rows = db.session.execute(
+        select(
+            Submission.user_id,
+            func.count(Submission.id),
+            count_where(Submission.status == 'approved'),
+            count_where(Submission.status == 'rejected'),
+        )
+        .join(User, User.id == Submission.user_id)
+        .where(*member)
+        .group_by(Submission.user_id)
+    ).all()
+    user_subs = {user_id: (int(count), int(approved)) for user_id, count, approved, _ in user_rows}
+
+    # Totals over active members only, like the per-user table below
+    submissions = dict(EMPTY_COUNTS)
+    for _, count, approved, rejected in user_rows:
+        submissions['total'] += int(count)
+        submissions['approved'] += int(approved)
+        submissions['rejected'] += int(rejected)
+    submissions['pending'] = submissions['total'] - submissions['approved'] - submissions['rejected']
+    relevant_circulars = db.session.scalar(
+        select(func.count(Circular.id)).where(Circular.visible_to_department(department))
+    )
+
+    return {
+        'department': department,
+        'academic_year': academic_year,
+        'faculty_count': len(users),
+        'relevant_circulars': relevant_circulars,
+        'submissions': submissions,
+        'users': [
+            {'name': name, 'role': role,
+             'submissions': user_subs.get(user_id, (0, 0))[0],
+             'approved': user_subs.get(user_id, (0, 0))[1]}
+            for user_id, name, role in users
+        ],
+    }
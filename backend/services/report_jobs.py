@@ -0,0 +1,180 @@
+"""
+Background PDF report jobs.
+
+Requesting a report records a `report_jobs` row and hands it to a bounded
+thread pool, which renders the PDF into UPLOAD_FOLDER/reports; clients poll the
+job and then download the file, so no request thread ever runs ReportLab. A
+finished job is reused for every later request with the same (report type,
+department, academic year, data version) — the data version being a stamp of
+the circular, submission and user tables — so repeat downloads are a file read
+until the underlying data changes.
+"""
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, select
+
+from models import Circular, ReportJob, Submission, User, db
+from services.report_data import annual_report_data, department_report_data
+from utils.http_cache import make_etag, stamp
+from utils.pdf_generator import generate_annual_report, generate_department_report
+
+DEFAULT_REPORT_WORKERS = 2
+JOB_TIMEOUT_SECONDS = 600  # a queued/running job older than this is assumed lost with its process
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide render pool, sized by REPORT_WORKERS."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, current_app.config.get('REPORT_WORKERS', DEFAULT_REPORT_WORKERS)),
+                thread_name_prefix='report-render',
+            )
+        return _executor
+
+
+def report_dir(app) -> str:
+    path = os.path.join(app.config['UPLOAD_FOLDER'], 'reports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def report_data_version() -> str:
+    """Changes whenever a circular, submission or user that a report could show changes."""
+    return make_etag(*db.session.execute(select(
+        stamp(func.count(Circular.id)),
+        stamp(func.max(Circular.id)),
+        stamp(func.max(Circular.updated_at)),
+        stamp(func.count(Submission.id)),
+        stamp(func.max(Submission.id)),
+        stamp(func.max(Submission.submitted_at)),
+        stamp(func.max(Submission.reviewed_at)),
+        stamp(func.count(User.id)),
+        stamp(func.max(User.updated_at)),
+    )).one())
+
+
+def request_report(report_type: str, academic_year: str, department: str = '', requested_by=None) -> ReportJob:
+    """
+    The job answering this request: a finished or still-live job for the same
+    data if there is one, otherwise a newly queued job.
+    """
+    department = department if report_type == 'department' else ''
+    version = report_data_version()
+    live_since = datetime.utcnow() - timedelta(seconds=JOB_TIMEOUT_SECONDS)
+
+    existing = db.session.scalars(
+        select(ReportJob)
+        .where(
+            ReportJob.report_type == report_type,
+            ReportJob.academic_year == academic_year,
+            ReportJob.department == department,
+            ReportJob.data_version == version,
+            or_(
+                ReportJob.status == 'done',
+                and_(ReportJob.status.in_(('queued', 'running')), ReportJob.created_at >= live_since),
+            ),
+        )
+        .order_by(ReportJob.created_at.desc())
+    ).first()
+    if existing is not None and (existing.status != 'done' or os.path.exists(existing.file_path)):
+        return existing
+
+    job = ReportJob(
+        id=uuid.uuid4().hex,
+        report_type=report_type,
+        department=department,
+        academic_year=academic_year,
+        data_version=version,
+        status='queued',
+        requested_by=requested_by,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    get_executor().submit(render_job, current_app._get_current_object(), job.id)
+    return job
+
+
+def render_job(app, job_id: str):
+    """Render one queued job to disk on a pool thread and record the outcome."""
+    with app.app_context():
+        job = db.session.get(ReportJob, job_id)
+        if job is None or job.status != 'queued':
+            return
+
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        try:
+            if job.report_type == 'annual':
+                buffer = generate_annual_report(annual_report_data(job.academic_year))
+            else:
+                buffer = generate_department_report(department_report_data(job.department, job.academic_year))
+
+            final_path = os.path.join(report_dir(app), f'{job.id}.pdf')
+            temp_path = f'{final_path}.part'
+            with open(temp_path, 'wb') as handle:
+                handle.write(buffer.getbuffer())
+            os.replace(temp_path, final_path)
+
+            job.status = 'done'
+            job.file_path = final_path
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as exc:
+            print(f"[REPORTS] Rendering {job_id} failed: {exc}")
+            db.session.rollback()
+            job = db.session.get(ReportJob, job_id)
+            job.status = 'failed'
+            job.error = str(exc)[:1000]
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            return
+
+        remove_superseded(job)
+
+
+def remove_superseded(job: ReportJob):
+    """Drop finished reports of the same kind rendered from older data, with their files."""
+    stale = db.session.scalars(
+        select(ReportJob).where(
+            ReportJob.report_type == job.report_type,
+            ReportJob.academic_year == job.academic_year,
+            ReportJob.department == job.department,
+            ReportJob.data_version != job.data_version,
+            ReportJob.status.in_(('done', 'failed')),
+        )
+    ).all()
+    for old in stale:
+        if old.file_path:
+            try:
+                os.remove(old.file_path)
+            except OSError:
+                pass
+        db.session.delete(old)
+    db.session.commit()
+
+
+def fail_interrupted_jobs() -> int:
+    """Mark jobs whose process died mid-render as failed, so the next request queues a fresh one."""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_TIMEOUT_SECONDS)
+    jobs = db.session.scalars(
+        select(ReportJob).where(ReportJob.status.in_(('queued', 'running')), ReportJob.created_at < cutoff)
+    ).all()
+    for job in jobs:
+        job.status = 'failed'
+        job.error = 'Interrupted before the report was rendered.'
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return len(jobs)
@@ -0,0 +1,220 @@
+"""
+Response cache for read-heavy JSON endpoints.
+
+Payloads are cached per (endpoint, role, department, params). The default
+backend is an in-process LRU with a TTL; CACHE_BACKEND=redis shares entries
+between workers (needs the optional `redis` package) and CACHE_BACKEND=none
+turns caching off. Every data event from services.events drops all entries;
+the TTL bounds staleness for changes that publish no event (users, activity,
+deadlines moving into the "upcoming" window).
+
+Events are in-process. With the memory backend a write clears only the cache
+of the worker that handled it, and other workers keep serving their copies for
+up to CACHE_TTL_SECONDS. With redis, invalidation bumps a shared generation,
+so every worker sees it at once; use it whenever more than one worker runs.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from flask import current_app
+
+from services import events
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 512
+
+
+class MemoryBackend:
+    """Thread-safe LRU with per-entry expiry."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: int = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        return self._generation
+
+    def get(self, key: str, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, generation):
+        with self._lock:
+            if generation != self._generation:
+                return  # invalidated while the payload was being built
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Shared backend. Keys carry a generation number, so invalidating is a
+    single INCR and superseded entries simply age out. `client` only needs
+    redis-py's get/setex/incr, which lets tests pass a local stand-in.
+    """
+
+    name = 'redis'
+
+    def __init__(self, client, ttl: int = DEFAULT_TTL_SECONDS, prefix: str = 'rcms:cache'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _decode(self, value):
+        return value.decode() if isinstance(value, bytes) else value
+
+    def generation(self):
+        return self._decode(self.client.get(f'{self.prefix}:generation')) or '0'
+
+    def get(self, key: str, generation):
+        return self._decode(self.client.get(f'{self.prefix}:{generation}:{key}'))
+
+    def set(self, key: str, value: str, generation):
+        self.client.setex(f'{self.prefix}:{generation}:{key}', self.ttl, value)
+
+    def clear(self):
+        self.client.incr(f'{self.prefix}:generation')
+
+    def size(self):
+        return None
+
+
+_backend = MemoryBackend()
+_counters = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_invalidations = 0
+_counter_lock = threading.Lock()
+
+
+def configure_cache(backend):
+    """Swap the cache backend (None disables caching) and reset the counters."""
+    global _backend, _invalidations
+    _backend = backend
+    with _counter_lock:
+        _counters.clear()
+        _invalidations = 0
+
+
+def init_cache(app):
+    kind = app.config.get('CACHE_BACKEND', 'memory').lower()
+    ttl = app.config.get('CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+
+    if kind == 'none':
+        configure_cache(None)
+        return
+
+    if kind == 'redis':
+        try:
+            import redis
+
+            configure_cache(RedisBackend(redis.Redis.from_url(app.config['CACHE_REDIS_URL']), ttl=ttl))
+            return
+        except ImportError:
+            print("[CACHE] redis is not installed, using the in-process cache")
+
+    configure_cache(MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES), ttl=ttl))
+
+
+def cache_key(endpoint: str, user, params=None) -> str:
+    return json.dumps(
+        [endpoint, user.role, user.department or '', sorted((params or {}).items())],
+        separators=(',', ':'),
+    )
+
+
+def _count(endpoint: str, outcome: str):
+    with _counter_lock:
+        _counters[endpoint][outcome] += 1
+
+
+def cached_payload(endpoint: str, user, build, params=None):
+    """
+    Payload for this (endpoint, role, department, params): from the cache when
+    present, otherwise `build()` and store it. Always returns a fresh object.
+    """
+    backend = _backend
+    if backend is None:
+        return build()
+
+    key = cache_key(endpoint, user, params)
+    try:
+        generation = backend.generation()
+        raw = backend.get(key, generation)
+    except Exception as exc:
+        print(f"[CACHE] Read failed, bypassing cache: {exc}")
+        return build()
+
+    if raw is not None:
+        _count(endpoint, 'hits')
+        return json.loads(raw)
+
+    _count(endpoint, 'misses')
+    payload = build()
+    try:
+        backend.set(key, current_app.json.dumps(payload), generation)
+    except Exception as exc:
+        print(f"[CACHE] Write failed: {exc}")
+    return payload
+
+
+def invalidate(event=None, payload=None):
+    global _invalidations
+    backend = _backend
+    if backend is None:
+        return
+
+    try:
+        backend.clear()
+    except Exception as exc:
+        print(f"[CACHE] Invalidation failed: {exc}")
+    with _counter_lock:
+        _invalidations += 1
+
+
+def cache_stats() -> dict:
+    with _counter_lock:
+        endpoints = {
+            endpoint: {
+                **counts,
+                'hit_rate': round(counts['hits'] / (counts['hits'] + counts['misses']) * 100, 1)
+                if counts['hits'] + counts['misses'] else 0,
+            }
+            for endpoint, counts in _counters.items()
+        }
+        invalidations = _invalidations
+
+    return {
+        'backend': _backend.name if _backend is not None else 'none',
+        'entries': _backend.size() if _backend is not None else 0,
+        'invalidations': invalidations,
+        'hits': sum(item['hits'] for item in endpoints.values()),
+        'misses': sum(item['misses'] for item in endpoints.values()),
+        'endpoints': endpoints,
+    }
+
+
+events.subscribe(invalidate, *events.DATA_EVENTS)
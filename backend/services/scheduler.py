@@ -1,4 +1,6 @@
 from apscheduler.schedulers.background import BackgroundScheduler
+from services.email_digest import DIGEST_DAILY, DIGEST_OFF, digest_schedule, flush_digests
+from services.email_queue import DEFAULT_RETENTION_DAYS, purge_outbox
 from services.scraper import run_scraper
 
 scheduler = BackgroundScheduler()
@@ -21,6 +23,34 @@ def start_scheduler(app):
         replace_existing=True
     )
 
+    def outbox_purge_job():
+        with app.app_context():
+            purged = purge_outbox(app.config.get('MAIL_OUTBOX_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+            if purged:
+                print(f"[EMAIL] Purged {purged} finished outbox rows")
+
+    scheduler.add_job(
+        func=outbox_purge_job,
+        trigger='interval',
+        hours=1,
+        id='email_outbox_purge_job',
+        replace_existing=True
+    )
+
+    schedule = digest_schedule(app.config.get('MAIL_DIGEST'))
+    if schedule != DIGEST_OFF:
+        def digest_job():
+            with app.app_context():
+                sent = flush_digests()
+                if sent:
+                    print(f"[DIGEST] Queued {sent} digest emails")
+
+        if schedule == DIGEST_DAILY:
+            trigger = {'trigger': 'cron', 'hour': app.config.get('MAIL_DIGEST_HOUR', 8)}
+        else:
+            trigger = {'trigger': 'interval', 'minutes': schedule}
+        scheduler.add_job(func=digest_job, id='email_digest_job', replace_existing=True, **trigger)
+
     scheduler.start()
 
     print("Scheduler started successfully")
@@ -1,16 +1,25 @@
 import hashlib
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from urllib.parse import unquote, urljoin, urlparse
+from urllib.parse import parse_qsl, unquote, urlencode, urljoin, urlparse, urlunparse
 
 import requests
 from bs4 import BeautifulSoup
+from flask import current_app
 from requests.adapters import HTTPAdapter
+from sqlalchemy import select
 from urllib3.util.retry import Retry
 from werkzeug.utils import secure_filename
 
-from models import Circular, Notification, User, db
+from models import ALL_DEPARTMENTS, Circular, ScraperBackfill, ScraperState, User, db
+from services import events
+from services.blob_store import add_reference, write_blob
+from services.notification_fanout import audience_contacts, notify_circular
+from services.search import extract_document_text
 from utils.email_sender import send_circulars_email
 
 BULLETINS_URL = "https://www.aicte.gov.in/bulletins/circulars"
@@ -18,9 +27,14 @@ BASE_URL = "https://www.aicte.gov.in"
 PDF_CHUNK_SIZE = 1024 * 1024
 REQUEST_TIMEOUT = (20, 300)
 DETAIL_PAGE_TIMEOUT = (20, 120)
+DEFAULT_FETCH_WORKERS = 4
+DEFAULT_HOST_INTERVAL = 0.5  # seconds between request starts to the same host
+ORPHAN_GRACE_SECONDS = 3600
+SCRAPED_DESCRIPTION_PREFIX = "Imported automatically from AICTE circulars. Source: "
+DEDUPE_CHUNK_SIZE = 500  # keeps IN lists under SQLite's bound-parameter limit
 
 
-def build_session():
+def build_session(pool_size=DEFAULT_FETCH_WORKERS):
     session = requests.Session()
     retries = Retry(
         total=3,
@@ -28,7 +42,7 @@ def build_session():
         status_forcelist=[429, 500, 502, 503, 504],
         allowed_methods=["GET", "HEAD"],
     )
-    adapter = HTTPAdapter(max_retries=retries)
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     session.headers.update(
@@ -43,6 +57,70 @@ def build_session():
     return session
 
 
+class HostRateLimiter:
+    """Spaces request starts to each host by at least `min_interval` seconds, across threads."""
+
+    def __init__(self, min_interval=DEFAULT_HOST_INTERVAL):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if self.min_interval <= 0:
+            return
+
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class FetchPipeline:
+    """
+    Bounded thread pool over one shared, pooled requests session. `get` has the
+    same signature as Session.get, so the fetch helpers below accept either.
+    Workers only do network and file I/O; all DB work stays on the caller's thread.
+    """
+
+    def __init__(self, max_workers=DEFAULT_FETCH_WORKERS, host_interval=DEFAULT_HOST_INTERVAL):
+        self.max_workers = max(1, max_workers)
+        self.session = build_session(pool_size=self.max_workers)
+        self.limiter = HostRateLimiter(host_interval)
+
+    def get(self, url, **kwargs):
+        self.limiter.wait(url)
+        return self.session.get(url, **kwargs)
+
+    def map(self, func, items):
+        """func(item) for every item, in parallel; results come back in input order."""
+        items = list(items)
+        if len(items) <= 1 or self.max_workers == 1:
+            return [func(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scraper-fetch") as executor:
+            return list(executor.map(func, items))
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """Process-wide pipeline, so keep-alive connections survive between scheduler runs."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = FetchPipeline(
+                max_workers=current_app.config.get("SCRAPER_FETCH_WORKERS", DEFAULT_FETCH_WORKERS),
+                host_interval=current_app.config.get("SCRAPER_HOST_INTERVAL", DEFAULT_HOST_INTERVAL),
+            )
+        return _pipeline
+
+
 def classify_circular(title):
     title_lower = title.lower()
 
@@ -88,6 +166,15 @@ def normalize_title(title):
     return text.strip(" -|")
 
 
+def source_hash(url):
+    """Dedupe key for a scraped notice: sha256 of its URL with the host lowercased and the fragment dropped."""
+    if not url:
+        return None
+    parsed = urlparse(url.strip())
+    normalized = urlunparse(parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(), fragment=""))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
 def is_pdf_link(url):
     if not url:
         return False
@@ -95,13 +182,49 @@ def is_pdf_link(url):
     return path.endswith(".pdf") or "/sites/default/files/" in path
 
 
-def fetch_page(session, url=BULLETINS_URL):
-    response = session.get(url, timeout=DETAIL_PAGE_TIMEOUT)
+def fetch_listing(session, url=BULLETINS_URL, state=None):
+    """
+    (html, validators) for the listing page. html is None when the page is
+    unchanged since `state`: a 304, or a 200 whose body hashes the same.
+    """
+    headers = {}
+    if state is not None:
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+    response = session.get(url, headers=headers, timeout=DETAIL_PAGE_TIMEOUT)
+    if response.status_code == 304:
+        return None, None
     response.raise_for_status()
-    return response.text
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_hash": hashlib.sha256(response.content).hexdigest(),
+    }
+    if state is not None and state.content_hash == validators["content_hash"]:
+        return None, validators
+    return response.text, validators
 
 
-def extract_row_item(row):
+def record_listing_state(url, validators=None):
+    now = datetime.utcnow()
+    state = db.session.get(ScraperState, url) or ScraperState(source_url=url)
+    state.checked_at = now
+    if validators:
+        if validators["content_hash"] != state.content_hash:
+            state.changed_at = now
+        state.etag = validators["etag"]
+        state.last_modified = validators["last_modified"]
+        state.content_hash = validators["content_hash"]
+
+    db.session.add(state)
+    db.session.commit()
+
+
+def extract_row_item(row, base_url=BASE_URL):
     anchors = [a for a in row.find_all("a", href=True) if a.get("href", "").strip()]
     if not anchors:
         return None
@@ -111,7 +234,7 @@ def extract_row_item(row):
     title = None
 
     for anchor in anchors:
-        href = urljoin(BASE_URL, anchor["href"].strip())
+        href = urljoin(base_url, anchor["href"].strip())
         text = normalize_title(anchor.get_text(" ", strip=True))
 
         if is_pdf_link(href):
@@ -135,13 +258,13 @@ def extract_row_item(row):
     }
 
 
-def parse_notifications(html):
+def parse_notifications(html, base_url=BASE_URL):
     soup = BeautifulSoup(html, "html.parser")
     seen_titles = set()
     results = []
 
     for row in soup.select(".views-row"):
-        item = extract_row_item(row)
+        item = extract_row_item(row, base_url)
         if not item:
             continue
 
@@ -170,16 +293,15 @@ def resolve_pdf_from_detail_page(session, detail_url):
 
     for selector in selectors:
         for anchor in soup.select(selector):
-            href = urljoin(BASE_URL, anchor["href"].strip())
+            href = urljoin(detail_url, anchor["href"].strip())
             if is_pdf_link(href):
                 return href
 
     return None
 
 
-def download_pdf(session, pdf_url, title, upload_root):
-    os.makedirs(upload_root, exist_ok=True)
-
+def download_pdf(session, pdf_url, title, upload_folder):
+    """Stream a circular PDF into the blob store; returns (blob path, original file name)."""
     response = session.get(pdf_url, timeout=REQUEST_TIMEOUT, stream=True)
     response.raise_for_status()
 
@@ -193,40 +315,74 @@ def download_pdf(session, pdf_url, title, upload_root):
     if not safe_name.lower().endswith(".pdf"):
         safe_name = f"{safe_name}.pdf"
 
-    file_hash = hashlib.sha1(pdf_url.encode("utf-8")).hexdigest()[:12]
-    stored_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{file_hash}_{safe_name}"
-    final_path = os.path.join(upload_root, stored_name)
-    temp_path = f"{final_path}.part"
-
     try:
-        with open(temp_path, "wb") as handle:
-            for chunk in response.iter_content(chunk_size=PDF_CHUNK_SIZE):
-                if chunk:
-                    handle.write(chunk)
-        os.replace(temp_path, final_path)
+        file_path = write_blob(response.iter_content(chunk_size=PDF_CHUNK_SIZE), upload_folder, safe_name)
     finally:
         response.close()
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
-    return final_path, safe_name
+    return file_path, safe_name
+
 
+def resolve_pdfs(pipeline, notices):
+    """Fill in pdf_url from the detail page for notices whose listing row had no PDF link."""
+    def resolve(notice):
+        try:
+            notice["pdf_url"] = resolve_pdf_from_detail_page(pipeline, notice["detail_url"])
+        except Exception as exc:
+            print(f"Failed to resolve PDF for {notice['title']}: {exc}")
 
-def scrape_aicte():
-    session = build_session()
-    html = fetch_page(session)
-    notices = parse_notifications(html)
+    pipeline.map(resolve, [notice for notice in notices if not notice["pdf_url"]])
 
-    for notice in notices:
-        if not notice["pdf_url"]:
-            try:
-                notice["pdf_url"] = resolve_pdf_from_detail_page(session, notice["detail_url"])
-            except Exception as exc:
-                print(f"Failed to resolve PDF for {notice['title']}: {exc}")
 
+def scrape_aicte(html=None, url=BULLETINS_URL):
+    pipeline = get_pipeline()
+    if html is None:
+        html, _ = fetch_listing(pipeline, url)
+    notices = parse_notifications(html, url)
+    resolve_pdfs(pipeline, notices)
     return notices
 
 
+def listing_page_url(url, page):
+    """URL of the `page`-th (0-based) page of a Drupal views listing such as BULLETINS_URL."""
+    if page == 0:
+        return url
+    parsed = urlparse(url)
+    query = [(key, value) for key, value in parse_qsl(parsed.query) if key != "page"]
+    query.append(("page", str(page)))
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def remove_orphaned_files(upload_root, grace_seconds=ORPHAN_GRACE_SECONDS):
+    """
+    Delete files in `upload_root` that no circular references, including
+    leftover `.part` downloads. Files younger than `grace_seconds` are kept so
+    an upload that is still between save() and commit is never touched.
+    """
+    if not os.path.isdir(upload_root):
+        return 0
+
+    referenced = {
+        os.path.abspath(path)
+        for path in db.session.scalars(select(Circular.file_path).where(Circular.file_path.isnot(None)))
+    }
+    cutoff = time.time() - grace_seconds
+    removed = 0
+
+    for entry in os.scandir(upload_root):
+        if not entry.is_file() or os.path.abspath(entry.path) in referenced:
+            continue
+        if entry.stat().st_mtime > cutoff:
+            continue
+        try:
+            os.remove(entry.path)
+            removed += 1
+        except OSError as exc:
+            print(f"Failed to remove orphaned file {entry.name}: {exc}")
+
+    return removed
+
+
 def get_scraper_uploader_id():
     admin = (
         User.query.filter_by(role="admin", is_active=True)
@@ -243,98 +399,145 @@ def get_scraper_uploader_id():
     raise RuntimeError("No active user found to own scraped circulars.")
 
 
+def item_source_url(item):
+    return item.get("detail_url") or item.get("pdf_url")
+
+
 def build_description(item):
-    source_url = item.get("detail_url") or item.get("pdf_url") or BULLETINS_URL
-    return f"Imported automatically from AICTE circulars. Source: {source_url}"
+    source_url = item_source_url(item) or BULLETINS_URL
+    return f"{SCRAPED_DESCRIPTION_PREFIX}{source_url}"
+
+
+def existing_values(column, values, *criteria):
+    """The subset of `values` already present in `column`, in one indexed IN query per chunk."""
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), DEDUPE_CHUNK_SIZE):
+        chunk = values[start:start + DEDUPE_CHUNK_SIZE]
+        found.update(db.session.scalars(select(column).where(column.in_(chunk), *criteria)))
+    return found
+
+
+def new_notices(notices):
+    """
+    (item, title, source_hash) for notices not imported yet. Dedupe is by
+    source URL hash, so a retitled notice is still recognised; title only
+    decides for notices without a URL and against rows that predate source_hash.
+    """
+    unique = {}
+    for item in notices:
+        # 🔥 FORCE NEW (FOR TESTING)
+        title = normalize_title(item["title"]) #+ "TEST7"
+
+        if title:
+            key = source_hash(item_source_url(item))
+            unique.setdefault(key or ("title", title), (item, title, key))
+
+    candidates = list(unique.values())
+    known_hashes = existing_values(Circular.source_hash, {key for _, _, key in candidates if key})
+    known_titles = existing_values(
+        Circular.title,
+        {title for _, title, key in candidates if key not in known_hashes},
+        Circular.source_hash.is_(None),
+    )
+    return [
+        (item, title, key)
+        for item, title, key in candidates
+        if key not in known_hashes and title not in known_titles
+    ]
+
+
+def import_notices(notices, upload_folder, uploader_id):
+    """
+    Stage a Circular for every notice not imported yet, downloading PDFs into
+    the blob store on the fetch pool first. Nothing is committed: the caller
+    owns the transaction, and blobs it ends up not referencing are left for
+    `flask gc-blobs`. Returns the new circulars.
+    """
+    pipeline = get_pipeline()
+
+    # ✅ CLEAN duplicate check, before anything is downloaded
+    candidates = new_notices(notices)
+
+    def fetch_pdf(candidate):
+        item, title, _ = candidate
+        if not item.get("pdf_url"):
+            return None, None
+        try:
+            return download_pdf(pipeline, item["pdf_url"], title, upload_folder)
+        except Exception as exc:
+            print(f"Failed to download PDF for {title}: {exc}")
+            return None, None
+
+    # Downloads run on the fetch pool; everything below stays on this thread (single DB writer).
+    downloads = pipeline.map(fetch_pdf, candidates)
+
+    new_items = []
+    for (item, title, key), (file_path, file_name) in zip(candidates, downloads):
+        priority = classify_circular(title)
+        ctype = detect_type(title)
+        deadline = extract_deadline(title)
+        description = build_description(item)
+
+        document_text = None
+        if file_path:
+            add_reference(file_path)
+            if current_app.config.get("SEARCH_INDEX_DOCUMENTS"):
+                document_text = extract_document_text(file_path)
+
+        new_items.append(Circular(
+            title=title,
+            description=description,
+            category=ctype,
+            regulation_type="AICTE",
+            priority=priority,
+            deadline=deadline,
+            uploaded_by=uploader_id,
+            target_departments="all",
+            file_path=file_path,
+            file_name=file_name,
+            document_text=document_text,
+            source_url=item_source_url(item),
+            source_hash=key,
+        ))
+
+    db.session.add_all(new_items)
+    db.session.flush()  # one batched INSERT; assigns ids
+    return new_items
 
 
 # ONLY showing corrected save_to_db + relevant parts
 
 def save_to_db(notices, upload_folder):
     try:
-        count = 0
-        new_items = []
         uploader_id = get_scraper_uploader_id()
-        session = build_session()
-        circular_upload_dir = os.path.join(upload_folder, "circulars")
-
-        for item in notices:
-            # 🔥 FORCE NEW (FOR TESTING)
-            title = normalize_title(item["title"]) #+ "TEST7"
-
-            if not title:
-                continue
-
-            priority = classify_circular(title)
-            ctype = detect_type(title)
-            deadline = extract_deadline(title)
-            description = build_description(item)
-
-            # ✅ CLEAN duplicate check
-            existing = Circular.query.filter_by(title=title).first()
-
-            file_path = None
-            file_name = None
-
-            if item.get("pdf_url"):
-                try:
-                    file_path, file_name = download_pdf(
-                        session,
-                        item["pdf_url"],
-                        title,
-                        circular_upload_dir,
-                    )
-                except Exception as exc:
-                    print(f"Failed to download PDF for {title}: {exc}")
-
-            if existing:
-                continue
-
-            new_circular = Circular(
-                title=title,
-                description=description,
-                category=ctype,
-                regulation_type="AICTE",
-                priority=priority,
-                deadline=deadline,
-                uploaded_by=uploader_id,
-                target_departments="all",
-                file_path=file_path,
-                file_name=file_name,
-            )
-
-            db.session.add(new_circular)
-            db.session.flush()
 
-            count += 1
-            new_items.append(new_circular)
+        new_items = import_notices(notices, upload_folder, uploader_id)
+        count = len(new_items)
 
         db.session.commit()
         print(f"{count} new circulars added")
+        if new_items:
+            events.publish(events.CIRCULARS_IMPORTED, circular_ids=[circular.id for circular in new_items])
 
         # 🔥 CREATE NOTIFICATIONS (FOR ALL USERS INCLUDING ADMIN)
         if new_items:
-            users = User.query.filter(User.is_active.is_(True)).all()
-
             for circular in new_items:
-                for user in users:
-                    notification = Notification(
-                        user_id=user.id,
-                        circular_id=circular.id,
-                        title=f"New Circular: {circular.title}",
-                        message=f"New circular published: {circular.title}",
-                        type="circular",
-                        is_read=False,
-                    )
-                    db.session.add(notification)
+                notify_circular(
+                    circular.id,
+                    f"New Circular: {circular.title}",
+                    f"New circular published: {circular.title}",
+                )
 
             db.session.commit()
+            events.publish(events.NOTIFICATIONS_CREATED, target_departments=ALL_DEPARTMENTS,
+                           title=f"{count} new circulars")
 
             # 🔥 SEND EMAIL TO ALL USERS
-            for user in users:
+            for email, name in audience_contacts():
                 send_circulars_email(
-                    to_email=user.email,
-                    name=user.name,
+                    to_email=email,
+                    name=name,
                     circulars=[
                         {
                             "title": c.title,
@@ -343,21 +546,100 @@ def save_to_db(notices, upload_folder):
                         for c in new_items
                     ],
                 )
+            db.session.commit()  # queued in the email outbox
 
     except Exception as exc:
         print("❌ Error while saving to DB:", exc)
         db.session.rollback()
+        return False
+
+    return True
 
 
 def run_scraper():
-    data = scrape_aicte()
+    url = current_app.config.get("SCRAPER_BULLETINS_URL") or BULLETINS_URL
+    html, validators = fetch_listing(get_pipeline(), url, db.session.get(ScraperState, url))
 
-    try:
-        from flask import current_app
+    if html is None:
+        print("Bulletin page unchanged, skipping")
+        record_listing_state(url, validators)
+    else:
+        data = scrape_aicte(html, url)
+
+        try:
+            saved = save_to_db(data, current_app.config["UPLOAD_FOLDER"])
+        except Exception as exc:
+            print("Retrying once due to error:", exc)
+            saved = save_to_db(data, current_app.config["UPLOAD_FOLDER"])
+
+        # Remember the page only once it is imported, so a failed run is retried next tick
+        if saved:
+            record_listing_state(url, validators)
 
-        save_to_db(data, current_app.config["UPLOAD_FOLDER"])
+    try:
+        removed = remove_orphaned_files(os.path.join(current_app.config["UPLOAD_FOLDER"], "circulars"))
+        if removed:
+            print(f"Removed {removed} orphaned circular files")
     except Exception as exc:
-        print("Retrying once due to error:", exc)
-        from flask import current_app
+        print("Orphaned file cleanup failed:", exc)
+
+
+def run_backfill(url=None, max_pages=None, restart=False):
+    """
+    Import the paginated AICTE archive behind `url`, oldest pages last. Each
+    page is one transaction: its new circulars and the advanced checkpoint in
+    `scraper_backfills` commit together, so after a crash the run resumes at the
+    first page that was not committed. Historical circulars are imported
+    without notifications or emails. Returns the checkpoint row.
+    """
+    url = url or current_app.config.get("SCRAPER_BULLETINS_URL") or BULLETINS_URL
+    state = db.session.get(ScraperBackfill, url)
+    if state is None:
+        state = ScraperBackfill(source_url=url, next_page=0, pages_done=0, imported=0)
+        db.session.add(state)
+    elif restart:
+        state.next_page = state.pages_done = state.imported = 0
+        state.started_at = datetime.utcnow()
+        state.finished_at = None
+    elif state.finished_at:
+        print(f"[BACKFILL] {url} already finished at {state.finished_at:%Y-%m-%d %H:%M}")
+        return state
+    db.session.commit()
+
+    pipeline = get_pipeline()
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    uploader_id = get_scraper_uploader_id()
+    previous_keys = None
+    pages = 0
+
+    while max_pages is None or pages < max_pages:
+        page = state.next_page
+        page_url = listing_page_url(url, page)
+        html, _ = fetch_listing(pipeline, page_url)
+        notices = parse_notifications(html, page_url)
+
+        # Past the last page Drupal either renders an empty list or repeats the last one
+        keys = {item_source_url(item) or item["title"] for item in notices}
+        if not keys or keys == previous_keys:
+            state.finished_at = datetime.utcnow()
+            db.session.commit()
+            print(f"[BACKFILL] Reached the end of {url} at page {page}")
+            break
+
+        # Only notices that are actually new cost a detail-page fetch and a download
+        fresh = [item for item, _, _ in new_notices(notices)]
+        resolve_pdfs(pipeline, fresh)
+        new_items = import_notices(fresh, upload_folder, uploader_id)
+
+        state.next_page = page + 1
+        state.pages_done += 1
+        state.imported += len(new_items)
+        db.session.commit()
+
+        if new_items:
+            events.publish(events.CIRCULARS_IMPORTED, circular_ids=[circular.id for circular in new_items])
+        print(f"[BACKFILL] Page {page}: {len(new_items)} new of {len(notices)} circulars")
+        previous_keys = keys
+        pages += 1
 
-        save_to_db(data, current_app.config["UPLOAD_FOLDER"])
+    return state
@@ -0,0 +1,167 @@
+"""
+Full-text search for circulars.
+
+SQLite databases get an FTS5 table kept in sync with `circulars` by triggers;
+Postgres gets a generated, weighted tsvector column behind a GIN index.
+Any other engine (or an SQLite build without FTS5) falls back to ILIKE. The
+index is built by a versioned migration (`build_search_index`); each process
+only checks, on its first search, whether it exists.
+"""
+import re
+
+from sqlalchemy import Float, Integer, inspect, text
+
+from models import db
+
+FTS_TABLE = 'circulars_fts'
+SEARCH_COLUMNS = ('title', 'description', 'category', 'regulation_type', 'document_text')
+MAX_DOCUMENT_CHARS = 200_000
+
+# bm25() weights, in SEARCH_COLUMNS order
+FTS_WEIGHTS = (10.0, 4.0, 2.0, 2.0, 1.0)
+
+_available: bool | None = None
+
+
+def _dialect() -> str:
+    return db.engine.dialect.name
+
+
+def _column_list(prefix: str = '') -> str:
+    return ', '.join(f'{prefix}{column}' for column in SEARCH_COLUMNS)
+
+
+def _ensure_document_text_column(connection):
+    columns = {column['name'] for column in inspect(connection).get_columns('circulars')}
+    if 'document_text' not in columns:
+        connection.execute(text('ALTER TABLE circulars ADD COLUMN document_text TEXT'))
+
+
+def _ensure_sqlite_index(connection) -> bool:
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE},
+    ).first()
+    if exists:
+        return True
+
+    try:
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"{_column_list()}, content='circulars', content_rowid='id', "
+            f"tokenize='porter unicode61')"
+        ))
+    except Exception as exc:
+        print(f"[SEARCH] FTS5 unavailable, falling back to ILIKE: {exc}")
+        return False
+
+    columns = _column_list()
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON circulars BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {_column_list('new.')}); "
+        f"END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON circulars BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {_column_list('old.')}); "
+        f"END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON circulars BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {_column_list('old.')}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {_column_list('new.')}); "
+        f"END"
+    ))
+    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def _ensure_postgres_index(connection) -> bool:
+    columns = {column['name'] for column in inspect(connection).get_columns('circulars')}
+    if 'search_vector' not in columns:
+        connection.execute(text(
+            "ALTER TABLE circulars ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(category, '') || ' ' || coalesce(regulation_type, '')), 'C') || "
+            "setweight(to_tsvector('english', coalesce(document_text, '')), 'D')"
+            ") STORED"
+        ))
+    connection.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_circulars_search_vector ON circulars USING GIN (search_vector)'
+    ))
+    return True
+
+
+def build_search_index(connection):
+    """Migration step: the document_text column and the full-text index for this database."""
+    _ensure_document_text_column(connection)
+
+    if connection.dialect.name == 'sqlite':
+        _ensure_sqlite_index(connection)
+    elif connection.dialect.name == 'postgresql':
+        _ensure_postgres_index(connection)
+
+
+def _index_exists() -> bool:
+    inspector = inspect(db.engine)
+    if _dialect() == 'sqlite':
+        return inspector.has_table(FTS_TABLE)
+    if _dialect() == 'postgresql':
+        return any(column['name'] == 'search_vector' for column in inspector.get_columns('circulars'))
+    return False
+
+
+def search_available() -> bool:
+    """Whether the full-text index exists; checked once per process."""
+    global _available
+    if _available is None:
+        _available = _index_exists()
+    return _available
+
+
+def search_terms(raw: str) -> list[str]:
+    return re.findall(r'\w+', (raw or '').lower())
+
+
+def search_hits(raw: str):
+    """
+    Subquery of (circular_id, rank) for circulars matching every term in `raw`,
+    with the last term treated as a prefix. Lower rank means more relevant.
+    Returns None when full-text search is unavailable or `raw` has no terms.
+    """
+    terms = search_terms(raw)
+    if not terms or not search_available():
+        return None
+
+    if _dialect() == 'sqlite':
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        statement = text(
+            f"SELECT rowid AS circular_id, bm25({FTS_TABLE}, {weights}) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        ).bindparams(match=match)
+    else:
+        match = ' & '.join(terms) + ':*'
+        statement = text(
+            "SELECT id AS circular_id, -ts_rank_cd(search_vector, to_tsquery('english', :match)) AS rank "
+            "FROM circulars WHERE search_vector @@ to_tsquery('english', :match)"
+        ).bindparams(match=match)
+
+    return statement.columns(circular_id=Integer, rank=Float).subquery('search_hits')
+
+
+def extract_document_text(file_path: str | None) -> str | None:
+    """Text of an attached PDF/DOCX for the search index, or None if unreadable."""
+    if not file_path or not file_path.lower().endswith(('.pdf', '.docx')):
+        return None
+
+    try:
+        from utils.pdf_extractor import extract_text
+
+        return extract_text(file_path)[:MAX_DOCUMENT_CHARS] or None
+    except Exception as exc:
+        print(f"[SEARCH] Could not extract text from {file_path}: {exc}")
+        return None
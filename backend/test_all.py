@@ -4,6 +4,7 @@ Run: python test_all.py  (while Flask is running on port 5000)
 """
 import requests
 import sys
+import time
 
 BASE = 'http://localhost:5000/api'
 passed = 0
@@ -143,6 +144,9 @@ print('\n[7] Circulars')
 r = get('/circulars', headers=ah)
 test('GET /circulars', r.ok, str(r.status_code))
 
+r = get('/circulars/list?limit=5', headers=ah)
+test('GET /circulars/list?limit=5 (keyset page)', r.ok and 'next_cursor' in r.json(), str(r.status_code))
+
 r = get('/circulars/categories/summary', headers=ah)
 test('GET /circulars/categories/summary', r.ok, str(r.status_code))
 
@@ -179,6 +183,46 @@ if r.ok:
     contact_roles = {c['role'] for c in contacts}
     test('Admin contacts exclude faculty', 'faculty' not in contact_roles, f'roles: {contact_roles}')
 
+    if contacts:
+        peer_id = contacts[0]['id']
+        r = post('/chat', json={'receiver_id': peer_id, 'message': 'inbox summary check'}, headers=ah)
+        test('POST /chat direct message', r.status_code == 201, str(r.status_code))
+        entry = next(c for c in get('/chat/contacts', headers=ah).json() if c['id'] == peer_id)
+        test('Contact shows the sent message, not unread for its sender',
+             entry['last_message'] == 'inbox summary check' and entry['unread_count'] == 0, str(entry))
+
+        latest = get(f'/chat/direct/{peer_id}?limit=1', headers=ah).json()
+        test('Chat history ?limit=1 returns the newest message',
+             len(latest) == 1 and latest[0]['message'] == 'inbox summary check', str(latest))
+        if latest:
+            r = get(f"/chat/direct/{peer_id}?since_id={latest[0]['id']}", headers=ah)
+            test('Chat history ?since_id= past the newest is empty', r.ok and r.json() == [], str(r.status_code))
+            r = get(f"/chat/direct/{peer_id}?before_id={latest[0]['id']}&since_id=0", headers=ah)
+            test('Chat history rejects before_id with since_id (400)', r.status_code == 400, str(r.status_code))
+
+# Push stream: opens with a ready event, and a sent message arrives on it
+r = post('/realtime/token', headers=ah)
+test('POST /realtime/token issues a stream token', r.ok and r.json().get('token'), str(r.status_code))
+stream_token = r.json().get('token', '') if r.ok else ''
+stream = requests.get(BASE + '/realtime/stream', params={'token': stream_token}, stream=True, timeout=10)
+lines = stream.iter_lines(decode_unicode=True)
+test('GET /realtime/stream opens with a ready event', stream.ok and next(lines) == 'event: ready', str(stream.status_code))
+r = post('/chat', json={'group_name': 'Broadcast', 'message': 'push check'}, headers=ah)
+pushed = next((line for line in lines if line.startswith('event: ') and line != 'event: ready'), '')
+test('Sent group message is pushed to the stream', pushed == 'event: chat.message', pushed)
+stream.close()
+test('GET /realtime/stream without a token is 401', get('/realtime/stream').status_code == 401)
+test('GET /realtime/stream rejects the login JWT (401)',
+     get(f'/realtime/stream?token={admin_token}').status_code == 401)
+
+# Identical attachments are stored once
+stored = []
+for name in ('first.txt', 'second.txt'):
+    r = requests.post(BASE + '/chat', data={'group_name': 'Broadcast', 'message': 'dedupe check'},
+                      files={'file': (name, b'same attachment bytes')}, headers=ah, timeout=10)
+    stored.append(r.json().get('file_path') if r.status_code == 201 else None)
+test('Identical chat attachments share one blob', stored[0] and stored[0] == stored[1], str(stored))
+
 # Faculty contacts should NOT include admin
 contacts_fac = get('/chat/contacts', headers=fh).json()
 fac_contact_roles = {c['role'] for c in contacts_fac}
@@ -195,6 +239,22 @@ print('\n[11] Reports')
 r = get('/reports/data', headers=ah)
 test('GET /reports/data', r.ok, str(r.status_code))
 
+r = post('/reports/annual', json={'academic_year': '2024-2025'}, headers=ah)
+test('POST /reports/annual queues a job', r.status_code in (200, 202) and 'id' in r.json(), str(r.status_code))
+job = r.json()
+for _ in range(30):
+    if job.get('status') not in ('queued', 'running'):
+        break
+    time.sleep(1)
+    job = get(f"/reports/jobs/{job['id']}", headers=ah).json()
+test('Annual report job finishes', job.get('status') == 'done', str(job.get('status')))
+r = get(f"/reports/jobs/{job['id']}/download", headers=ah)
+test('Annual report downloads as PDF', r.ok and r.content[:4] == b'%PDF', str(r.status_code))
+r = post('/reports/annual', json={'academic_year': '2024-2025'}, headers=ah)
+test('Repeat annual report reuses the rendered job', r.status_code == 200 and r.json().get('id') == job['id'], str(r.status_code))
+r = post('/reports/annual', headers=fh)
+test('Faculty cannot request annual report (403)', r.status_code == 403, str(r.status_code))
+
 # ── 12. OTP Endpoints ───────────────────────────────────────
 print('\n[12] OTP Endpoints')
 r = post('/auth/send-otp', json={'email': 'otp.test@example.com', 'name': 'OTP Test'})
@@ -217,6 +277,25 @@ test('Wrong email rejected (401)', r.status_code == 401, str(r.status_code))
 r = post('/auth/login', json={'email': 'testadmin@test.com', 'password': 'wrongpw'})
 test('Wrong password rejected (401)', r.status_code == 401, str(r.status_code))
 
+# Deleting a user who has chatted also removes their messages from the inbox summaries
+r = post('/auth/users', json={
+    'name': 'Chat Sender', 'email': 'chatter@test.com',
+    'password': 'pw123', 'role': 'admin', 'department': ''
+}, headers=ah)
+chatter_id = r.json().get('id', 0) if r.status_code == 201 else 0
+if chatter_id:
+    r = post('/auth/login', json={'email': 'chatter@test.com', 'password': 'pw123'})
+    ch = {'Authorization': f"Bearer {r.json().get('token', '')}"}
+    post('/chat', json={'group_name': 'Broadcast', 'message': 'sent before deletion'}, headers=ch)
+    chatter_contacts = get('/chat/contacts', headers=ch).json()
+    if chatter_contacts:
+        post('/chat', json={'receiver_id': chatter_contacts[0]['id'], 'message': 'sent before deletion'}, headers=ch)
+    r = delete(f'/auth/users/{chatter_id}', headers=ah)
+    test('Delete a user who has sent chat messages', r.ok, str(r.status_code))
+    broadcast = next((g for g in get('/chat/groups', headers=ah).json() if g['name'] == 'Broadcast'), {})
+    test("Group preview drops the deleted user's message",
+         broadcast.get('last_message') != 'sent before deletion', str(broadcast))
+
 # ── Cleanup: delete test users ──────────────────────────────
 print('\n[Cleanup]')
 users_now = get('/auth/users', headers=ah).json()
@@ -0,0 +1,92 @@
+"""
+Fixtures for the unit tests: a fresh app on an in-memory SQLite database per
+test, built through create_app so schema migrations run exactly as they do on
+startup. Run from backend/ with `python -m pytest tests`.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models import Circular, Submission, User, db  # noqa: E402
+
+
+def app_config(tmp_path, **overrides) -> dict:
+    return {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'CACHE_BACKEND': 'none',
+        'MAIL_WORKERS': 0,
+        'MAIL_DIGEST': 'off',
+        'AUTHORIZED_LOGIN_USER_MAP': {},
+        **overrides,
+    }
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(app_config(tmp_path))
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user():
+    def make(role='faculty', department='CSE', email=None, is_active=True):
+        user = User(
+            name=f'{role} user',
+            email=email or f'{role}.{department or "none"}.{User.query.count()}@test.edu',
+            role=role,
+            department=department,
+            is_active=is_active,
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    return make
+
+
+@pytest.fixture
+def make_circular(make_user):
+    def make(uploader=None, **fields):
+        circular = Circular(
+            title=fields.pop('title', 'Circular'),
+            category=fields.pop('category', 'Other'),
+            academic_year=fields.pop('academic_year', '2024-2025'),
+            target_departments=fields.pop('target_departments', 'all'),
+            uploaded_by=(uploader or make_user(role='admin', department=None)).id,
+            **fields,
+        )
+        db.session.add(circular)
+        db.session.commit()
+        return circular
+
+    return make
+
+
+@pytest.fixture
+def make_submission():
+    def make(circular, user, status='pending'):
+        submission = Submission(circular_id=circular.id, user_id=user.id, status=status)
+        db.session.add(submission)
+        db.session.commit()
+        return submission
+
+    return make
+
+
+def auth_headers(user) -> dict:
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
@@ -0,0 +1,32 @@
+from sqlalchemy import text
+
+from conftest import auth_headers
+from models import ChatConversation, ReportJob, User, db
+
+
+def test_delete_user_clears_rows_that_reference_them(app, client, make_user, make_circular, make_submission):
+    principal = make_user(role='principal', department=None)
+    sender = make_user(role='admin', department=None)
+    make_submission(make_circular(uploader=principal), sender, 'approved')
+
+    for payload in ({'group_name': 'Broadcast', 'message': 'before deletion'},
+                    {'receiver_id': principal.id, 'message': 'direct'}):
+        assert client.post('/api/chat', json=payload, headers=auth_headers(sender)).status_code == 201
+    assert client.post('/api/chat', json={'group_name': 'Broadcast', 'message': 'kept'},
+                       headers=auth_headers(principal)).status_code == 201
+    db.session.add(ReportJob(id='job', report_type='annual', academic_year='2024-2025',
+                             data_version='v', requested_by=sender.id))
+    db.session.commit()
+    sender_id = sender.id
+
+    db.session.execute(text('PRAGMA foreign_keys=ON'))  # enforce references the way Postgres does
+    response = client.delete(f'/api/auth/users/{sender_id}', headers=auth_headers(principal))
+
+    assert response.status_code == 200, response.get_json()
+    db.session.expire_all()
+    assert db.session.get(User, sender_id) is None
+    assert db.session.get(ReportJob, 'job').requested_by is None
+
+    broadcast = ChatConversation.query.filter_by(thread_type='group', thread_key='Broadcast').one()
+    assert (broadcast.message_count, broadcast.last_message, broadcast.last_sender_id) == (1, 'kept', principal.id)
+    assert ChatConversation.query.filter_by(thread_type='direct').count() == 0
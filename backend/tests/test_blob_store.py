@@ -0,0 +1,54 @@
+import os
+
+from models import Blob, ChatMessage, db
+from services.blob_store import add_reference, blob_key, collect_garbage, release_references, write_blob
+
+
+def store(app, content: bytes, filename='file.pdf') -> str:
+    return add_reference(write_blob([content], app.config['UPLOAD_FOLDER'], filename))
+
+
+def test_identical_content_is_stored_once_and_counted(app):
+    first = store(app, b'same bytes')
+    second = store(app, b'same bytes', 'copy.pdf')
+    db.session.commit()
+
+    assert first == second and os.path.isfile(first)
+    assert db.session.get(Blob, blob_key(first)).ref_count == 2
+    assert store(app, b'other bytes') != first
+
+
+def test_release_references_never_goes_below_zero(app):
+    path = store(app, b'bytes')
+    db.session.commit()
+
+    release_references([path, path, path, None, '/not/a/blob.pdf'])
+    db.session.commit()
+    assert db.session.get(Blob, blob_key(path)).ref_count == 0
+
+
+def test_collect_garbage_recounts_and_removes_unreferenced_blobs(app, make_user):
+    sender = make_user()
+    kept = store(app, b'attached')
+    orphan = store(app, b'orphaned')
+    db.session.add(ChatMessage(
+        sender_id=sender.id, group_name='Broadcast', message='file',
+        file_path=os.path.relpath(kept, app.config['UPLOAD_FOLDER']),
+    ))
+    db.session.commit()
+
+    removed, freed = collect_garbage(app.config['UPLOAD_FOLDER'], grace_seconds=0)
+
+    assert (removed, freed) == (1, len(b'orphaned'))
+    assert os.path.isfile(kept) and not os.path.exists(orphan)
+    assert db.session.get(Blob, blob_key(kept)).ref_count == 1
+    assert db.session.get(Blob, blob_key(orphan)) is None
+
+
+def test_collect_garbage_keeps_files_inside_the_grace_period(app):
+    path = store(app, b'uncommitted upload')
+    release_references([path])
+    db.session.commit()
+
+    assert collect_garbage(app.config['UPLOAD_FOLDER'])[0] == 0
+    assert os.path.isfile(path)
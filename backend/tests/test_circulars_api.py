@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from conftest import auth_headers
+from models import db
+from services.compliance_rollup import rebuild_rollup
+from services.search import search_available
+
+
+def test_keyset_pages_cover_every_circular_once(app, client, make_user, make_circular):
+    admin = make_user(role='admin', department=None)
+    created = datetime(2025, 1, 1)
+    # Two pairs share a created_at, so the id tiebreak has to hold across page boundaries
+    circulars = [
+        make_circular(uploader=admin, created_at=created - timedelta(hours=index // 2))
+        for index in range(7)
+    ]
+    newest_first = [c.id for c in sorted(circulars, key=lambda c: (c.created_at, c.id), reverse=True)]
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/circulars?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url, headers=auth_headers(admin)).get_json()
+        assert len(body['items']) <= 2
+        seen.extend(item['id'] for item in body['items'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == newest_first
+
+
+def test_unpaginated_list_is_a_plain_array(app, client, make_user, make_circular):
+    admin = make_user(role='admin', department=None)
+    make_circular(uploader=admin)
+    body = client.get('/api/circulars', headers=auth_headers(admin)).get_json()
+    assert isinstance(body, list) and len(body) == 1
+
+
+def test_invalid_cursor_is_rejected(app, client, make_user):
+    admin = make_user(role='admin', department=None)
+    response = client.get('/api/circulars?cursor=not-a-cursor', headers=auth_headers(admin))
+    assert response.status_code == 400
+
+
+def test_category_summary_folds_empty_categories_into_other(app, client, make_user, make_circular, make_submission):
+    admin = make_user(role='admin', department=None)
+    faculty = make_user(department='CSE')
+    circulars = [
+        make_circular(uploader=admin, category='Other'),
+        make_circular(uploader=admin, category='Other', status='completed'),
+        make_circular(uploader=admin, category=''),
+        make_circular(uploader=admin, category='Scraped Notice'),
+    ]
+    for circular, statuses in zip(circulars, (['approved', 'pending'], ['approved'], ['rejected', 'approved'], [])):
+        for status in statuses:
+            make_submission(circular, faculty, status)
+    rebuild_rollup(db.session.connection())
+    db.session.commit()
+
+    for user in (admin, faculty):
+        summary = {
+            row['category']: row
+            for row in client.get('/api/circulars/categories/summary', headers=auth_headers(user)).get_json()
+        }
+        other = summary['Other']
+        assert (other['total'], other['active'], other['completed']) == (3, 2, 1)
+        assert (other['total_submissions'], other['approved_submissions']) == (5, 3)
+        assert '' not in summary and summary['Scraped Notice']['total'] == 1
+
+
+def test_search_uses_the_index_built_by_migrations(app, client, make_user, make_circular):
+    admin = make_user(role='admin', department=None)
+    hackathon = make_circular(uploader=admin, title='National hackathon announcement')
+    make_circular(uploader=admin, title='Examination schedule')
+
+    assert search_available()
+    body = client.get('/api/circulars?search=hackath', headers=auth_headers(admin)).get_json()
+    assert [item['id'] for item in body] == [hackathon.id]
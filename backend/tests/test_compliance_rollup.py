@@ -0,0 +1,67 @@
+from models import ComplianceRollup, Submission, db
+from services.compliance_rollup import (
+    EMPTY_COUNTS,
+    rebuild_rollup,
+    record_submission,
+    retract_submissions,
+    rollup_by,
+    rollup_totals,
+)
+
+
+def rollup_rows():
+    return sorted(
+        (row.academic_year, row.department, row.category, row.regulation_type,
+         row.total, row.approved, row.rejected, row.pending)
+        for row in ComplianceRollup.query.all()
+    )
+
+
+def test_record_submission_upserts_and_moves_between_buckets(app, make_user, make_circular):
+    circular = make_circular(category='Examination')
+    record_submission(circular, 'CSE', new_status='pending')
+    record_submission(circular, 'CSE', new_status='pending')
+    db.session.commit()
+    assert ComplianceRollup.query.count() == 1
+    assert rollup_totals() == {'total': 2, 'approved': 0, 'rejected': 0, 'pending': 2}
+
+    record_submission(circular, 'CSE', old_status='pending', new_status='approved')
+    db.session.commit()
+    assert rollup_by('category')['Examination'] == {'total': 2, 'approved': 1, 'rejected': 0, 'pending': 1}
+
+    record_submission(circular, 'CSE', old_status='approved')
+    db.session.commit()
+    assert rollup_totals(department='CSE') == {'total': 1, 'approved': 0, 'rejected': 0, 'pending': 1}
+
+
+def test_retract_submissions_removes_their_counts(app, make_user, make_circular, make_submission):
+    circular = make_circular()
+    faculty = make_user()
+    for status in ('approved', 'rejected', 'pending'):
+        make_submission(circular, faculty, status)
+    rebuild_rollup(db.session.connection())
+    db.session.commit()
+    assert rollup_totals() == {'total': 3, 'approved': 1, 'rejected': 1, 'pending': 1}
+
+    retract_submissions(Submission.status == 'approved')
+    db.session.commit()
+    assert rollup_totals() == {'total': 2, 'approved': 0, 'rejected': 1, 'pending': 1}
+
+    retract_submissions(Submission.circular_id == circular.id, Submission.status != 'approved')
+    db.session.commit()
+    assert rollup_totals() == EMPTY_COUNTS
+
+
+def test_incremental_counts_match_a_rebuild(app, make_user, make_circular, make_submission):
+    circulars = [make_circular(category='Examination'), make_circular(category='', academic_year=None)]
+    users = [make_user(department='CSE'), make_user(department='ECE'), make_user(department=None)]
+    for circular in circulars:
+        for user, status in zip(users, ('approved', 'rejected', 'submitted')):
+            make_submission(circular, user, status)
+            record_submission(circular, user.department, new_status=status)
+    db.session.commit()
+    incremental = rollup_rows()
+
+    rebuild_rollup(db.session.connection())
+    db.session.commit()
+    assert rollup_rows() == incremental
@@ -0,0 +1,35 @@
+from flask import Flask
+
+from models import EmailDigestItem, db
+from services.email_digest import DIGEST_DAILY, DIGEST_OFF, add_digest_item, digest_schedule, flush_digests, init_digests
+from utils import email_sender
+
+
+def test_digest_schedule_parses_and_falls_back_to_off():
+    assert digest_schedule('daily') == DIGEST_DAILY
+    assert digest_schedule(' 15 ') == 15
+    assert digest_schedule(None) == digest_schedule('0') == digest_schedule('hourly') == DIGEST_OFF
+
+
+def test_init_digests_normalises_a_malformed_setting():
+    app = Flask(__name__)
+    app.config['MAIL_DIGEST'] = 'hourly'
+    init_digests(app)
+    assert app.config['MAIL_DIGEST'] == DIGEST_OFF
+
+
+def test_flush_sends_one_email_per_recipient_and_deletes_the_items(app, monkeypatch):
+    sent = []
+    monkeypatch.setattr(email_sender, 'send_digest_email', lambda **kwargs: sent.append(kwargs))
+    add_digest_item('a@test.edu', 'A', 'First')
+    add_digest_item('b@test.edu', 'B', 'Only')
+    add_digest_item('a@test.edu', 'A', 'Second')
+    db.session.commit()
+
+    assert flush_digests() == 2
+    assert [(mail['to_email'], [item['title'] for item in mail['items']]) for mail in sent] == [
+        ('a@test.edu', ['First', 'Second']),
+        ('b@test.edu', ['Only']),
+    ]
+    assert EmailDigestItem.query.count() == 0
+    assert flush_digests() == 0
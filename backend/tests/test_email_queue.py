@@ -0,0 +1,82 @@
+import smtplib
+from datetime import datetime, timedelta
+
+from models import EmailOutbox, db
+from services.email_queue import claim_batch, deliver, enqueue_email, release_stale_claims
+
+
+class FakeConnection:
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+
+    def send(self, to_email, subject, html_body):
+        if self.error:
+            raise self.error
+        self.sent.append((to_email, subject))
+
+    def close(self):
+        pass
+
+
+def test_claim_batch_claims_due_rows_once(app):
+    for index in range(3):
+        enqueue_email(f'user{index}@test.edu', 'Subject', '<p>body</p>')
+    db.session.add(EmailOutbox(
+        to_email='later@test.edu', subject='Later', html_body='',
+        next_attempt_at=datetime.utcnow() + timedelta(hours=1),
+    ))
+    db.session.commit()
+
+    batch = claim_batch(10)
+    assert sorted(message.to_email for message in batch) == ['user0@test.edu', 'user1@test.edu', 'user2@test.edu']
+    assert {message.status for message in batch} == {'sending'}
+    assert claim_batch(10) == []
+
+
+def test_urgent_mail_is_claimed_before_queued_bulk_mail(app):
+    for index in range(5):
+        enqueue_email(f'bulk{index}@test.edu', 'Circular', '<p>body</p>')
+    enqueue_email('otp@test.edu', 'Code', '<p>123456</p>', urgent=True)
+    db.session.commit()
+
+    assert [message.to_email for message in claim_batch(1)] == ['otp@test.edu']
+
+
+def test_deliver_retries_then_gives_up(app):
+    enqueue_email('user@test.edu', 'Subject', '<p>body</p>')
+    db.session.commit()
+    connection = FakeConnection(smtplib.SMTPServerDisconnected('gone'))
+
+    message = claim_batch(1)[0]
+    deliver(message, connection, max_attempts=2, retry_base=30)
+    assert message.status == 'pending' and message.next_attempt_at > datetime.utcnow()
+
+    message.next_attempt_at = datetime.utcnow()
+    db.session.commit()
+    deliver(claim_batch(1)[0], connection, max_attempts=2, retry_base=30)
+    assert db.session.get(EmailOutbox, message.id).status == 'failed'
+
+
+def test_sent_urgent_mail_is_not_kept(app):
+    enqueue_email('otp@test.edu', 'Code', '<p>123456</p>', urgent=True)
+    enqueue_email('user@test.edu', 'Subject', '<p>body</p>')
+    db.session.commit()
+    connection = FakeConnection()
+
+    for message in claim_batch(10):
+        deliver(message, connection)
+
+    assert len(connection.sent) == 2
+    assert [row.to_email for row in EmailOutbox.query.all()] == ['user@test.edu']
+
+
+def test_stale_claims_are_released(app):
+    enqueue_email('user@test.edu', 'Subject', '<p>body</p>')
+    db.session.commit()
+    message = claim_batch(1)[0]
+    message.claimed_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+
+    assert release_stale_claims(timeout=60) == 1
+    assert [row.to_email for row in claim_batch(1)] == ['user@test.edu']
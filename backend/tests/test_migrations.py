@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app import create_app
+from conftest import app_config
+from models import ChatConversation, ChatMessage, ChatThreadState, User, db
+
+
+def file_database_config(tmp_path) -> dict:
+    return app_config(tmp_path, SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'rcms.db'}")
+
+
+def test_chat_conversations_backfill_upgrades_a_populated_database(tmp_path):
+    config = file_database_config(tmp_path)
+    app = create_app(config)
+    with app.app_context():
+        alice = User(name='Alice', email='alice@test.edu', role='faculty', department='CSE')
+        bob = User(name='Bob', email='bob@test.edu', role='faculty', department='CSE')
+        db.session.add_all([alice, bob])
+        db.session.commit()
+
+        sent_at = datetime(2025, 1, 1, 9, 0)
+        db.session.add_all([
+            ChatMessage(sender_id=alice.id, group_name='CSE', message='first', created_at=sent_at),
+            ChatMessage(sender_id=bob.id, group_name='CSE', message='second', created_at=sent_at + timedelta(minutes=1)),
+            ChatMessage(sender_id=alice.id, receiver_id=bob.id, message='direct', created_at=sent_at),
+        ])
+        db.session.add(ChatThreadState(
+            user_id=bob.id, thread_type='direct', thread_key=str(alice.id), last_read_at=sent_at + timedelta(hours=1),
+        ))
+        db.session.commit()
+        alice_id, bob_id = alice.id, bob.id
+
+        # Roll the schema back to before 0006: chat history, but no summaries or read counts
+        db.session.execute(text('DELETE FROM chat_conversations'))
+        db.session.execute(text('ALTER TABLE chat_thread_states DROP COLUMN read_count'))
+        db.session.execute(text("DELETE FROM schema_migrations WHERE version = '0006_chat_conversations'"))
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+
+    upgraded = create_app(config)
+    with upgraded.app_context():
+        group = ChatConversation.query.filter_by(thread_type='group', thread_key='CSE').one()
+        assert (group.message_count, group.last_message, group.last_sender_id) == (2, 'second', bob_id)
+        assert group.last_message_at == sent_at + timedelta(minutes=1)
+
+        direct = ChatConversation.query.filter_by(thread_type='direct').one()
+        assert (direct.thread_key, direct.message_count) == (f'{alice_id}:{bob_id}', 1)
+        assert isinstance(direct.last_message_at, datetime)
+
+        read_counts = {
+            (state.user_id, state.thread_type, state.thread_key): state.read_count
+            for state in ChatThreadState.query.all()
+        }
+        assert read_counts == {
+            (bob_id, 'direct', str(alice_id)): 1,   # read after the message arrived
+            (alice_id, 'direct', str(bob_id)): 1,   # own message
+            (alice_id, 'group', 'CSE'): 1,
+            (bob_id, 'group', 'CSE'): 1,
+        }
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_startup_migrations_are_idempotent(tmp_path):
+    config = file_database_config(tmp_path)
+    for _ in range(2):
+        app = create_app(config)
+        with app.app_context():
+            versions = db.session.scalars(text('SELECT version FROM schema_migrations')).all()
+            assert len(versions) == len(set(versions))
+            db.session.remove()
+            db.engine.dispose()
@@ -0,0 +1,30 @@
+from models import db
+from services.compliance_rollup import rebuild_rollup
+from services.report_data import annual_report_data, department_report_data
+from utils.pdf_generator import generate_annual_report, generate_department_report
+
+
+def test_department_counts_leave_out_deactivated_members(app, make_user, make_circular, make_submission):
+    circular = make_circular(academic_year='2024-2025')
+    active = make_user(department='CSE')
+    deactivated = make_user(department='CSE', is_active=False)
+    for user, statuses in ((active, ('approved', 'rejected', 'pending')), (deactivated, ('approved', 'approved'))):
+        for status in statuses:
+            make_submission(circular, user, status)
+    rebuild_rollup(db.session.connection())
+    db.session.commit()
+
+    report = department_report_data('CSE', '2024-2025')
+    assert report['faculty_count'] == 1
+    assert report['submissions'] == {'total': 3, 'approved': 1, 'rejected': 1, 'pending': 1}
+    assert [(row['submissions'], row['approved']) for row in report['users']] == [(3, 1)]
+
+    annual = annual_report_data('2024-2025')
+    assert annual['departments']['CSE'] == {'users': 1, 'submissions': 3, 'approved': 1}
+    assert annual['submissions']['total'] == 5  # the overall totals count every submission
+
+
+def test_reports_render_from_the_datasets(app, make_user, make_circular, make_submission):
+    make_submission(make_circular(), make_user(department='CSE'), 'approved')
+    assert generate_department_report(department_report_data('CSE', '2024-2025')).getvalue().startswith(b'%PDF')
+    assert generate_annual_report(annual_report_data('2024-2025')).getvalue().startswith(b'%PDF')
@@ -0,0 +1,63 @@
+import pytest
+
+from models import ReportJob, db
+from services import report_jobs
+from services.report_jobs import remove_superseded, request_report
+
+
+class RecordingExecutor:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    recording = RecordingExecutor()
+    monkeypatch.setattr(report_jobs, 'get_executor', lambda: recording)
+    return recording
+
+
+def finish(job, tmp_path):
+    job.status = 'done'
+    job.file_path = str(tmp_path / f'{job.id}.pdf')
+    with open(job.file_path, 'wb') as handle:
+        handle.write(b'%PDF')
+    db.session.commit()
+
+
+def test_live_and_finished_jobs_are_reused(app, executor, tmp_path, make_circular):
+    make_circular()
+    job = request_report('annual', '2024-2025')
+    assert request_report('annual', '2024-2025').id == job.id  # still queued
+    assert len(executor.submitted) == 1
+
+    finish(job, tmp_path)
+    assert request_report('annual', '2024-2025').id == job.id
+    assert len(executor.submitted) == 1
+
+
+def test_changed_data_queues_a_new_job(app, executor, tmp_path, make_circular):
+    make_circular()
+    first = request_report('department', '2024-2025', 'CSE')
+    finish(first, tmp_path)
+
+    make_circular(title='Another circular')
+    second = request_report('department', '2024-2025', 'CSE')
+    assert second.id != first.id and second.data_version != first.data_version
+
+    finish(second, tmp_path)
+    remove_superseded(second)
+    assert [job.id for job in ReportJob.query.all()] == [second.id]
+
+
+def test_missing_file_is_rendered_again(app, executor, tmp_path, make_circular):
+    make_circular()
+    job = request_report('annual', '2024-2025')
+    finish(job, tmp_path)
+    (tmp_path / f'{job.id}.pdf').unlink()
+
+    assert request_report('annual', '2024-2025').id != job.id
+    assert len(executor.submitted) == 2
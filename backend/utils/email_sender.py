@@ -1,11 +1,11 @@
 """
 Email utilities – SMTP via Gmail + OTP generation / verification.
-Uses MAIL_SENDER_EMAIL + MAIL_SENDER_PASSWORD from environment.
+Uses MAIL_SENDER_EMAIL + MAIL_SENDER_PASSWORD from environment; MAIL_SMTP_HOST/PORT/SSL
+point it at another server, e.g. a local aiosmtpd for testing.
 """
 import os
 import random
 import smtplib
-import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
@@ -47,34 +47,95 @@ def _get_smtp_credentials():
     return sender, password
 
 
-def send_email(to_email: str, subject: str, html_body: str) -> bool:
-    """Send an email via Gmail SMTP. Returns True on success."""
+def _get_smtp_server():
+    host = os.getenv('MAIL_SMTP_HOST', 'smtp.gmail.com')
+    port = int(os.getenv('MAIL_SMTP_PORT', '465'))
+    use_ssl = os.getenv('MAIL_SMTP_SSL', 'true').lower() == 'true'
+    return host, port, use_ssl
+
+
+def smtp_configured() -> bool:
+    """A sender is required; the password may be blank for an unauthenticated local SMTP server."""
     sender, password = _get_smtp_credentials()
-    if not sender or not password:
-        print(f"[EMAIL] SMTP not configured – skipping email to {to_email}")
-        return False
+    _, _, use_ssl = _get_smtp_server()
+    return bool(sender and (password or not use_ssl))
+
 
+def build_message(sender: str, to_email: str, subject: str, html_body: str) -> MIMEMultipart:
     msg = MIMEMultipart('alternative')
     msg['From'] = f'RCMS <{sender}>'
     msg['To'] = to_email
     msg['Subject'] = subject
     msg.attach(MIMEText(html_body, 'html'))
+    return msg
+
+
+class SmtpConnection:
+    """One logged-in SMTP session reused across sends; reconnects if the server has dropped it."""
+
+    def __init__(self, timeout: int = 10):
+        self.timeout = timeout
+        self.server = None
+
+    def _connect(self):
+        if self.server is None:
+            sender, password = _get_smtp_credentials()
+            host, port, use_ssl = _get_smtp_server()
+            smtp_class = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
+            server = smtp_class(host, port, timeout=self.timeout)
+            if password:
+                server.login(sender, password)
+            self.server = server
+        return self.server
+
+    def send(self, to_email: str, subject: str, html_body: str):
+        sender, _ = _get_smtp_credentials()
+        msg = build_message(sender, to_email, subject, html_body).as_string()
+        try:
+            self._connect().sendmail(sender, to_email, msg)
+        except smtplib.SMTPServerDisconnected:
+            self.server = None
+            self._connect().sendmail(sender, to_email, msg)
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+
+def send_email(to_email: str, subject: str, html_body: str) -> bool:
+    """Send one email right away on a connection of its own. Returns True on success."""
+    if not smtp_configured():
+        print(f"[EMAIL] SMTP not configured – skipping email to {to_email}")
+        return False
 
+    connection = SmtpConnection()
     try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465, timeout=10) as server:
-            server.login(sender, password)
-            server.sendmail(sender, to_email, msg.as_string())
+        connection.send(to_email, subject, html_body)
         print(f"[EMAIL] Sent to {to_email}: {subject}")
         return True
     except Exception as e:
         print(f"[EMAIL] Failed to send to {to_email}: {e}")
         return False
+    finally:
+        connection.close()
+
 
+def send_email_async(to_email: str, subject: str, html_body: str, urgent: bool = False):
+    """
+    Queue an email in the outbox (non-blocking). The row joins the caller's
+    transaction, so it is delivered once that commits; see services.email_queue.
+    Urgent email (OTP codes) goes out ahead of queued bulk mail.
+    """
+    if not smtp_configured():
+        print(f"[EMAIL] SMTP not configured – skipping email to {to_email}")
+        return
 
-def send_email_async(to_email: str, subject: str, html_body: str):
-    """Fire-and-forget email in background thread (non-blocking)."""
-    t = threading.Thread(target=send_email, args=(to_email, subject, html_body), daemon=True)
-    t.start()
+    from services.email_queue import enqueue_email
+    enqueue_email(to_email, subject, html_body, urgent=urgent)
 
 
 # ── Pre-built email templates ────────────────────────────────────────
@@ -96,11 +157,16 @@ def send_otp_email(to_email: str, otp: str, name: str = ''):
         <p style="color:#94a3b8;font-size:12px;text-align:center;">Regulatory Compliance Monitoring System – SSN College of Engineering</p>
     </div>
     """
-    send_email_async(to_email, subject, html)
+    send_email_async(to_email, subject, html, urgent=True)
 
 
 def send_notification_email(to_email: str, name: str, title: str, message: str):
-    """Send a platform notification as email."""
+    """Send a platform notification as email, or hold it for the next digest when digests are on."""
+    from services.email_digest import add_digest_item, digest_enabled
+    if digest_enabled():
+        add_digest_item(to_email, name, title, message)
+        return
+
     subject = f'RCMS – {title}'
     html = f"""
     <div style="font-family:Arial,sans-serif;max-width:480px;margin:auto;padding:24px;border:1px solid #e2e8f0;border-radius:8px;">
@@ -120,7 +186,12 @@ def send_notification_email(to_email: str, name: str, title: str, message: str):
     send_email_async(to_email, subject, html)
 
 def send_circulars_email(to_email: str, name: str, circulars: list):
-    """Send email for newly detected AICTE circulars."""
+    """Send email for newly detected AICTE circulars, or hold them for the next digest when digests are on."""
+    from services.email_digest import add_digest_item, digest_enabled
+    if digest_enabled():
+        for c in circulars:
+            add_digest_item(to_email, name, f"New AICTE Circular: {c['title']}", link=c['link'])
+        return
 
     subject = "RCMS – New AICTE Circulars Detected"
 
@@ -161,3 +232,46 @@ def send_circulars_email(to_email: str, name: str, circulars: list):
     """
 
     send_email_async(to_email, subject, html)
+
+
+def send_digest_email(to_email: str, name: str, items: list):
+    """Send one email summarising several held notifications (title, message, optional link each)."""
+    subject = f"RCMS – {len(items)} new update{'s' if len(items) != 1 else ''}"
+
+    items_html = ""
+    for item in items:
+        link_html = f'<br><a href="{item["link"]}" style="color:#2563eb;">View</a>' if item.get('link') else ''
+        message_html = f'<br><span style="color:#475569;">{item["message"]}</span>' if item.get('message') else ''
+        items_html += f"""
+        <li style="margin-bottom:12px;">
+            <strong>{item['title']}</strong>{message_html}{link_html}
+        </li>
+        """
+
+    html = f"""
+    <div style="font-family:Arial,sans-serif;max-width:600px;margin:auto;padding:24px;border:1px solid #e2e8f0;border-radius:8px;">
+        <h2 style="color:#1e3a5f;">Your RCMS Updates</h2>
+
+        <p>Hello {name},</p>
+
+        <p>Here is what happened since your last update:</p>
+
+        <ul>
+            {items_html}
+        </ul>
+
+        <div style="margin:24px 0;text-align:center;">
+            <a href="{os.getenv('FRONTEND_URL', 'http://localhost:8080')}/dashboard"
+               style="background:#1e3a5f;color:#fff;padding:10px 24px;border-radius:6px;text-decoration:none;font-weight:bold;">
+                Open RCMS Dashboard
+            </a>
+        </div>
+
+        <hr style="border:none;border-top:1px solid #e2e8f0;margin:24px 0;">
+        <p style="color:#94a3b8;font-size:12px;text-align:center;">
+            Regulatory Compliance Monitoring System – SSN College of Engineering
+        </p>
+    </div>
+    """
+
+    send_email_async(to_email, subject, html)
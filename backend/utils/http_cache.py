@@ -0,0 +1,44 @@
+"""
+Conditional GET support for polled JSON endpoints.
+
+Routes compute a cheap version stamp (counts / max ids / max timestamps for
+the caller's scope), turn it into a strong ETag, and only run the real query
+and serialization when the client's copy is out of date.
+"""
+import hashlib
+import json
+
+from flask import current_app, make_response, request
+from sqlalchemy import select
+
+
+def make_etag(*parts) -> str:
+    """Stable digest of the version-stamp parts (unquoted)."""
+    raw = json.dumps(parts, default=str, separators=(',', ':'))
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def stamp(column, where=None):
+    """Scalar subquery for one version-stamp aggregate, so a whole stamp is one SELECT."""
+    statement = select(column)
+    if where is not None:
+        statement = statement.where(where)
+    return statement.scalar_subquery()
+
+
+def conditional_json(etag: str, build):
+    """
+    Empty 304 when If-None-Match already carries `etag`; otherwise whatever
+    `build()` returns (anything a view may return), tagged with the ETag if
+    it succeeded.
+    """
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
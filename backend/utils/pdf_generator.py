@@ -23,10 +23,9 @@ def _get_styles():
     return styles
 
 
-def generate_annual_report(academic_year: str) -> io.BytesIO:
-    """Generate a comprehensive annual compliance report PDF."""
-    from models import db, Circular, Submission, User
-
+def generate_annual_report(data: dict) -> io.BytesIO:
+    """Generate a comprehensive annual compliance report PDF from services.report_data.annual_report_data."""
+    academic_year = data['academic_year']
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4,
                             topMargin=30*mm, bottomMargin=20*mm,
@@ -42,19 +41,15 @@ def generate_annual_report(academic_year: str) -> io.BytesIO:
     elements.append(Spacer(1, 20))
 
     # ── Overview ────────────────────────────────────────────────────
-    circulars = Circular.query.filter_by(academic_year=academic_year).all()
-    all_circulars = Circular.query.all() if not circulars else circulars
-    total = len(all_circulars)
-    completed = len([c for c in all_circulars if c.status == 'completed'])
-    active = len([c for c in all_circulars if c.status == 'active'])
+    total = data['circulars']['total']
+    completed = data['circulars']['completed']
+    active = data['circulars']['active']
 
-    all_submissions = []
-    for c in all_circulars:
-        all_submissions.extend(c.submissions)
-    total_subs = len(all_submissions)
-    approved = len([s for s in all_submissions if s.status == 'approved'])
-    rejected = len([s for s in all_submissions if s.status == 'rejected'])
-    pending = len([s for s in all_submissions if s.status in ('submitted', 'pending')])
+    submissions = data['submissions']
+    total_subs = submissions['total']
+    approved = submissions['approved']
+    rejected = submissions['rejected']
+    pending = submissions['pending']
 
     elements.append(Paragraph('1. Executive Summary', styles['SectionHead']))
     overview_data = [
@@ -84,18 +79,7 @@ def generate_annual_report(academic_year: str) -> io.BytesIO:
 
     # ── Category Breakdown ──────────────────────────────────────────
     elements.append(Paragraph('2. Category-wise Compliance', styles['SectionHead']))
-    categories = {}
-    for c in all_circulars:
-        cat = c.category
-        if cat not in categories:
-            categories[cat] = {'total': 0, 'completed': 0, 'submissions': 0, 'approved': 0}
-        categories[cat]['total'] += 1
-        if c.status == 'completed':
-            categories[cat]['completed'] += 1
-        for s in c.submissions:
-            categories[cat]['submissions'] += 1
-            if s.status == 'approved':
-                categories[cat]['approved'] += 1
+    categories = data['categories']
 
     cat_data = [['Category', 'Circulars', 'Completed', 'Submissions', 'Approved', 'Rate']]
     for cat, d in sorted(categories.items()):
@@ -122,16 +106,11 @@ def generate_annual_report(academic_year: str) -> io.BytesIO:
 
     # ── Department Breakdown ────────────────────────────────────────
     elements.append(Paragraph('3. Department-wise Compliance', styles['SectionHead']))
-    depts = ['CSE', 'IT', 'ECE', 'EEE', 'MECH', 'CIVIL', 'BIOMEDICAL', 'MTECH CSE']
     dept_data = [['Department', 'Users', 'Submissions', 'Approved', 'Compliance Rate']]
-    for dept in depts:
-        dept_users = User.query.filter_by(department=dept, is_active=True).all()
-        dept_user_ids = [u.id for u in dept_users]
-        dept_subs = [s for s in all_submissions if s.user_id in dept_user_ids]
-        dept_approved = [s for s in dept_subs if s.status == 'approved']
-        rate = round(len(dept_approved) / len(dept_subs) * 100, 1) if dept_subs else 0
-        dept_data.append([dept, str(len(dept_users)), str(len(dept_subs)),
-                          str(len(dept_approved)), f'{rate}%'])
+    for dept, d in data['departments'].items():
+        rate = round(d['approved'] / d['submissions'] * 100, 1) if d['submissions'] else 0
+        dept_data.append([dept, str(d['users']), str(d['submissions']),
+                          str(d['approved']), f'{rate}%'])
 
     t3 = Table(dept_data, colWidths=[100, 50, 70, 60, 100])
     t3.setStyle(TableStyle([
@@ -149,12 +128,10 @@ def generate_annual_report(academic_year: str) -> io.BytesIO:
 
     # ── Accreditation Readiness ─────────────────────────────────────
     elements.append(Paragraph('4. Accreditation Readiness', styles['SectionHead']))
-    reg_types = ['NAAC', 'NHERC', 'UGC', 'AICTE', 'NBA']
     acc_data = [['Body', 'Total', 'Completed', 'Readiness']]
-    for rt in reg_types:
-        rt_circulars = [c for c in all_circulars if c.regulation_type == rt]
-        rt_total = len(rt_circulars)
-        rt_completed = len([c for c in rt_circulars if c.status == 'completed'])
+    for rt, d in data['accreditation'].items():
+        rt_total = d['total']
+        rt_completed = d['completed']
         readiness = round(rt_completed / rt_total * 100, 1) if rt_total else 0
         acc_data.append([rt, str(rt_total), str(rt_completed), f'{readiness}%'])
 
@@ -182,10 +159,10 @@ def generate_annual_report(academic_year: str) -> io.BytesIO:
     return buffer
 
 
-def generate_department_report(department: str, academic_year: str) -> io.BytesIO:
-    """Generate a department-specific compliance report PDF."""
-    from models import db, Circular, Submission, User
-
+def generate_department_report(data: dict) -> io.BytesIO:
+    """Generate a department-specific compliance report PDF from services.report_data.department_report_data."""
+    department = data['department']
+    academic_year = data['academic_year']
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4,
                             topMargin=30*mm, bottomMargin=20*mm,
@@ -199,32 +176,20 @@ def generate_department_report(department: str, academic_year: str) -> io.BytesI
                                styles['Subtitle']))
     elements.append(Spacer(1, 20))
 
-    # Department users
-    dept_users = User.query.filter_by(department=department, is_active=True).all()
-    dept_user_ids = [u.id for u in dept_users]
-
-    # Relevant circulars
-    circulars = Circular.query.filter(
-        db.or_(
-            Circular.target_departments == 'all',
-            Circular.target_departments.ilike(f'%{department}%')
-        )
-    ).all()
-
     elements.append(Paragraph('1. Department Overview', styles['SectionHead']))
     overview = [
         ['Metric', 'Value'],
-        ['Total Faculty', str(len(dept_users))],
-        ['Relevant Circulars', str(len(circulars))],
+        ['Total Faculty', str(data['faculty_count'])],
+        ['Relevant Circulars', str(data['relevant_circulars'])],
     ]
 
     # Submissions
-    dept_subs = Submission.query.filter(Submission.user_id.in_(dept_user_ids)).all() if dept_user_ids else []
-    approved = len([s for s in dept_subs if s.status == 'approved'])
+    totals = data['submissions']
+    approved = totals['approved']
     overview.extend([
-        ['Total Submissions', str(len(dept_subs))],
+        ['Total Submissions', str(totals['total'])],
         ['Approved', str(approved)],
-        ['Compliance Rate', f'{round(approved/len(dept_subs)*100,1) if dept_subs else 0}%'],
+        ['Compliance Rate', f'{round(approved/totals["total"]*100,1) if totals["total"] else 0}%'],
     ])
 
     t = Table(overview, colWidths=[200, 150])
@@ -244,12 +209,10 @@ def generate_department_report(department: str, academic_year: str) -> io.BytesI
     # User-wise breakdown
     elements.append(Paragraph('2. Faculty-wise Submissions', styles['SectionHead']))
     user_data = [['Faculty', 'Role', 'Submissions', 'Approved', 'Rate']]
-    for u in dept_users:
-        u_subs = [s for s in dept_subs if s.user_id == u.id]
-        u_approved = len([s for s in u_subs if s.status == 'approved'])
-        rate = round(u_approved / len(u_subs) * 100, 1) if u_subs else 0
-        user_data.append([u.name, u.role.upper(), str(len(u_subs)),
-                          str(u_approved), f'{rate}%'])
+    for u in data['users']:
+        rate = round(u['approved'] / u['submissions'] * 100, 1) if u['submissions'] else 0
+        user_data.append([u['name'], u['role'].upper(), str(u['submissions']),
+                          str(u['approved']), f'{rate}%'])
 
     if len(user_data) > 1:
         t2 = Table(user_data, colWidths=[130, 60, 70, 60, 50])
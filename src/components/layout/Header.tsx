@@ -248,7 +248,7 @@
 import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth, getRoleLabel } from '@/contexts/AuthContext';
-import { notificationsAPI } from '@/services/api';
+import { notificationsAPI, subscribeToPush } from '@/services/api';
 import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
 import {
@@ -261,7 +261,7 @@ import {
 } from '@/components/ui/dropdown-menu';
 import { Bell, LogOut, User, ChevronDown, Building2 } from 'lucide-react';
 
-const NOTIFICATION_REFRESH_MS = 3000;
+const NOTIFICATION_REFRESH_MS = 30000; // fallback; new notifications arrive by push
 
 const Header = () => {
   const { user, logout } = useAuth();
@@ -291,6 +291,11 @@ const Header = () => {
 
     fetchCount();
     const interval = window.setInterval(fetchCount, NOTIFICATION_REFRESH_MS);
+    const unsubscribe = subscribeToPush((event) => {
+      if (event === 'notification' || event === 'submission.reviewed') {
+        fetchCount();
+      }
+    });
 
     const handler = () => fetchCount();
     window.addEventListener('notifications-updated', handler);
@@ -300,6 +305,7 @@ const Header = () => {
     return () => {
       isMounted = false;
       window.clearInterval(interval);
+      unsubscribe();
       window.removeEventListener('notifications-updated', handler);
       window.removeEventListener('focus', handler);
       document.removeEventListener('visibilitychange', handleVisibilityRefresh);
@@ -1,7 +1,7 @@
 import { useEffect, useRef, useState } from 'react';
 import { useAuth } from '@/contexts/AuthContext';
 import { useToast } from '@/hooks/use-toast';
-import { chatAPI } from '@/services/api';
+import { chatAPI, ChatHistoryParams, subscribeToPush } from '@/services/api';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -20,6 +20,8 @@ import {
   Users,
 } from 'lucide-react';
 
+const HISTORY_PAGE_SIZE = 50;
+
 const Chat = () => {
   const { user } = useAuth();
   const { toast } = useToast();
@@ -34,6 +36,8 @@ const Chat = () => {
   const fileInputRef = useRef<HTMLInputElement>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const pollRef = useRef<number>();
+  const messagesRef = useRef<any[]>([]);
+  const [hasOlder, setHasOlder] = useState(false);
 
   const loadSidebar = async () => {
     try {
@@ -48,22 +52,59 @@ const Chat = () => {
     }
   };
 
+  const fetchHistory = (params: ChatHistoryParams): Promise<any[]> | null => {
+    if (chatMode === 'direct' && selectedContact) return chatAPI.directMessages(selectedContact.id, params);
+    if (chatMode === 'group' && selectedGroup) return chatAPI.groupMessages(selectedGroup, params);
+    return null;
+  };
+
+  // Latest page of the open thread
   const loadMessages = async () => {
     try {
-      if (chatMode === 'direct' && selectedContact) {
-        const msgs = await chatAPI.directMessages(selectedContact.id);
-        setMessages(msgs);
-      } else if (chatMode === 'group' && selectedGroup) {
-        const msgs = await chatAPI.groupMessages(selectedGroup);
-        setMessages(msgs);
-      } else {
-        setMessages([]);
+      const request = fetchHistory({ limit: HISTORY_PAGE_SIZE });
+      const msgs = request ? await request : [];
+      setMessages(msgs);
+      setHasOlder(msgs.length === HISTORY_PAGE_SIZE);
+    } catch (error) {
+      console.error(error);
+    }
+  };
+
+  // Only what arrived after the newest message on screen
+  const loadNewMessages = async () => {
+    const current = messagesRef.current;
+    if (current.length === 0) return loadMessages();
+
+    try {
+      const request = fetchHistory({ since_id: current[current.length - 1].id, limit: HISTORY_PAGE_SIZE });
+      const msgs = request ? await request : [];
+      if (msgs.length > 0) {
+        setMessages((prev) => {
+          const lastId = prev.length > 0 ? prev[prev.length - 1].id : 0;
+          return [...prev, ...msgs.filter((message) => message.id > lastId)];
+        });
       }
     } catch (error) {
       console.error(error);
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (messages.length === 0) return;
+    try {
+      const request = fetchHistory({ before_id: messages[0].id, limit: HISTORY_PAGE_SIZE });
+      const msgs = request ? await request : [];
+      setMessages((prev) => [...msgs, ...prev]);
+      setHasOlder(msgs.length === HISTORY_PAGE_SIZE);
+    } catch (error) {
+      console.error(error);
+    }
+  };
+
+  useEffect(() => {
+    messagesRef.current = messages;
+  }, [messages]);
+
   useEffect(() => {
     loadSidebar();
     return () => {
@@ -73,25 +114,32 @@ const Chat = () => {
 
   useEffect(() => {
     const refresh = async () => {
-      await loadMessages();
+      await loadNewMessages();
       await loadSidebar();
     };
 
-    refresh();
+    messagesRef.current = [];
+    loadMessages();
+    loadSidebar();
     if (pollRef.current) clearInterval(pollRef.current);
 
     if (selectedContact || selectedGroup) {
-      pollRef.current = window.setInterval(refresh, 3000);
+      // Fallback only: new messages arrive by push
+      pollRef.current = window.setInterval(refresh, 30000);
     }
+    const unsubscribe = subscribeToPush((event) => {
+      if (event === 'chat.message') refresh();
+    });
 
     return () => {
       if (pollRef.current) clearInterval(pollRef.current);
+      unsubscribe();
     };
   }, [selectedContact, selectedGroup, chatMode]);
 
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
-  }, [messages]);
+  }, [messages.length > 0 ? messages[messages.length - 1].id : null]);
 
   const selectedGroupMeta = groups.find((group) => group.name === selectedGroup);
   const canSendToSelectedGroup =
@@ -120,7 +168,7 @@ const Chat = () => {
       setFile(null);
       if (fileInputRef.current) fileInputRef.current.value = '';
 
-      await Promise.all([loadMessages(), loadSidebar()]);
+      await Promise.all([loadNewMessages(), loadSidebar()]);
     } catch (error: any) {
       toast({
         title: 'Error',
@@ -310,6 +358,13 @@ const Chat = () => {
               {(selectedContact || selectedGroup) ? (
                 messages.length > 0 ? (
                   <div className="space-y-3">
+                    {hasOlder && (
+                      <div className="flex justify-center">
+                        <Button variant="ghost" size="sm" onClick={loadOlderMessages}>
+                          Load earlier messages
+                        </Button>
+                      </div>
+                    )}
                     {messages.map((message) => {
                       const isMe = message.sender_id === user?.id;
                       return (
@@ -336,7 +336,8 @@ const apiFetch = async (url: string, options: RequestInit = {}) => {
   const response = await fetch(`${API_BASE}${url}`, {
     ...options,
     headers,
-    cache: method === "GET" ? "no-store" : options.cache,
+    // Revalidate GETs: the browser sends If-None-Match and reuses its copy on a 304
+    cache: method === "GET" ? "no-cache" : options.cache,
   });
 
   // 🔥 HANDLE AUTH ERROR
@@ -364,6 +365,76 @@ const apiFetch = async (url: string, options: RequestInit = {}) => {
 
   return response.json();
 };
+
+// ── Server push ─────────────────────────────────────────────────────
+// One shared EventSource per tab. The stream URL carries a short-lived token
+// from POST /realtime/token; the browser retries dropped connections itself,
+// but gives up for good once the server refuses the (by then expired) token,
+// so we fetch a fresh one and reopen.
+
+type PushHandler = (event: string, data: any) => void;
+
+const PUSH_EVENTS = ['chat.message', 'notification', 'submission.reviewed'];
+const PUSH_RETRY_MS = 5000;
+const pushHandlers = new Set<PushHandler>();
+let pushSource: EventSource | null = null;
+let pushConnecting = false;
+let pushRetry: ReturnType<typeof setTimeout> | null = null;
+
+function schedulePushReconnect() {
+  if (pushRetry === null && pushHandlers.size > 0) {
+    pushRetry = setTimeout(() => {
+      pushRetry = null;
+      connectPush();
+    }, PUSH_RETRY_MS);
+  }
+}
+
+async function connectPush() {
+  if (pushSource || pushConnecting || !getToken() || typeof EventSource === 'undefined') return;
+
+  pushConnecting = true;
+  try {
+    const { token } = await apiFetch('/realtime/token', { method: 'POST' });
+    if (pushHandlers.size === 0) return;
+
+    const source = new EventSource(`${API_BASE}/realtime/stream?token=${encodeURIComponent(token)}`);
+    PUSH_EVENTS.forEach((event) => {
+      source.addEventListener(event, (e) => {
+        const data = JSON.parse((e as MessageEvent).data);
+        pushHandlers.forEach((notify) => notify(event, data));
+      });
+    });
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED && pushSource === source) {
+        pushSource = null;
+        schedulePushReconnect();
+      }
+    };
+    pushSource = source;
+  } catch {
+    schedulePushReconnect();
+  } finally {
+    pushConnecting = false;
+  }
+}
+
+export function subscribeToPush(handler: PushHandler): () => void {
+  pushHandlers.add(handler);
+  connectPush();
+
+  return () => {
+    pushHandlers.delete(handler);
+    if (pushHandlers.size === 0) {
+      if (pushRetry !== null) {
+        clearTimeout(pushRetry);
+        pushRetry = null;
+      }
+      pushSource?.close();
+      pushSource = null;
+    }
+  };
+}
 // ── Auth API ─────────────────────────────────────────────────────────
 
 export const authAPI = {
@@ -475,6 +546,17 @@ export const notificationsAPI = {
 
 // ── Chat API ─────────────────────────────────────────────────────────
 
+export type ChatHistoryParams = { limit?: number; before_id?: number; since_id?: number };
+
+const historyQuery = (params: ChatHistoryParams) => {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined) query.set(key, String(value));
+  });
+  const text = query.toString();
+  return text ? `?${text}` : '';
+};
+
 export const chatAPI = {
   sendMessage: (data: { receiver_id?: number; group_name?: string; message: string }) =>
     apiFetch('/chat', { method: 'POST', body: JSON.stringify(data) }),
@@ -493,11 +575,12 @@ export const chatAPI = {
 
   downloadUrl: (messageId: number) => `${API_BASE}/chat/download/${messageId}`,
 
-  directMessages: (userId: number) =>
-    apiFetch(`/chat/direct/${userId}`),
+  // Latest `limit` messages by default; older pages with before_id, new messages with since_id
+  directMessages: (userId: number, params: ChatHistoryParams = {}) =>
+    apiFetch(`/chat/direct/${userId}${historyQuery(params)}`),
 
-  groupMessages: (groupName: string) =>
-    apiFetch(`/chat/group/${encodeURIComponent(groupName)}`),
+  groupMessages: (groupName: string, params: ChatHistoryParams = {}) =>
+    apiFetch(`/chat/group/${encodeURIComponent(groupName)}${historyQuery(params)}`),
 
   contacts: () => apiFetch('/chat/contacts'),
 
@@ -519,18 +602,24 @@ export const reportsAPI = {
   data: (academicYear?: string) =>
     apiFetch(`/reports/data${academicYear ? '?academic_year=' + academicYear : ''}`),
 
-  downloadAnnual: (academicYear?: string) => {
-    const token = getToken();
-    const url = `${API_BASE}/reports/annual${academicYear ? '?academic_year=' + academicYear : ''}`;
-    return fetch(url, { headers: { Authorization: `Bearer ${token}` } }).then(r => r.blob());
-  },
+  downloadAnnual: (academicYear?: string) =>
+    renderReport('/reports/annual', { academic_year: academicYear }),
 
-  downloadDepartment: (department: string, academicYear?: string) => {
-    const token = getToken();
-    const params = new URLSearchParams({ department });
-    if (academicYear) params.set('academic_year', academicYear);
-    return fetch(`${API_BASE}/reports/department?${params}`, {
-      headers: { Authorization: `Bearer ${token}` },
-    }).then(r => r.blob());
-  },
-};
\ No newline at end of file
+  downloadDepartment: (department: string, academicYear?: string) =>
+    renderReport('/reports/department', { department, academic_year: academicYear }),
+};
+
+// Reports render in the background: queue (or reuse) a job, poll it, then fetch the PDF.
+const REPORT_POLL_MS = 1000;
+
+async function renderReport(path: string, params: Record<string, string | undefined>): Promise<Blob> {
+  let job = await apiFetch(path, { method: 'POST', body: JSON.stringify(params) });
+  while (job.status === 'queued' || job.status === 'running') {
+    await new Promise(resolve => setTimeout(resolve, REPORT_POLL_MS));
+    job = await apiFetch(`/reports/jobs/${job.id}`);
+  }
+  if (job.status !== 'done') {
+    throw new Error(job.error || 'Report generation failed');
+  }
+  return apiFetch(`/reports/jobs/${job.id}/download`);
+}